@@ -5,6 +5,7 @@ import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 
 from ges_data_processor import GESDataProcessor
+from ges_session import SesionGES
 
 
 class GESAdvancedAnalyzer:
@@ -14,6 +15,8 @@ class GESAdvancedAnalyzer:
         self.root.geometry("900x700")
 
         self.processor = GESDataProcessor()
+        # Entradas cargadas una vez; cada acción recarga solo lo que cambió
+        self.sesion = SesionGES(self.processor)
         self.manual_mode = tk.BooleanVar(value=False)
         self.manual_files = {
             "consultas": None,
@@ -461,6 +464,15 @@ Nota: Los códigos trazadora están configurados en ges_config.py
 
         self.update_status("Verificación completada", "green")
 
+    def preparar_datos(self, etapa):
+        """Cargar (o reutilizar) los datos de la sesión que necesita una etapa"""
+        self.processor.auto_select_files = not self.manual_mode.get()
+        if self.sesion.preparar(etapa):
+            return True
+        self.log_message("❌ No se pudieron cargar los archivos de entrada")
+        self.update_status("Error cargando datos", "red")
+        return False
+
     def run_full_analysis(self):
         """Ejecutar análisis completo con nuevas funcionalidades V2.0"""
         self.progress.start()
@@ -479,13 +491,10 @@ Nota: Los códigos trazadora están configurados en ges_config.py
                         self.update_status("Faltan archivos en selección manual", "red")
                         return
 
-                # Cargar todos los datos incluyendo nuevos archivos
+                # Cargar todos los datos (solo las fuentes modificadas desde la última acción)
                 self.log_message("📁 Cargando archivos de datos...")
-                self.processor.load_data()
-                self.processor.load_medicamentos_ges()
-                self.processor.load_clasificacion_paliativos()
-                self.processor.load_severidad_fq()
-                self.processor.load_recetas_ges()  # Cargar recetas GES
+                if not self.preparar_datos("completo"):
+                    return
                 
                 self.log_message("✅ Archivos cargados correctamente")
                 
@@ -568,8 +577,8 @@ Nota: Los códigos trazadora están configurados en ges_config.py
         self.update_status("Analizando medicamentos...", "orange")
 
         try:
-            self.processor.auto_select_files = not self.manual_mode.get()
-            self.processor.load_data()
+            if not self.preparar_datos("analisis_medicamentos"):
+                return
             self.processor.analizar_medicamentos_ges()
 
             # Mostrar resultados en el tree
@@ -607,8 +616,8 @@ Nota: Los códigos trazadora están configurados en ges_config.py
         """Generar archivo de consultas"""
         self.update_status("Generando archivo de consultas...", "orange")
         try:
-            self.processor.auto_select_files = not self.manual_mode.get()
-            self.processor.load_data()
+            if not self.preparar_datos("consultas"):
+                return
             archivo_consultas = os.path.join(
                 self.processor.outputs_path, "archivo_consultas_ges_completo.xlsx"
             )
@@ -625,8 +634,8 @@ Nota: Los códigos trazadora están configurados en ges_config.py
         """Generar archivo de medicamentos"""
         self.update_status("Generando archivo de medicamentos...", "orange")
         try:
-            self.processor.auto_select_files = not self.manual_mode.get()
-            self.processor.load_data()
+            if not self.preparar_datos("medicamentos"):
+                return
             archivo_medicamentos = os.path.join(
                 self.processor.outputs_path, "archivo_farmacia_ges_completo.xlsx"
             )
@@ -646,8 +655,8 @@ Nota: Los códigos trazadora están configurados en ges_config.py
 
         def generate():
             try:
-                self.processor.auto_select_files = not self.manual_mode.get()
-                self.processor.load_data()
+                if not self.preparar_datos("completo"):
+                    return
                 archivo_consultas = os.path.join(
                     self.processor.outputs_path, "archivo_consultas_ges_completo.xlsx"
                 )
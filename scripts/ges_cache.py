@@ -0,0 +1,186 @@
+"""
+Caché en disco de los DataFrames de entrada ya normalizados.
+
+Cada entrada se identifica por los archivos de origen (ruta, tamaño, fecha de
+modificación y hash SHA-256 del contenido), los parámetros que cambian el
+resultado de la carga (esquema, filtros) y la firma del código que lee y
+normaliza las entradas. Si alguno cambia, la entrada se descarta y se vuelve a
+leer el archivo original.
+"""
+
+import ast
+import hashlib
+import inspect
+import json
+import os
+import re
+import textwrap
+
+import pandas as pd
+
+# Subir cuando cambie el formato de las entradas guardadas (el código que las normaliza ya va en la clave)
+VERSION_CACHE = 1
+
+
+def firma_codigo(*funciones):
+    """SHA-256 del código fuente de las funciones que producen las entradas cacheadas"""
+    sha = hashlib.sha256()
+    for funcion in funciones:
+        try:
+            fuente = inspect.getsource(funcion)
+        except (OSError, TypeError):
+            fuente = getattr(funcion, "__qualname__", repr(funcion))
+        sha.update(fuente.encode("utf-8"))
+        sha.update(b"\x00")
+    return sha.hexdigest()
+
+
+def funciones_alcanzables(funciones, modulo, clase):
+    """
+    Nombres de las funciones de `modulo` y métodos de `clase` que `funciones` llaman
+    (directa o indirectamente, vía nombre o self.metodo), incluidas ellas mismas.
+    Sirve para comprobar que una lista de firma_codigo cubre todo lo que se ejecuta.
+    """
+    pendientes, vistas = list(funciones), {}
+    while pendientes:
+        funcion = pendientes.pop()
+        if funcion.__name__ in vistas:
+            continue
+        vistas[funcion.__name__] = funcion
+        arbol = ast.parse(textwrap.dedent(inspect.getsource(funcion)))
+        for nodo in ast.walk(arbol):
+            if isinstance(nodo, ast.Attribute) and isinstance(nodo.value, ast.Name) and nodo.value.id == "self":
+                llamada = getattr(clase, nodo.attr, None)
+            elif isinstance(nodo, ast.Name):
+                llamada = getattr(modulo, nodo.id, None)
+            else:
+                continue
+            if inspect.isfunction(llamada) and llamada.__module__ == modulo.__name__:
+                pendientes.append(llamada)
+    return set(vistas)
+
+
+class CacheEntradas:
+    """Caché de DataFrames de entrada en `directorio` (por defecto outputs/.cache)"""
+
+    def __init__(self, directorio, habilitada=True, codigo=None):
+        self.directorio = directorio
+        self.habilitada = habilitada
+        self.codigo = codigo  # firma_codigo de la lectura/normalización (cambia → entradas vencidas)
+        self.aciertos = 0
+        self.fallos = 0
+        self._hashes = {}  # (ruta, tamaño, mtime) → sha256, para no releer en la misma sesión
+
+    def firma_archivo(self, ruta):
+        """Firma de un archivo de entrada: ruta, tamaño, mtime y hash del contenido"""
+        ruta = os.path.abspath(ruta)
+        stat = os.stat(ruta)
+        clave_stat = (ruta, stat.st_size, stat.st_mtime_ns)
+        if clave_stat not in self._hashes:
+            sha = hashlib.sha256()
+            with open(ruta, "rb") as f:
+                for bloque in iter(lambda: f.read(1024 * 1024), b""):
+                    sha.update(bloque)
+            self._hashes[clave_stat] = sha.hexdigest()
+
+        return {
+            "ruta": ruta,
+            "tamano": stat.st_size,
+            "mtime": stat.st_mtime_ns,
+            "sha256": self._hashes[clave_stat],
+        }
+
+    def clave(self, nombre, archivos, parametros=None):
+        """Clave de la entrada a partir de las firmas de los archivos, los parámetros de carga y el código"""
+        contenido = {
+            "version": VERSION_CACHE,
+            "codigo": self.codigo,
+            "nombre": nombre,
+            "archivos": [self.firma_archivo(ruta) for ruta in archivos],
+            "parametros": parametros,
+        }
+        texto = json.dumps(contenido, sort_keys=True, default=str)
+        return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+    def obtener(self, nombre, archivos, cargar, parametros=None):
+        """
+        Retornar el DataFrame cacheado para `nombre` o cargarlo con `cargar()` y guardarlo.
+
+        `archivos` son las rutas de las que depende el resultado. Si `cargar()`
+        retorna None no se guarda nada.
+        """
+        if not self.habilitada:
+            return cargar()
+
+        df = self.buscar(nombre, archivos, parametros)
+        if df is not None:
+            return df
+
+        df = cargar()
+        if df is not None:
+            self.guardar(nombre, archivos, df, parametros)
+        return df
+
+    def buscar(self, nombre, archivos, parametros=None):
+        """DataFrame cacheado para `nombre`, o None si no hay entrada vigente"""
+        if not self.habilitada:
+            return None
+
+        ruta_cache = self._ruta_entrada(nombre, archivos, parametros)
+        if ruta_cache and os.path.exists(ruta_cache):
+            try:
+                df = pd.read_pickle(ruta_cache)
+                self.aciertos += 1
+                print(f"⚡ {nombre}: cargado desde caché ({len(df)} registros)")
+                return df
+            except Exception as e:
+                print(f"⚠️ Caché de {nombre} ilegible, recargando: {e}")
+
+        self.fallos += 1
+        return None
+
+    def guardar(self, nombre, archivos, df, parametros=None):
+        """Guardar `df` como entrada vigente de `nombre` (reemplaza versiones anteriores)"""
+        if not self.habilitada or df is None:
+            return
+
+        ruta_cache = self._ruta_entrada(nombre, archivos, parametros)
+        if ruta_cache:
+            self._guardar(df, ruta_cache, self._prefijo(nombre))
+
+    def limpiar(self):
+        """Eliminar todas las entradas de la caché"""
+        if not os.path.isdir(self.directorio):
+            return
+        for archivo in os.listdir(self.directorio):
+            if archivo.endswith(".pkl"):
+                os.remove(os.path.join(self.directorio, archivo))
+
+    def _guardar(self, df, ruta_cache, prefijo):
+        """Escribir la entrada (archivo temporal + rename) y borrar versiones anteriores"""
+        try:
+            os.makedirs(self.directorio, exist_ok=True)
+            temporal = ruta_cache + ".tmp"
+            df.to_pickle(temporal)
+            os.replace(temporal, ruta_cache)
+
+            for archivo in os.listdir(self.directorio):
+                ruta = os.path.join(self.directorio, archivo)
+                if archivo.startswith(prefijo + "_") and archivo.endswith(".pkl") and ruta != ruta_cache:
+                    os.remove(ruta)
+        except Exception as e:
+            print(f"⚠️ No se pudo guardar caché {os.path.basename(ruta_cache)}: {e}")
+
+    def _ruta_entrada(self, nombre, archivos, parametros):
+        """Ruta del archivo de la entrada, o None si no se pudo calcular la firma"""
+        try:
+            clave = self.clave(nombre, archivos, parametros)
+        except OSError as e:
+            print(f"⚠️ Caché: no se pudo leer firma de {nombre}: {e}")
+            return None
+        return os.path.join(self.directorio, f"{self._prefijo(nombre)}_{clave[:20]}.pkl")
+
+    @staticmethod
+    def _prefijo(nombre):
+        """Nombre de entrada apto para nombre de archivo"""
+        return re.sub(r"[^A-Za-z0-9_.-]+", "_", nombre)
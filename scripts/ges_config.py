@@ -34,6 +34,13 @@ ESPECIALIDADES_GES_VALIDAS = {
     }
 }
 
+# Pares (patología, código de especialidad) válidos, para filtrar consultas en bloque
+PARES_ESPECIALIDAD_GES = frozenset(
+    (patologia, codigo)
+    for patologia, config in ESPECIALIDADES_GES_VALIDAS.items()
+    for codigo in config["codigos"]
+)
+
 # Función helper para verificar si una especialidad es válida para GES
 def es_especialidad_ges_valida(codigo_especialidad, patologia_ges):
     """
@@ -42,7 +49,7 @@ def es_especialidad_ges_valida(codigo_especialidad, patologia_ges):
     if patologia_ges not in ESPECIALIDADES_GES_VALIDAS:
         return False
     
-    return codigo_especialidad in ESPECIALIDADES_GES_VALIDAS[patologia_ges]["codigos"]
+    return (patologia_ges, codigo_especialidad) in PARES_ESPECIALIDAD_GES
 
 # Códigos Trazadora por Prestación GES
 # NOTA: Estos códigos deben ser verificados con el sistema oficial
@@ -117,6 +124,144 @@ ESTADOS_CONSULTA_VALIDOS = ["Atendido", "Llegó"]
 # Será populado dinámicamente basado en el archivo de medicamentos GES
 MEDICAMENTOS_GES_TRAZADORA = {}
 
+# Las trazadoras de medicamentos por palabra clave están en reglas_trazadoras.csv
+# (ver trazadora_rules.py). Fibrosis sin medicamento específico: según severidad
+TRAZADORAS_FIBROSIS_SEVERIDAD = {
+    "grave": "2505256",
+    "moderada": "2505260",
+    "leve": "2505263",
+}
+
+# Medicamentos especiales en pacientes NO-GES que requieren revisión
+MEDICAMENTOS_REVISION_NO_GES = [
+    (["MORFINA", "FENTANILO", "TRAMADOL", "OXICODONA"], "PALIATIVO"),
+    (["SALBUTAMOL", "BECLOMETASONA", "BUDESONIDA"], "ASMA"),
+    (["TOBRAMICINA", "COLISTINA"], "FIBROSIS_QUISTICA"),
+]
+
+# Archivos de entrada fijos en inputs/ (el primero que exista de cada lista)
+ARCHIVO_POBLACION_GES = "RUT_pob_ges.xlsx"
+ARCHIVOS_MEDICAMENTOS_GES = [
+    "Medicamentos GES (1).xlsx",
+    "Medicamentos GES (1).csv",
+    "medicamentos_ges.xlsx",
+    "medicamentos_ges.csv",
+]
+ARCHIVOS_CLASIFICACION_PALIATIVOS = [
+    "clasificacion paliativos.xlsx",
+    "clasificacion_paliativos.xlsx",
+    "Clasificacion Paliativos.xlsx",
+    "clasificacion paliativos.csv",
+    "clasificacion_paliativos.csv",
+]
+ARCHIVOS_SEVERIDAD_FQ = [
+    "severidad_FQ.xlsx",
+    "severidad_fq.xlsx",
+    "Severidad_FQ.xlsx",
+    "severidad_FQ.csv",
+    "severidad_fq.csv",
+]
+
+# Lectura de extractos CSV (consultas / farmacia) en bloques
+# Filas por bloque; None lee el archivo completo en memoria
+CSV_CHUNKSIZE = 100_000
+
+# Procesos para leer archivos de recetas en paralelo (None = núcleos disponibles, 1 = secuencial)
+RECETAS_PROCESOS = None
+
+# Escritura de planillas .xlsx de carga con openpyxl en modo write-only (ges_excel)
+EXCEL_ESCRITURA_RAPIDA = True
+
+# Escritura de partes de salida en paralelo (ges_salidas): pool "procesos" o "hilos" y
+# trabajadores (None = núcleos disponibles, 1 = secuencial). Cada parte se escribe en un
+# temporal y se renombra; SALIDA_MANIFIESTO deja <base>_MANIFIESTO.json con filas y SHA-256
+SALIDA_POOL = "procesos"
+SALIDA_TRABAJADORES = None
+SALIDA_MANIFIESTO = True
+
+# Salida canónica: resultado completo en un solo archivo por formato (<base>_COMPLETO.csv / .parquet),
+# escrito antes de las partes de carga. Parquet requiere pyarrow o fastparquet (si falta se omite)
+SALIDA_CANONICA = ["csv", "parquet"]
+
+# Modo lote por meses (ges_lote): el mes de cada archivo de inputs/ se reconoce por una de
+# estas palabras en el nombre (ej. reporte_consulta_ago.csv). LOTE_PROCESOS: meses en
+# paralelo (None = núcleos disponibles, 1 = secuencial)
+MESES_ARCHIVOS = {
+    "ene": ["ene", "enero", "jan"],
+    "feb": ["feb", "febrero"],
+    "mar": ["mar", "marzo"],
+    "abr": ["abr", "abril", "apr"],
+    "may": ["may", "mayo"],
+    "jun": ["jun", "junio"],
+    "jul": ["jul", "julio"],
+    "ago": ["ago", "agosto", "aug"],
+    "sep": ["sep", "sept", "set", "septiembre", "setiembre"],
+    "oct": ["oct", "octubre"],
+    "nov": ["nov", "noviembre"],
+    "dic": ["dic", "diciembre", "dec"],
+}
+LOTE_PROCESOS = None
+
+# Registro de eventos (ges_logging): nivel en consola ("DEBUG" muestra el detalle por fila)
+# y archivo rotativo opcional con el detalle completo (None = sin archivo)
+LOG_NIVEL = "INFO"
+LOG_ARCHIVO = None
+LOG_ARCHIVO_MAX_BYTES = 5_000_000
+LOG_ARCHIVO_RESPALDOS = 3
+
+# Estado persistente de registros ya clasificados (outputs/.cache/estado_registros.sqlite):
+# cada corrida clasifica solo las filas de consultas/medicamentos nuevas o modificadas
+ESTADO_REGISTROS = True
+
+# Guardar en outputs/.cache/clasificacion_medicamentos.json las clasificaciones de descripciones
+# de medicamentos para reutilizarlas en la próxima corrida (False = solo en memoria)
+MEMO_MEDICAMENTOS_PERSISTENTE = False
+
+# Etapas de procesar_todo que se ejecutan bajo cProfile (ej. ["medicamentos"]); el .prof queda en outputs/
+# Etapas: carga, arancel, analisis_medicamentos, consultas, medicamentos, cruce, reportes
+PERFILAR_ETAPAS = []
+
+# Esquema de entrada por fuente: columnas que usa el procesamiento GES y su tipo.
+# Las columnas no declaradas no se cargan. Tipo None = inferido por pandas
+# (RUT y cantidades: int64, o float64 si hay vacíos, igual que sin esquema).
+ESQUEMAS_ENTRADA = {
+    "consultas": {
+        "requeridas": {
+            "RUNPaciente": "str",
+            "EstadoCita_Desc": "category",
+            "EspecialidadLocal": "category",
+            "FechaCita": "str",
+        },
+        "opcionales": {},
+    },
+    "farmacia": {
+        "requeridas": {
+            "RutPaciente": None,
+            "DVPaciente": "str",
+            "Farmaco_Desc": "str",
+            "FechaDespacho": "str",
+        },
+        "opcionales": {
+            "RUNPaciente": "str",
+            "CantidadDespachada": None,
+            "LocalSolicitante": "category",
+        },
+    },
+    # Recetas GES (Excel/HTML), después de renombrar columnas al formato estándar
+    "recetas": {
+        "requeridas": {
+            "FechaEmision": None,
+            "RutPaciente": None,
+            "DVPaciente": None,
+            "Farmaco_Desc": None,
+        },
+        "opcionales": {
+            "CantidadDespachada": None,
+            "LocalSolicitante": None,
+        },
+    },
+}
+
 # Tipos de prestación por especialidad
 TIPOS_PRESTACION = {
     "consulta_nueva": "CN",
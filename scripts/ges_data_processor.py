@@ -1,12 +1,412 @@
+import contextlib
+import io
 import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
 import glob
+import logging
 import tkinter as tk
 from tkinter import filedialog, messagebox
 
+import numpy as np
 import pandas as pd
+from ges_cache import CacheEntradas, firma_codigo
 from ges_config import *
+from ges_estado import EVENTOS, OMITIDO, EstadoRegistros, claves_registros, firma_contexto
+from ges_logging import (
+    COLUMNAS_EVENTOS, ContadorEventos, asegurar_logging, contar_eventos, eventos_por_fila, unir_eventos,
+)
+from ges_profiling import PerfilEjecucion, contar_filas
+from ges_salidas import escribir_partes, guardar_manifiesto_partes, guardar_salida_canonica, limpiar_salida_anterior
 from trazadora_processor import TrazadoraProcessor
+from trazadora_rules import (
+    RESOLVER_CLASIFICACION_PALIATIVOS, RESOLVER_SEVERIDAD_FQ, TrazadoraRuleEngine, normalizar_descripcion,
+)
+
+
+def _rut_number_to_str(rut_number):
+    """Convertir un número de RUT a texto igual que format_rut (float → int)"""
+    try:
+        if isinstance(rut_number, float):
+            rut_number = int(rut_number)
+        return str(rut_number)
+    except (ValueError, OverflowError):
+        return None
+
+
+def format_rut_series(rut_numbers, dvs):
+    """
+    Versión columnar de GESDataProcessor.format_rut.
+
+    Combina una serie de números de RUT y una de DV en el formato "numero-DV"
+    (floats convertidos a entero, DV sin espacios y en mayúsculas).
+    Retorna None donde el RUT o el DV son nulos, igual que format_rut.
+    """
+    rut_numbers = pd.Series(rut_numbers)
+    dvs = pd.Series(np.asarray(dvs, dtype=object), index=rut_numbers.index)
+    values = np.full(len(rut_numbers), None, dtype=object)
+
+    valid = (rut_numbers.notna() & dvs.notna()).to_numpy()
+    if pd.api.types.is_float_dtype(rut_numbers):
+        valid &= np.isfinite(rut_numbers.to_numpy(dtype=float, na_value=np.nan))
+
+    if valid.any():
+        ruts = rut_numbers[valid]
+        if pd.api.types.is_float_dtype(ruts):
+            rut_str = ruts.astype("int64").astype(str)
+        elif ruts.dtype == object:
+            rut_str = ruts.map(_rut_number_to_str)
+        else:
+            rut_str = ruts.astype(str)
+
+        dv_str = dvs[valid].astype(str).str.strip().str.upper()
+        ok = rut_str.notna().to_numpy()
+        combined = rut_str[ok].to_numpy(dtype=object) + "-" + dv_str[ok].to_numpy(dtype=object)
+        values[np.flatnonzero(valid)[ok]] = combined
+
+    return pd.Series(values, index=rut_numbers.index, dtype=object)
+
+
+# Formatos de fecha conocidos, en orden de prioridad (luego inferencia de pandas)
+FORMATOS_FECHA = ["%d-%m-%Y", "%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y %H:%M", "%d/%m/%Y %H:%M"]
+
+# Textos que pandas interpreta como fecha nula (NaT) en vez de error
+TEXTOS_FECHA_NULA = {"", "nan", "NaN", "NAN", "NaT", "nat", "NAT"}
+
+_RE_ANIO_PRIMERO = re.compile(r"\s*\d{4}\D")
+
+
+def _inferir_fecha(texto):
+    """
+    Inferencia de pandas para un texto; None si no se puede parsear. Día primero (como los
+    formatos conocidos), salvo que el texto empiece por el año (ISO: año-mes-día).
+    """
+    try:
+        return pd.to_datetime(texto, dayfirst=not _RE_ANIO_PRIMERO.match(texto))
+    except Exception:
+        return None
+
+
+def parse_dates_series(fechas, formatos=FORMATOS_FECHA, ahora=None):
+    """
+    Normalizar una serie de fechas en bloque.
+
+    Prueba cada formato conocido sobre toda la serie con errors="coerce", luego
+    la inferencia de pandas sobre los textos restantes. Igual que la versión
+    escalar: valores nulos y textos no reconocidos quedan con la fecha actual,
+    y textos nulos de pandas ("nan", "NaT", "") quedan como NaT. `ahora` fija
+    esa fecha actual (por defecto datetime.now()).
+
+    Retorna (serie de fechas, conteo de aciertos por formato).
+    """
+    fechas = pd.Series(fechas, dtype=object)
+    valores = fechas.to_numpy(dtype=object)
+    resultado = np.empty(len(valores), dtype=object)
+    conteo = dict.fromkeys(["sin_fecha", "nula"] + list(formatos) + ["inferida", "no_reconocida"], 0)
+
+    ahora = ahora or datetime.now()
+    vacias = pd.isna(valores)
+    resultado[vacias] = ahora
+    conteo["sin_fecha"] = int(vacias.sum())
+
+    textos = np.array([str(valor) for valor in valores], dtype=object)
+    nulas = ~vacias & np.array([texto in TEXTOS_FECHA_NULA for texto in textos], dtype=bool)
+    resultado[nulas] = pd.NaT
+    conteo["nula"] = int(nulas.sum())
+    pendiente = ~(vacias | nulas)
+
+    for fmt in formatos:
+        if not pendiente.any():
+            break
+        posiciones = np.flatnonzero(pendiente)
+        parseadas = pd.to_datetime(pd.Series(textos[posiciones]), format=fmt, errors="coerce")
+        ok = parseadas.notna().to_numpy()
+        resultado[posiciones[ok]] = parseadas[ok].tolist()
+        pendiente[posiciones[ok]] = False
+        conteo[fmt] = int(ok.sum())
+
+    # Inferencia sobre los textos restantes, una vez por texto único
+    if pendiente.any():
+        posiciones = np.flatnonzero(pendiente)
+        unicos = pd.unique(textos[posiciones])
+        inferidas = {texto: _inferir_fecha(texto) for texto in unicos}
+        for posicion in posiciones:
+            fecha = inferidas[textos[posicion]]
+            if fecha is None or pd.isna(fecha):
+                resultado[posicion] = ahora
+                conteo["no_reconocida"] += 1
+            else:
+                resultado[posicion] = fecha
+                conteo["inferida"] += 1
+
+    return pd.Series(resultado.tolist(), index=fechas.index), conteo
+
+
+# Primeros bytes de cada formato de planilla
+MAGIA_OLE2 = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"  # .xls binario (BIFF)
+MAGIA_ZIP = b"PK\x03\x04"  # .xlsx (Office Open XML)
+MARCAS_HTML = (b"<!doctype html", b"<html", b"<head", b"<meta", b"<body", b"<table")
+
+
+def detectar_formato_planilla(filepath):
+    """Formato real de una planilla según su contenido: 'xls', 'xlsx', 'html' o None"""
+    with open(filepath, "rb") as f:
+        cabecera = f.read(2048)
+
+    if cabecera.startswith(MAGIA_OLE2):
+        return "xls"
+    if cabecera.startswith(MAGIA_ZIP):
+        return "xlsx"
+
+    if cabecera.startswith((b"\xff\xfe", b"\xfe\xff")):
+        cabecera = cabecera.decode("utf-16", errors="ignore").encode("ascii", errors="ignore")
+    texto = cabecera.lstrip(b"\xef\xbb\xbf \t\r\n").lower()
+    if any(marca in texto for marca in MARCAS_HTML):
+        return "html"
+    return None
+
+
+# Misma limpieza de texto de celdas que pd.read_html
+_RE_ESPACIOS_HTML = re.compile(r"[\r\n]+|\s{2,}")
+
+
+class _TablaHTMLNoSimple(Exception):
+    """Estructura HTML que el lector en streaming no cubre (se usa pd.read_html)"""
+
+
+def _tablas_html_simples(filepath, max_tablas):
+    """
+    Recorrer el HTML con lxml.iterparse y retornar las primeras `max_tablas` tablas
+    con contenido como (encabezado, cuerpo, pie), listas de filas de texto.
+
+    Cada fila se libera apenas se lee y el recorrido termina al cerrar la última
+    tabla pedida. Lanza _TablaHTMLNoSimple ante colspan/rowspan, tablas anidadas,
+    celdas ocultas o tablas sin texto.
+    """
+    from lxml import etree
+
+    texto_celda = etree.XPath("string()")  # Igual que text_content() de lxml.html
+    tablas = []
+    actual = None
+    for evento, elem in etree.iterparse(
+        filepath, events=("start", "end"), tag=("table", "thead", "tr"), html=True, recover=True
+    ):
+        if elem.tag == "table":
+            if evento == "start":
+                if actual is not None:
+                    raise _TablaHTMLNoSimple("tabla anidada")
+                if "display" in (elem.get("style") or ""):
+                    raise _TablaHTMLNoSimple("tabla con estilo")
+                actual = {"thead": [], "tbody": [], "table": [], "tfoot": [], "th": [], "texto": False}
+                continue
+            if not actual["texto"]:
+                raise _TablaHTMLNoSimple("tabla sin texto")
+            tablas.append(actual)
+            actual = None
+            elem.clear()
+            if len(tablas) == max_tablas:
+                break
+            continue
+
+        if evento != "end" or actual is None:
+            continue
+        if elem.tag == "thead":
+            if any(hijo.tag in ("td", "th") for hijo in elem):
+                raise _TablaHTMLNoSimple("thead sin filas")
+            continue
+
+        seccion = elem.getparent().tag
+        if seccion not in ("thead", "tbody", "table", "tfoot"):
+            raise _TablaHTMLNoSimple(f"fila dentro de <{seccion}>")
+        celdas = [hijo for hijo in elem if hijo.tag in ("td", "th")]
+        textos = []
+        for celda in celdas:
+            if int(celda.get("rowspan") or 1) > 1 or int(celda.get("colspan") or 1) > 1:
+                raise _TablaHTMLNoSimple("colspan/rowspan")
+            if "display" in (celda.get("style") or ""):
+                raise _TablaHTMLNoSimple("celda oculta")
+            if len(celda):
+                for nodo in celda.iter():
+                    if nodo.tag == "style" or "display" in (nodo.get("style") or ""):
+                        raise _TablaHTMLNoSimple("celda con estilo")
+                    if nodo.tag == "br":
+                        nodo.tail = "\n" + (nodo.tail or "")
+                texto = texto_celda(celda)
+            else:
+                texto = celda.text or ""
+            textos.append(_RE_ESPACIOS_HTML.sub(" ", texto.strip()))
+        actual["texto"] = actual["texto"] or any(textos)
+        actual[seccion].append(textos)
+        if seccion in ("tbody", "table"):
+            actual["th"].append(bool(celdas) and all(celda.tag == "th" for celda in celdas))
+
+        # Liberar la fila ya leída
+        elem.clear()
+        while elem.getprevious() is not None:
+            del elem.getparent()[0]
+
+    if actual is not None and not tablas:
+        raise _TablaHTMLNoSimple("tabla sin cerrar")
+
+    resultado = []
+    for tabla in tablas:
+        encabezado = tabla["thead"]
+        cuerpo = tabla["tbody"] + tabla["table"]
+        if not encabezado:
+            # Sin <thead>: filas iniciales solo de <th> son encabezado
+            es_th = tabla["th"]
+            while cuerpo and es_th and es_th[0]:
+                encabezado.append(cuerpo.pop(0))
+                es_th = es_th[1:]
+        resultado.append((encabezado, cuerpo, tabla["tfoot"]))
+    return resultado
+
+
+def _tabla_html_a_dataframe(encabezado, cuerpo, pie):
+    """DataFrame de una tabla HTML con la misma inferencia de encabezado y tipos que pd.read_html"""
+    from pandas.io.parsers import TextParser
+
+    header = None
+    filas = cuerpo
+    if encabezado:
+        filas = encabezado + cuerpo
+        if len(encabezado) == 1:
+            header = 0
+        else:
+            header = [i for i, fila in enumerate(encabezado) if any(texto for texto in fila)]
+    filas = filas + pie
+
+    ancho = max((len(fila) for fila in filas), default=0)
+    filas = [fila + [""] * (ancho - len(fila)) for fila in filas]
+    with TextParser(filas, header=header, skiprows=0, parse_dates=False, thousands=",", decimal=".") as parser:
+        return parser.read()
+
+
+def leer_tabla_datos_html(filepath):
+    """
+    Leer la tabla de datos de un reporte HTML (.xls descargado como página web).
+
+    La tabla 0 es metadata y la 1 contiene los datos (o la única tabla, si hay
+    una sola). El archivo se recorre en streaming hasta cerrar la tabla de datos;
+    si la estructura no es simple se usa pd.read_html sobre el documento completo.
+    """
+    try:
+        tablas = [_tabla_html_a_dataframe(*tabla) for tabla in _tablas_html_simples(filepath, max_tablas=2)]
+    except (_TablaHTMLNoSimple, ValueError):
+        tablas = pd.read_html(filepath)
+
+    if len(tablas) >= 2:
+        df = tablas[1]
+    elif len(tablas) == 1:
+        df = tablas[0]
+    else:
+        raise Exception("No se encontraron tablas HTML")
+
+    # Si las columnas son numéricas [0,1,2...], la primera fila tiene los nombres
+    if len(df) > 0 and all(isinstance(col, int) for col in df.columns):
+        # Usar primera fila como encabezados
+        header_row = df.iloc[0].tolist()
+        df.columns = header_row
+        df = df[1:].reset_index(drop=True)
+    return df
+
+
+_PROCESADOR_RECETAS = None  # Procesador propio de cada proceso del pool de recetas
+_FIRMA_CODIGO_ENTRADAS = None
+_FIRMA_CODIGO_CLASIFICACION = None
+
+
+def funciones_codigo_entradas():
+    """Funciones que leen y normalizan las entradas cacheadas (todo lo que llaman los load_*)"""
+    p = GESDataProcessor
+    return (
+        _rut_number_to_str, format_rut_series, detectar_formato_planilla,
+        _tablas_html_simples, _tabla_html_a_dataframe, leer_tabla_datos_html, _leer_recetas_aislado,
+        p.load_poblacion_ges, p.load_consultas, p.load_farmacia, p.load_medicamentos_ges,
+        p.load_clasificacion_paliativos, p.load_severidad_fq, p.load_recetas_ges, p._leer_con_cache,
+        p._leer_archivos_recetas, p.leer_archivo_recetas, p.load_csv_safely, p.validar_esquema_entrada,
+        p._ruts_ges_normalizados, p.filtro_consultas_ges, p.filtro_farmacia_ges,
+        p.format_rut, p.normalize_dv_in_dataframe,
+        p.build_ges_index, p._get_ges_index, p.build_severidad_fq_index, p.build_clasificacion_paliativos_index,
+    )
+
+
+def firma_codigo_entradas():
+    """Firma del código que lee y normaliza las entradas cacheadas (clave de CacheEntradas)"""
+    global _FIRMA_CODIGO_ENTRADAS
+    if _FIRMA_CODIGO_ENTRADAS is None:
+        _FIRMA_CODIGO_ENTRADAS = firma_codigo(*funciones_codigo_entradas())
+    return _FIRMA_CODIGO_ENTRADAS
+
+
+def funciones_codigo_clasificacion():
+    """
+    Funciones que clasifican los registros del estado persistente (todo lo que llaman los
+    clasificar_*_para_carga, incluidas las trazadoras de TrazadoraProcessor y TrazadoraRuleEngine
+    y la resolución una vez por RUT de ContadorEventos)
+    """
+    p, t, r = GESDataProcessor, TrazadoraProcessor, TrazadoraRuleEngine
+    return (
+        _inferir_fecha, parse_dates_series,
+        p.clasificar_consultas_para_carga, p.clasificar_medicamentos_para_carga,
+        p._resolver_trazadora_paciente, p._resolver_trazadoras_paciente,
+        p.determinar_codigo_trazadora_medicamento, p.determinar_codigos_trazadora_medicamentos,
+        p._descripciones_medicamentos, p._ruts_pacientes_medicamentos,
+        p._trazadora_fibrosis_por_severidad, p._trazadora_paliativo_medicamento,
+        p.determinar_severidad_fq, p.determinar_tipo_paliativo, p._get_severidad_fq_map,
+        p._get_clasificacion_paliativos_map, p.build_severidad_fq_index, p.build_clasificacion_paliativos_index,
+        p.esta_en_poblacion_ges, p._get_ges_index, p.build_ges_index, p.get_ges_conditions,
+        p.get_codigo_prestacion, p.extract_rut_number, p.extract_rut_dv, p.format_dates_for_excel,
+        t.determinar_trazadoras_consultas, t.determinar_trazadora_consulta, t.determinar_trazadora_medicamento,
+        t._determinar_trazadora_asma_medicamento, t._determinar_trazadora_fibrosis_consulta,
+        t._determinar_trazadora_fibrosis_medicamento, t._determinar_trazadora_paliativos_consulta,
+        t._determinar_trazadora_paliativos_medicamento, t._obtener_severidad_fq, t.normalizar_codigo_trazadora,
+        t._get_severidad_fq_map, t._get_clasificacion_paliativos_map, t.indexar_severidad_fq,
+        t.indexar_clasificacion_paliativos, t._indexar_por_rut, t._buscar_columna,
+        r.patologias, r.tiene_reglas, r.clasificar, r.clasificar_descripcion, r._clasificar_normalizada,
+        normalizar_descripcion, ContadorEventos.resolver_por_unidad,
+    )
+
+
+def firma_codigo_clasificacion():
+    """Firma del código que clasifica los registros (parte de la firma del estado persistente)"""
+    global _FIRMA_CODIGO_CLASIFICACION
+    if _FIRMA_CODIGO_CLASIFICACION is None:
+        _FIRMA_CODIGO_CLASIFICACION = firma_codigo(*funciones_codigo_clasificacion())
+    return _FIRMA_CODIGO_CLASIFICACION
+
+
+# Tablas de referencia comunes a todos los meses (y sus índices), que el modo lote comparte entre procesadores
+TABLAS_REFERENCIA = ("ges_df", "medicamentos_ges_df", "clasificacion_paliativos_df", "severidad_fq_df")
+INDICES_REFERENCIA = (
+    "ges_index", "ges_ruts_valores", "ges_ruts_texto", "_ges_index_source",
+    "severidad_fq_map", "severidad_fq_rut_column", "_severidad_fq_source",
+    "clasificacion_paliativos_map", "clasificacion_paliativos_rut_column",
+    "clasificacion_paliativos_tipo_column", "_clasificacion_paliativos_source",
+)
+
+
+def _leer_recetas_aislado(filepath, procesador=None):
+    """
+    Leer un archivo de recetas capturando lo que imprime, para el pool de procesos.
+
+    Retorna (DataFrame o None, salida impresa, mensaje de error o None); un
+    archivo con error no afecta a los demás.
+    """
+    global _PROCESADOR_RECETAS
+    salida = io.StringIO()
+    with contextlib.redirect_stdout(salida):
+        try:
+            if procesador is None:
+                if _PROCESADOR_RECETAS is None:
+                    _PROCESADOR_RECETAS = GESDataProcessor(auto_select_files=False)
+                procesador = _PROCESADOR_RECETAS
+            df, error = procesador.leer_archivo_recetas(filepath), None
+        except Exception as e:
+            df, error = None, str(e)
+    return df, salida.getvalue(), error
 
 
 class GESDataProcessor:
@@ -23,20 +423,71 @@ class GESDataProcessor:
         self.auto_select_files = auto_select_files
         self.selected_files = {}
 
+        # Lectura en bloques de consultas/farmacia filtrando a población GES (None = archivo completo)
+        self.csv_chunksize = CSV_CHUNKSIZE
+
+        # Procesos para leer archivos de recetas en paralelo (None = núcleos disponibles, 1 = secuencial)
+        self.recetas_procesos = RECETAS_PROCESOS
+
+        # Escritura de partes de salida: .xlsx rápido, pool en paralelo y manifiesto
+        self.escritura_excel_rapida = EXCEL_ESCRITURA_RAPIDA
+        self.salida_pool = SALIDA_POOL
+        self.salida_trabajadores = SALIDA_TRABAJADORES
+        self.salida_manifiesto = SALIDA_MANIFIESTO
+        self.salida_canonica = list(SALIDA_CANONICA)
+
+        # Etapas de procesar_todo a perfilar con cProfile
+        self.perfilar_etapas = list(PERFILAR_ETAPAS)
+        self.ultima_medicion = None  # PerfilEjecucion de la última llamada a procesar_todo
+
+        # Caché en disco de entradas ya normalizadas (outputs/.cache)
+        self.cache_entradas = CacheEntradas(os.path.join(self.outputs_path, ".cache"), codigo=firma_codigo_entradas())
+
+        # Estado persistente de registros ya clasificados: solo se clasifican filas nuevas o modificadas
+        self.estado_registros = EstadoRegistros(
+            os.path.join(self.outputs_path, ".cache", "estado_registros.sqlite"), habilitado=ESTADO_REGISTROS
+        )
+        # Clasificaciones de descripciones de medicamentos guardadas entre corridas (outputs/.cache)
+        self.memo_medicamentos_persistente = MEMO_MEDICAMENTOS_PERSISTENTE
+
         # DataFrames
         self.ges_df = None
         self.consulta_df = None
         self.farmacia_df = None
         self.medicamentos_ges_df = None
         self.recetas_ges_df = None  # Nuevo: archivo de recetas GES por patología
+        self.clasificacion_paliativos_df = None
+        self.severidad_fq_df = None
+
+        # Índice de población GES (RUT → patología), construido una vez al cargar
+        self.ges_index = {}
+        self.ges_ruts_valores = set()
+        self.ges_ruts_texto = set()
+        self._ges_index_source = None
+
+        # Índices RUT → severidad FQ / clasificación paliativos, construidos al cargar
+        self.severidad_fq_map = {}
+        self.severidad_fq_rut_column = None
+        self._severidad_fq_source = None
+        self.clasificacion_paliativos_map = {}
+        self.clasificacion_paliativos_rut_column = None
+        self.clasificacion_paliativos_tipo_column = None
+        self._clasificacion_paliativos_source = None
 
         # Resultados
         self.medicamentos_encontrados = {}
         self.consultas_procesadas = []
         self.medicamentos_procesados = []
+        self.estadisticas_fechas = {}  # Aciertos por formato de fecha (consultas / medicamentos)
 
-        # Procesador de trazadoras
+        # Procesador de trazadoras y reglas de trazadoras de medicamentos (reglas_trazadoras.csv)
         self.trazadora_processor = TrazadoraProcessor(self.base_path)
+        self.reglas_trazadoras = TrazadoraRuleEngine.desde_archivo()
+
+        # Eventos por fila (detalle en DEBUG, resumen de conteos al final de cada etapa)
+        asegurar_logging()
+        self.eventos = ContadorEventos()
+        self.trazadora_processor.eventos = self.eventos
 
     def find_files_by_pattern(self, pattern, description="archivo"):
         """Buscar archivos automáticamente por patrón"""
@@ -124,9 +575,10 @@ class GESDataProcessor:
                     f"reporte_consulta_{month_pat}.csv",
                     f"{month_pat}consulta*.csv", 
                     f"consultas_{month_pat}.csv",
-                    f"reporte_consulta*.csv",  # Fallback
-                    f"*consulta*.csv"
                 ])
+            if not month_filter:
+                # Fallback (con mes, solo archivos de ese mes)
+                consultas_patterns.extend([f"reporte_consulta*.csv", f"*consulta*.csv"])
             
             for pattern in consultas_patterns:
                 consultas_file = self.find_files_by_pattern(pattern, "archivo de consultas")
@@ -141,9 +593,9 @@ class GESDataProcessor:
                     f"reporte_farmacia_{month_pat}.csv",
                     f"{month_pat}farmacia*.csv",
                     f"farmacia_{month_pat}.csv",
-                    f"reporte_farmacia*.csv",  # Fallback
-                    f"*farmacia*.csv"
                 ])
+            if not month_filter:
+                farmacia_patterns.extend([f"reporte_farmacia*.csv", f"*farmacia*.csv"])
             
             for pattern in farmacia_patterns:
                 farmacia_file = self.find_files_by_pattern(pattern, "archivo de farmacia")
@@ -157,9 +609,9 @@ class GESDataProcessor:
                 recetas_patterns.extend([
                     f"recetas*{month_pat}*.xlsx",
                     f"recetas*{month_pat}*.xls",
-                    f"recetas*.xlsx",  # Fallback
-                    f"recetas*.xls"
                 ])
+            if not month_filter:
+                recetas_patterns.extend([f"recetas*.xlsx", f"recetas*.xls"])
             
             # Buscar TODOS los archivos de recetas (uno por patología)
             recetas_files = []
@@ -170,7 +622,7 @@ class GESDataProcessor:
                     recetas_files.extend(found)
             
             if recetas_files:
-                self.selected_files['recetas_ges'] = list(set(recetas_files))  # Eliminar duplicados
+                self.selected_files['recetas_ges'] = sorted(set(recetas_files))  # Eliminar duplicados, orden estable
                 print(f"✓ Archivos de recetas GES encontrados: {len(self.selected_files['recetas_ges'])}")
                     
         else:
@@ -218,50 +670,23 @@ class GESDataProcessor:
         
         return len(self.selected_files) > 0
 
-    def load_data(self):
-        """Cargar todos los archivos de datos"""
+    def load_data(self, month_filter=None):
+        """Cargar todos los archivos de datos (month_filter: solo los archivos de ese mes, ej. "ago")"""
         print("\n📊 CARGANDO ARCHIVOS DE DATOS...")
 
         try:
             # Configurar archivos de entrada primero
-            if not self.setup_input_files():
+            if not self.setup_input_files(month_filter):
                 print("❌ No se pudieron configurar los archivos de entrada")
                 return False
 
             # Cargar población GES (archivo fijo)
-            ges_file = os.path.join(self.inputs_path, "RUT_pob_ges.xlsx")
-            if os.path.exists(ges_file):
-                self.ges_df = pd.read_excel(ges_file)
-                print(f"✓ Población GES: {len(self.ges_df)} pacientes")
-            else:
-                print("❌ No se encontró archivo RUT_pob_ges.xlsx")
+            if not self.load_poblacion_ges():
                 return False
 
-            # Cargar consultas usando archivo seleccionado
-            if 'consultas' in self.selected_files and self.selected_files['consultas']:
-                self.consulta_df = self.load_csv_safely(self.selected_files['consultas'])
-                if self.consulta_df is not None:
-                    # Normalizar DV a mayúsculas
-                    self.consulta_df = self.normalize_dv_in_dataframe(self.consulta_df)
-                    print(f"✓ Consultas: {len(self.consulta_df)} registros")
-            else:
-                print("⚠️  No se configuró archivo de consultas")
-
-            # Cargar farmacia usando archivo seleccionado
-            if 'farmacia' in self.selected_files and self.selected_files['farmacia']:
-                self.farmacia_df = self.load_csv_safely(self.selected_files['farmacia'])
-                if self.farmacia_df is not None:
-                    # Normalizar DV a mayúsculas
-                    self.farmacia_df = self.normalize_dv_in_dataframe(self.farmacia_df)
-                    # Combinar RUT
-                    self.farmacia_df["RUT_Combined"] = [
-                        self.format_rut(row["RutPaciente"], row["DVPaciente"])
-                        for _, row in self.farmacia_df.iterrows()
-                    ]
-                    self.farmacia_df = self.farmacia_df.dropna(subset=["RUT_Combined"])
-                    print(f"✓ Farmacia: {len(self.farmacia_df)} registros")
-            else:
-                print("⚠️  No se configuró archivo de farmacia")
+            # Cargar consultas y farmacia usando archivos seleccionados
+            self.load_consultas()
+            self.load_farmacia()
 
             # Buscar archivo de medicamentos GES
             self.load_medicamentos_ges()
@@ -281,21 +706,96 @@ class GESDataProcessor:
             print(f"❌ Error cargando datos: {e}")
             return False
 
+    def _leer_con_cache(self, nombre, archivos, cargar, parametros=None):
+        """Cargar una entrada a través de la caché en disco (outputs/.cache)"""
+        return self.cache_entradas.obtener(nombre, archivos, cargar, parametros)
+
+    def load_poblacion_ges(self):
+        """Cargar población GES (archivo fijo) y construir su índice"""
+        ges_file = os.path.join(self.inputs_path, ARCHIVO_POBLACION_GES)
+        if not os.path.exists(ges_file):
+            print("❌ No se encontró archivo RUT_pob_ges.xlsx")
+            return False
+
+        self.ges_df = self._leer_con_cache("poblacion_ges", [ges_file], lambda: pd.read_excel(ges_file))
+        self.build_ges_index()
+        print(f"✓ Población GES: {len(self.ges_df)} pacientes")
+        return True
+
+    def load_consultas(self):
+        """Cargar consultas del archivo seleccionado, filtradas a la población GES si se lee en bloques"""
+        if not self.selected_files.get('consultas'):
+            print("⚠️  No se configuró archivo de consultas")
+            return
+        archivo_consultas = self.selected_files['consultas']
+
+        def cargar_consultas():
+            df = self.load_csv_safely(
+                archivo_consultas,
+                chunksize=self.csv_chunksize,
+                filtro_filas=self.filtro_consultas_ges() if self.csv_chunksize else None,
+                esquema="consultas",
+            )
+            # Normalizar DV a mayúsculas
+            return self.normalize_dv_in_dataframe(df)
+
+        # El filtro depende de la población GES: su archivo también forma parte de la clave
+        self.consulta_df = self._leer_con_cache(
+            "consultas",
+            [archivo_consultas, os.path.join(self.inputs_path, ARCHIVO_POBLACION_GES)],
+            cargar_consultas,
+            {"esquema": ESQUEMAS_ENTRADA["consultas"], "filtro_ges": bool(self.csv_chunksize)},
+        )
+        if self.consulta_df is not None:
+            print(f"✓ Consultas: {len(self.consulta_df)} registros")
+
+    def load_farmacia(self):
+        """Cargar despachos de farmacia del archivo seleccionado, con RUT combinado"""
+        if not self.selected_files.get('farmacia'):
+            print("⚠️  No se configuró archivo de farmacia")
+            return
+        archivo_farmacia = self.selected_files['farmacia']
+
+        def cargar_farmacia():
+            df = self.load_csv_safely(
+                archivo_farmacia,
+                chunksize=self.csv_chunksize,
+                filtro_filas=self.filtro_farmacia_ges() if self.csv_chunksize else None,
+                esquema="farmacia",
+            )
+            if df is None:
+                return None
+            # Normalizar DV a mayúsculas
+            df = self.normalize_dv_in_dataframe(df)
+            # Combinar RUT
+            df["RUT_Combined"] = format_rut_series(df["RutPaciente"], df["DVPaciente"])
+            return df.dropna(subset=["RUT_Combined"])
+
+        self.farmacia_df = self._leer_con_cache(
+            "farmacia",
+            [archivo_farmacia, os.path.join(self.inputs_path, ARCHIVO_POBLACION_GES)],
+            cargar_farmacia,
+            {
+                "esquema": ESQUEMAS_ENTRADA["farmacia"],
+                "filtro_ges": bool(self.csv_chunksize),
+                "revision": MEDICAMENTOS_REVISION_NO_GES,
+            },
+        )
+        if self.farmacia_df is not None:
+            print(f"✓ Farmacia: {len(self.farmacia_df)} registros")
+
     def load_medicamentos_ges(self):
         """Cargar archivo de medicamentos GES"""
-        possible_files = [
-            "Medicamentos GES (1).xlsx",
-            "Medicamentos GES (1).csv",
-            "medicamentos_ges.xlsx",
-            "medicamentos_ges.csv",
-        ]
+        possible_files = ARCHIVOS_MEDICAMENTOS_GES
 
         for filename in possible_files:
             filepath = os.path.join(self.inputs_path, filename)
             if os.path.exists(filepath):
                 try:
                     if filename.endswith(".xlsx"):
-                        self.medicamentos_ges_df = pd.read_excel(filepath)
+                        self.medicamentos_ges_df = self._leer_con_cache(
+                            "medicamentos_ges", [filepath], lambda: pd.read_excel(filepath)
+                        )
                     else:
                         self.medicamentos_ges_df = self.load_csv_safely(filepath)
 
@@ -310,20 +810,14 @@ class GESDataProcessor:
 
     def load_clasificacion_paliativos(self):
         """Cargar archivo de clasificación de paliativos"""
-        possible_files = [
-            "clasificacion paliativos.xlsx",
-            "clasificacion_paliativos.xlsx", 
-            "Clasificacion Paliativos.xlsx",
-            "clasificacion paliativos.csv",
-            "clasificacion_paliativos.csv"
-        ]
+        possible_files = ARCHIVOS_CLASIFICACION_PALIATIVOS
 
         for filename in possible_files:
             filepath = os.path.join(self.inputs_path, filename)
             if os.path.exists(filepath):
                 try:
                     if filename.endswith(".xlsx"):
-                        df = pd.read_excel(filepath)
+                        df = self._leer_con_cache("clasificacion_paliativos", [filepath], lambda: pd.read_excel(filepath))
                     else:
                         # Intentar con punto y coma primero (formato correcto)
                         df = pd.read_csv(filepath, sep=';', encoding='latin-1')
@@ -333,6 +827,7 @@ class GESDataProcessor:
 
                     if df is not None and len(df) > 0:
                         self.clasificacion_paliativos_df = df
+                        self.build_clasificacion_paliativos_index()
                         print(f"✓ Clasificación Paliativos: {len(df)} registros")
                         print(f"  Columnas disponibles: {list(df.columns)}")
                         
@@ -353,28 +848,24 @@ class GESDataProcessor:
         print("⚠️  No se encontró archivo de clasificación de paliativos")
         print("   Archivos esperados:", possible_files)
         self.clasificacion_paliativos_df = None
+        self.build_clasificacion_paliativos_index()
 
     def load_severidad_fq(self):
         """Cargar archivo de severidad de Fibrosis Quística"""
-        possible_files = [
-            "severidad_FQ.xlsx",
-            "severidad_fq.xlsx", 
-            "Severidad_FQ.xlsx",
-            "severidad_FQ.csv",
-            "severidad_fq.csv"
-        ]
+        possible_files = ARCHIVOS_SEVERIDAD_FQ
 
         for filename in possible_files:
             filepath = os.path.join(self.inputs_path, filename)
             if os.path.exists(filepath):
                 try:
                     if filename.endswith(".xlsx"):
-                        df = pd.read_excel(filepath)
+                        df = self._leer_con_cache("severidad_fq", [filepath], lambda: pd.read_excel(filepath))
                     else:
                         df = pd.read_csv(filepath, sep=',')
 
                     if df is not None:
                         self.severidad_fq_df = df
+                        self.build_severidad_fq_index()
                         print(f"✓ Severidad FQ: {len(df)} registros")
                         print(f"  Columnas disponibles: {list(df.columns)}")
                         return
@@ -384,40 +875,133 @@ class GESDataProcessor:
         print("⚠️  No se encontró archivo de severidad FQ")
         print("   Archivos esperados:", possible_files)
         self.severidad_fq_df = None
+        self.build_severidad_fq_index()
+
+    def build_severidad_fq_index(self):
+        """Construir índice RUT (sin DV) → severidad FQ en una sola pasada"""
+        self.severidad_fq_map = {}
+        self.severidad_fq_rut_column = None
+        self._severidad_fq_source = self.severidad_fq_df
+
+        df = self.severidad_fq_df
+        if df is None:
+            return self.severidad_fq_map
+
+        # Buscar en diferentes posibles nombres de columna RUT
+        for col in ['RUT', 'Rut', 'rut', 'Rut ']:
+            if col in df.columns:
+                self.severidad_fq_rut_column = col
+                break
+
+        if self.severidad_fq_rut_column is None:
+            return self.severidad_fq_map
+
+        # Extraer solo el número del RUT (sin DV); ante repetidos gana la primera fila
+        ruts = df[self.severidad_fq_rut_column].astype(str).str.split('-').str[0].tolist()
+        if 'Severidad' in df.columns:
+            severidades = df['Severidad'].tolist()
+        else:
+            severidades = [None] * len(ruts)
+
+        for rut, severidad in zip(ruts, severidades):
+            self.severidad_fq_map.setdefault(rut, severidad)
+
+        return self.severidad_fq_map
+
+    def _get_severidad_fq_map(self):
+        """Retornar el índice de severidad FQ, reconstruyéndolo si el DataFrame cambió"""
+        if self._severidad_fq_source is not self.severidad_fq_df:
+            self.build_severidad_fq_index()
+        return self.severidad_fq_map
+
+    def build_clasificacion_paliativos_index(self):
+        """Construir índice RUT → condición de paliativos en una sola pasada"""
+        self.clasificacion_paliativos_map = {}
+        self.clasificacion_paliativos_rut_column = None
+        self.clasificacion_paliativos_tipo_column = None
+        self._clasificacion_paliativos_source = self.clasificacion_paliativos_df
+
+        df = self.clasificacion_paliativos_df
+        if df is None:
+            return self.clasificacion_paliativos_map
+
+        for col in ['RUT', 'Rut', 'rut']:
+            if col in df.columns:
+                self.clasificacion_paliativos_rut_column = col
+                break
+
+        for col in ['condicion', 'Tipo', 'tipo', 'Condicion']:
+            if col in df.columns:
+                self.clasificacion_paliativos_tipo_column = col
+                break
+
+        if self.clasificacion_paliativos_rut_column is None:
+            return self.clasificacion_paliativos_map
+
+        # Se indexa por el valor tal como viene (número o "12345678-9"),
+        # igual que la comparación directa contra la columna
+        ruts = df[self.clasificacion_paliativos_rut_column].tolist()
+        if self.clasificacion_paliativos_tipo_column is not None:
+            tipos = df[self.clasificacion_paliativos_tipo_column].tolist()
+        else:
+            tipos = [None] * len(ruts)
+
+        for rut, tipo in zip(ruts, tipos):
+            if pd.isna(rut):
+                continue
+            self.clasificacion_paliativos_map.setdefault(rut, tipo)
+
+        return self.clasificacion_paliativos_map
+
+    def _get_clasificacion_paliativos_map(self):
+        """Retornar el índice de paliativos, reconstruyéndolo si el DataFrame cambió"""
+        if self._clasificacion_paliativos_source is not self.clasificacion_paliativos_df:
+            self.build_clasificacion_paliativos_index()
+        return self.clasificacion_paliativos_map
+
+    def tablas_referencia(self):
+        """Tablas de referencia cargadas {atributo: DataFrame}, para enviarlas a otro proceso (modo lote)"""
+        return {atributo: getattr(self, atributo) for atributo in TABLAS_REFERENCIA}
+
+    def usar_tablas_referencia(self, tablas):
+        """Usar tablas de referencia cargadas en otro procesador y construir sus índices"""
+        for atributo, df in tablas.items():
+            setattr(self, atributo, df)
+        self.build_ges_index()
+        self.build_severidad_fq_index()
+        self.build_clasificacion_paliativos_index()
+
+    def compartir_referencias(self, otro):
+        """Tomar las tablas de referencia de `otro` con sus índices ya construidos (sin copiar ni reindexar)"""
+        for atributo in TABLAS_REFERENCIA + INDICES_REFERENCIA:
+            setattr(self, atributo, getattr(otro, atributo))
+        self.trazadora_processor.compartir_referencias(otro.trazadora_processor)
 
     def determinar_severidad_fq(self, rut):
         """Determina la severidad de Fibrosis Quística para un RUT"""
         try:
             if self.severidad_fq_df is None:
-                print(f"⚠️ FQ SIN BD: RUT {rut} - No hay base de datos de severidad FQ cargada")
+                self.eventos.registrar("FQ sin base de severidad (LEVE por defecto)",
+                                       "⚠️ FQ SIN BD: RUT %s - No hay base de datos de severidad FQ cargada", rut)
                 return "leve"  # Default
             
             # Convertir RUT a string para comparación
             rut_str = str(rut).split('-')[0]  # Quitar DV si existe
             
-            # Buscar en diferentes posibles nombres de columna RUT
-            rut_column = None
-            for col in ['RUT', 'Rut', 'rut', 'Rut ']:
-                if col in self.severidad_fq_df.columns:
-                    rut_column = col
-                    break
-            
-            if rut_column is None:
-                print(f"⚠️ FQ SIN COLUMNA RUT: RUT {rut} - No se encontró columna RUT en la base de datos")
-                print(f"   Columnas disponibles: {list(self.severidad_fq_df.columns)}")
+            severidad_map = self._get_severidad_fq_map()
+            if self.severidad_fq_rut_column is None:
+                self.eventos.registrar("FQ sin columna RUT (LEVE por defecto)",
+                                       "⚠️ FQ SIN COLUMNA RUT: RUT %s - No se encontró columna RUT en la base de datos. "
+                                       "Columnas disponibles: %s", rut, list(self.severidad_fq_df.columns))
                 return "leve"
             
-            # Extraer solo el número del RUT (sin DV) de la columna
-            rut_series = self.severidad_fq_df[rut_column].astype(str).str.split('-').str[0]
-            mask = rut_series == rut_str
-            
-            if mask.any():
-                severidad_row = self.severidad_fq_df[mask]
-                severidad_raw = severidad_row['Severidad'].iloc[0]
+            if rut_str in severidad_map:
+                severidad_raw = severidad_map[rut_str]
                 
                 # Verificar si el campo está vacío
                 if pd.isna(severidad_raw) or str(severidad_raw).strip() == '' or str(severidad_raw).lower() in ['nan', 'none', 'null']:
-                    print(f"⚠️ FQ CAMPO VACÍO: RUT {rut} - Campo 'Severidad' está vacío")
+                    self.eventos.registrar("FQ con severidad vacía (LEVE por defecto)",
+                                           "⚠️ FQ CAMPO VACÍO: RUT %s - Campo 'Severidad' está vacío", rut)
                     return "leve"  # Default para continuar procesamiento
                 
                 severidad = str(severidad_raw).upper().strip()
@@ -430,14 +1014,17 @@ class GESDataProcessor:
                 elif severidad in ['LEVE']:
                     return "leve"
                 else:
-                    print(f"⚠️ FQ SEVERIDAD DESCONOCIDA: RUT {rut} - Severidad '{severidad}' no reconocida")
+                    self.eventos.registrar("FQ con severidad no reconocida (LEVE por defecto)",
+                                           "⚠️ FQ SEVERIDAD DESCONOCIDA: RUT %s - Severidad '%s' no reconocida", rut, severidad)
                     return "leve"
             else:
-                print(f"⚠️ FQ NO ENCONTRADO: RUT {rut} - No existe en la base de datos de severidad FQ")
+                self.eventos.registrar("FQ sin severidad registrada (LEVE por defecto)",
+                                       "⚠️ FQ NO ENCONTRADO: RUT %s - No existe en la base de datos de severidad FQ", rut)
                 return "leve"  # Default si no se encuentra
                 
         except Exception as e:
-            print(f"❌ Error determinando severidad FQ para RUT {rut}: {e}")
+            self.eventos.registrar("Errores determinando severidad FQ",
+                                   "❌ Error determinando severidad FQ para RUT %s: %s", rut, e, nivel=logging.WARNING)
             return "leve"
 
     def esta_en_poblacion_ges(self, rut):
@@ -460,21 +1047,10 @@ class GESDataProcessor:
                 rut_numero = int(rut_str.split('-')[0])
             else:
                 rut_numero = int(rut_str)
-                
-            # Buscar en población GES usando diferentes posibles nombres de columna
-            for col in ['RUT', 'Rut', 'rut', 'RUT_PACIENTE']:
-                if col in self.ges_df.columns:
-                    # Buscar por RUT numérico
-                    match = self.ges_df[self.ges_df[col] == rut_numero]
-                    if not match.empty:
-                        return True
-                    
-                    # Buscar por RUT completo (con DV)
-                    match = self.ges_df[self.ges_df[col].astype(str) == rut_str]
-                    if not match.empty:
-                        return True
-            
-            return False
+
+            self._get_ges_index()
+            # Buscar por RUT numérico o por RUT completo (con DV)
+            return rut_numero in self.ges_ruts_valores or rut_str in self.ges_ruts_texto
             
         except (ValueError, TypeError):
             return False
@@ -493,7 +1069,8 @@ class GESDataProcessor:
                 return "no_ges"
                 
             if self.clasificacion_paliativos_df is None:
-                print(f"⚠️ RUT {rut}: No se encontró clasificación paliativos, usando NO PROGRESIVO por defecto")
+                self.eventos.registrar("Paliativos sin base de clasificación (NO PROGRESIVO por defecto)",
+                                       "⚠️ RUT %s: No se encontró clasificación paliativos, usando NO PROGRESIVO por defecto", rut)
                 return "no_progresivo"
             
             # Extraer solo la parte numérica del RUT (sin dígito verificador)
@@ -507,47 +1084,40 @@ class GESDataProcessor:
                 
                 # Convertir a entero
                 rut_int = int(rut_numero)
-                print(f"🔬 DEBUG PALIATIVO: RUT original '{rut}' → RUT procesado '{rut_int}'")
+                self.eventos.logger.debug("🔬 DEBUG PALIATIVO: RUT original '%s' → RUT procesado '%s'", rut, rut_int)
                 
             except ValueError:
-                print(f"⚠️ PALIATIVO RUT INVÁLIDO: {rut} - No se puede extraer número del RUT")
+                self.eventos.registrar("Paliativos con RUT inválido",
+                                       "⚠️ PALIATIVO RUT INVÁLIDO: %s - No se puede extraer número del RUT", rut)
                 return None
             
-            # Buscar el RUT en el archivo de clasificación usando diferentes posibles columnas
-            rut_column = None
-            for col in ['RUT', 'Rut', 'rut']:
-                if col in self.clasificacion_paliativos_df.columns:
-                    rut_column = col
-                    break
-            
-            if rut_column is None:
-                print(f"⚠️ PALIATIVO SIN COLUMNA RUT: RUT {rut} - No se encontró columna RUT en la BD")
+            # Buscar el RUT en el índice de clasificación (construido al cargar el archivo)
+            clasificacion_map = self._get_clasificacion_paliativos_map()
+            if self.clasificacion_paliativos_rut_column is None:
+                self.eventos.registrar("Paliativos sin columna RUT",
+                                       "⚠️ PALIATIVO SIN COLUMNA RUT: RUT %s - No se encontró columna RUT en la BD", rut)
                 return None
             
-            # Buscar por RUT numérico (sin DV)
-            clasificacion_row = self.clasificacion_paliativos_df[self.clasificacion_paliativos_df[rut_column] == rut_int]
-            
-            # Si no encuentra por número, intentar buscar por RUT completo (con DV)
-            if clasificacion_row.empty:
-                clasificacion_row = self.clasificacion_paliativos_df[self.clasificacion_paliativos_df[rut_column] == rut_str]
+            # Buscar por RUT numérico (sin DV) y, si no, por RUT completo (con DV)
+            if rut_int in clasificacion_map:
+                encontrado, tipo_raw = True, clasificacion_map[rut_int]
+            elif rut_str in clasificacion_map:
+                encontrado, tipo_raw = True, clasificacion_map[rut_str]
+            else:
+                encontrado, tipo_raw = False, None
             
-            if not clasificacion_row.empty:
-                # Determinar cuál columna usar para el tipo/condición
-                tipo_column = None
-                for col in ['condicion', 'Tipo', 'tipo', 'Condicion']:
-                    if col in self.clasificacion_paliativos_df.columns:
-                        tipo_column = col
-                        break
-                
+            if encontrado:
+                tipo_column = self.clasificacion_paliativos_tipo_column
                 if tipo_column is None:
-                    print(f"⚠️ PALIATIVO SIN COLUMNA TIPO: RUT {rut} - No se encontró columna de tipo/condición")
+                    self.eventos.registrar("Paliativos sin columna de tipo/condición",
+                                           "⚠️ PALIATIVO SIN COLUMNA TIPO: RUT %s - No se encontró columna de tipo/condición", rut)
                     return None
                 
-                tipo_raw = clasificacion_row.iloc[0][tipo_column]
-                
                 # Verificar si el campo está vacío o es NaN
                 if pd.isna(tipo_raw) or str(tipo_raw).strip() == '' or str(tipo_raw).lower() in ['nan', 'none', 'null']:
-                    print(f"⚠️ PALIATIVO CAMPO VACÍO: RUT {rut} - Campo '{tipo_column}' está vacío en la base de datos")
+                    self.eventos.registrar("Paliativos con condición vacía",
+                                           "⚠️ PALIATIVO CAMPO VACÍO: RUT %s - Campo '%s' está vacío en la base de datos",
+                                           rut, tipo_column)
                     return "campo_vacio"
                 
                 condicion = str(tipo_raw).upper().strip()
@@ -556,18 +1126,22 @@ class GESDataProcessor:
                 # TODOS son progresivos EXCEPTO: CP-NO, DC-NO, DO NO, NP
                 if condicion in ['CP-NO', 'DC-NO', 'DO NO', 'NP']:
                     # Estos específicos son no progresivos
-                    print(f"🎯 PALIATIVO NO PROGRESIVO: RUT {rut} - Condición '{condicion}'")
+                    self.eventos.registrar("Paliativos no progresivos",
+                                           "🎯 PALIATIVO NO PROGRESIVO: RUT %s - Condición '%s'", rut, condicion)
                     return "no_progresivo"
                 else:
                     # Todos los demás (I, D, T, E, etc.) son progresivos
-                    print(f"🎯 PALIATIVO PROGRESIVO: RUT {rut} - Condición '{condicion}'")
+                    self.eventos.registrar("Paliativos progresivos",
+                                           "🎯 PALIATIVO PROGRESIVO: RUT %s - Condición '%s'", rut, condicion)
                     return "progresivo"
             else:
-                print(f"⚠️ RUT {rut}: No se encontró clasificación paliativos, usando NO PROGRESIVO por defecto")
+                self.eventos.registrar("Paliativos sin clasificación (NO PROGRESIVO por defecto)",
+                                       "⚠️ RUT %s: No se encontró clasificación paliativos, usando NO PROGRESIVO por defecto", rut)
                 return "no_progresivo"
                 
         except Exception as e:
-            print(f"❌ Error determinando tipo paliativo para RUT {rut}: {e}")
+            self.eventos.registrar("Errores determinando tipo paliativo",
+                                   "❌ Error determinando tipo paliativo para RUT %s: %s", rut, e, nivel=logging.WARNING)
             return None
 
     def load_recetas_ges(self):
@@ -582,111 +1156,39 @@ class GESDataProcessor:
         
         print(f"\n💊 CARGANDO ARCHIVOS DE RECETAS GES...")
         
+        # Primero la caché; los archivos que falten se leen en paralelo
+        parametros = {"esquema": ESQUEMAS_ENTRADA["recetas"]}
+        resultados = {}
+        for indice, filepath in enumerate(recetas_files):
+            salida = io.StringIO()
+            with contextlib.redirect_stdout(salida):
+                df = self.cache_entradas.buscar(f"recetas_{os.path.basename(filepath)}", [filepath], parametros)
+            if df is not None:
+                resultados[indice] = (df, salida.getvalue(), None)
+
+        pendientes = [indice for indice in range(len(recetas_files)) if indice not in resultados]
+        leidos = self._leer_archivos_recetas([recetas_files[indice] for indice in pendientes])
+        for indice, resultado in zip(pendientes, leidos):
+            resultados[indice] = resultado
+            if resultado[0] is not None:
+                filepath = recetas_files[indice]
+                self.cache_entradas.guardar(f"recetas_{os.path.basename(filepath)}", [filepath], resultado[0], parametros)
+
+        # Unir en el orden de los archivos, sin importar cuál terminó primero
         all_recetas = []
-        for filepath in recetas_files:
-            try:
-                filename = os.path.basename(filepath)
-                print(f"  📄 Procesando: {filename}")
-                
-                # Leer archivo Excel o HTML (muchos .xls son HTML descargados)
-                df = None
-                try:
-                    if filepath.endswith('.xls'):
-                        df = pd.read_excel(filepath, engine='xlrd')
-                    else:
-                        df = pd.read_excel(filepath)
-                except Exception as xls_error:
-                    # Si falla, intentar como HTML (muchos .xls descargados son HTML)
-                    try:
-                        print(f"    ℹ️  Leyendo como HTML (archivo no es XLS válido)...")
-                        all_tables = pd.read_html(filepath)
-                        # La tabla 0 es metadata, la tabla 1 es los datos reales
-                        if len(all_tables) >= 2:
-                            df = all_tables[1]
-                        elif len(all_tables) == 1:
-                            df = all_tables[0]
-                        else:
-                            raise Exception("No se encontraron tablas HTML")
-                        
-                        # Si las columnas son numéricas [0,1,2...], la primera fila tiene los nombres
-                        if len(df) > 0 and all(isinstance(col, int) for col in df.columns):
-                            # Usar primera fila como encabezados
-                            header_row = df.iloc[0].tolist()
-                            df.columns = header_row
-                            df = df[1:].reset_index(drop=True)
-                    except Exception as html_error:
-                        raise Exception(f"No se pudo leer como XLS ni HTML: {xls_error} / {html_error}")
-                
-                if df is None or df.empty:
-                    print(f"    ❌ DataFrame vacío después de leer {filename}")
-                    continue
-                
-                # Mapear nombres de columnas a formato estándar
-                column_mapping = {
-                    'FECHA': 'FechaEmision',
-                    'FECHA EMISIÓN': 'FechaEmision',
-                    'FECHA EMISION': 'FechaEmision',
-                    'RUT': 'RutPaciente',
-                    'RUT PACIENTE': 'RutPaciente',
-                    'DÍGITO': 'DVPaciente',
-                    'DÍGITO PACIENTE': 'DVPaciente',
-                    'DIGITO': 'DVPaciente',
-                    'DIGITO PACIENTE': 'DVPaciente',
-                    'NOMBRE MEDICAMENTO': 'Farmaco_Desc',
-                    'MEDICAMENTO': 'Farmaco_Desc',
-                    'MEDICAMENTOS': 'Farmaco_Desc',
-                    'NOMBRE MEDICINA': 'Farmaco_Desc',
-                    'CANT.': 'CantidadDespachada',
-                    'CANT': 'CantidadDespachada',
-                    'CANTIDAD': 'CantidadDespachada',
-                    'POLICLÍNICO': 'LocalSolicitante',
-                    'POLICLINICO': 'LocalSolicitante',
-                    'NOMBRE PACIENTE': 'NombrePaciente',
-                    'NOMBRE': 'NombrePaciente',
-                    'EDAD': 'EdadPaciente',
-                    'PREVISIÓN': 'Prevision',
-                    'PREVISION': 'Prevision',
-                    'UM': 'UnidadMedida',
-                    'UNIDAD': 'UnidadMedida',
-                    'DURACIÓN': 'DuracionReceta',
-                    'DURACIÓN RECETA': 'DuracionReceta',
-                    'DURACION': 'DuracionReceta',
-                    'DURACION RECETA': 'DuracionReceta',
-                    'COMUNA': 'Comuna',
-                }
-                
-                # Renombrar columnas (case-insensitive)
-                df.columns = df.columns.str.upper()
-                df_renamed = df.rename(columns=column_mapping)
-                
-                # Normalizar DV a mayúsculas
-                df_renamed = self.normalize_dv_in_dataframe(df_renamed)
-                
-                # Verificar columnas críticas
-                required = ['FechaEmision', 'RutPaciente', 'DVPaciente', 'Farmaco_Desc']
-                missing = [col for col in required if col not in df_renamed.columns]
-                
-                if missing:
-                    print(f"    ⚠️  Columnas faltantes en {filename}: {missing}")
-                    print(f"    Columnas disponibles: {list(df.columns)}")
-                    continue
-                
-                # Agregar columna RUT_Combined
-                df_renamed['RUT_Combined'] = df_renamed.apply(
-                    lambda row: self.format_rut(row['RutPaciente'], row['DVPaciente']),
-                    axis=1
-                )
-                
-                # Marcar origen como 'recetas'
-                df_renamed['_origen'] = 'recetas'
-                
-                all_recetas.append(df_renamed)
-                print(f"    ✅ Cargadas {len(df_renamed)} prescripciones")
-                
-            except Exception as e:
-                print(f"    ❌ Error cargando {filepath}: {e}")
+        for indice, filepath in enumerate(recetas_files):
+            df_renamed, salida, error = resultados[indice]
+            print(f"  📄 Procesando: {os.path.basename(filepath)}")
+            print(salida, end="")
+            if error is not None:
+                print(f"    ❌ Error cargando {filepath}: {error}")
                 continue
-        
+            if df_renamed is None:
+                continue
+
+            all_recetas.append(df_renamed)
+            print(f"    ✅ Cargadas {len(df_renamed)} prescripciones")
+
         if all_recetas:
             self.recetas_ges_df = pd.concat(all_recetas, ignore_index=True)
             self.recetas_ges_df = self.recetas_ges_df.dropna(subset=['RUT_Combined'])
@@ -696,10 +1198,150 @@ class GESDataProcessor:
             print("⚠️  No se pudieron cargar archivos de recetas GES")
             self.recetas_ges_df = None
 
-    def load_csv_safely(self, filename, separator=";"):
-        """Cargar CSV con manejo de errores y normalización de DV"""
+    def _leer_archivos_recetas(self, archivos):
+        """Leer archivos de recetas en un pool de procesos; resultados en el orden de `archivos`"""
+        procesos = min(len(archivos), self.recetas_procesos or os.cpu_count() or 1)
+        if procesos > 1:
+            try:
+                with ProcessPoolExecutor(max_workers=procesos) as pool:
+                    return list(pool.map(_leer_recetas_aislado, archivos))
+            except (OSError, BrokenProcessPool) as e:
+                print(f"  ⚠️  No se pudo leer recetas en paralelo ({e}), leyendo en secuencia")
+
+        return [_leer_recetas_aislado(filepath, self) for filepath in archivos]
+
+    def leer_archivo_recetas(self, filepath):
+        """Leer un archivo de recetas GES y normalizarlo al esquema de recetas (None si no sirve)"""
+        filename = os.path.basename(filepath)
+
+        # Detectar el formato por contenido (muchos .xls son HTML descargados)
+        formato = detectar_formato_planilla(filepath)
+        if formato == "html":
+            print(f"    ℹ️  Leyendo como HTML (contenido HTML en {filename})...")
+            df = leer_tabla_datos_html(filepath)
+        elif formato == "xls":
+            df = pd.read_excel(filepath, engine='xlrd')
+        elif formato == "xlsx":
+            df = pd.read_excel(filepath, engine='openpyxl')
+        else:
+            # Formato no reconocido: intentar Excel según extensión y luego HTML
+            try:
+                if filepath.endswith('.xls'):
+                    df = pd.read_excel(filepath, engine='xlrd')
+                else:
+                    df = pd.read_excel(filepath)
+            except Exception as xls_error:
+                try:
+                    print(f"    ℹ️  Leyendo como HTML (archivo no es XLS válido)...")
+                    df = leer_tabla_datos_html(filepath)
+                except Exception as html_error:
+                    raise Exception(f"No se pudo leer como XLS ni HTML: {xls_error} / {html_error}")
+        
+        if df is None or df.empty:
+            print(f"    ❌ DataFrame vacío después de leer {filename}")
+            return None
+        
+        # Mapear nombres de columnas a formato estándar
+        column_mapping = {
+            'FECHA': 'FechaEmision',
+            'FECHA EMISIÓN': 'FechaEmision',
+            'FECHA EMISION': 'FechaEmision',
+            'RUT': 'RutPaciente',
+            'RUT PACIENTE': 'RutPaciente',
+            'DÍGITO': 'DVPaciente',
+            'DÍGITO PACIENTE': 'DVPaciente',
+            'DIGITO': 'DVPaciente',
+            'DIGITO PACIENTE': 'DVPaciente',
+            'NOMBRE MEDICAMENTO': 'Farmaco_Desc',
+            'MEDICAMENTO': 'Farmaco_Desc',
+            'MEDICAMENTOS': 'Farmaco_Desc',
+            'NOMBRE MEDICINA': 'Farmaco_Desc',
+            'CANT.': 'CantidadDespachada',
+            'CANT': 'CantidadDespachada',
+            'CANTIDAD': 'CantidadDespachada',
+            'POLICLÍNICO': 'LocalSolicitante',
+            'POLICLINICO': 'LocalSolicitante',
+            'NOMBRE PACIENTE': 'NombrePaciente',
+            'NOMBRE': 'NombrePaciente',
+            'EDAD': 'EdadPaciente',
+            'PREVISIÓN': 'Prevision',
+            'PREVISION': 'Prevision',
+            'UM': 'UnidadMedida',
+            'UNIDAD': 'UnidadMedida',
+            'DURACIÓN': 'DuracionReceta',
+            'DURACIÓN RECETA': 'DuracionReceta',
+            'DURACION': 'DuracionReceta',
+            'DURACION RECETA': 'DuracionReceta',
+            'COMUNA': 'Comuna',
+        }
+        
+        # Renombrar columnas (case-insensitive)
+        df.columns = df.columns.str.upper()
+        df_renamed = df.rename(columns=column_mapping)
+        
+        # Normalizar DV a mayúsculas
+        df_renamed = self.normalize_dv_in_dataframe(df_renamed)
+        
+        # Verificar columnas críticas y dejar solo las del esquema de recetas
+        try:
+            tipos = self.validar_esquema_entrada(df_renamed.columns, "recetas", filename)
+        except ValueError as e:
+            print(f"    ⚠️  Columnas faltantes: {e}")
+            print(f"    Columnas disponibles: {list(df.columns)}")
+            return None
+        df_renamed = df_renamed[list(tipos)].astype({col: tipo for col, tipo in tipos.items() if tipo})
+        
+        # Agregar columna RUT_Combined
+        df_renamed['RUT_Combined'] = format_rut_series(
+            df_renamed['RutPaciente'], df_renamed['DVPaciente']
+        )
+        
+        # Marcar origen como 'recetas'
+        df_renamed['_origen'] = 'recetas'
+
+        return df_renamed
+
+    def load_csv_safely(self, filename, separator=";", chunksize=None, filtro_filas=None, esquema=None):
+        """
+        Cargar CSV con manejo de errores y normalización de DV.
+
+        Con `chunksize` el archivo se lee en bloques y a cada bloque se le aplica
+        `filtro_filas` (DataFrame → máscara booleana), de modo que en memoria solo
+        queda el subconjunto filtrado. Con `esquema` (clave de ESQUEMAS_ENTRADA)
+        solo se leen las columnas declaradas, con sus tipos.
+        """
         try:
-            df = pd.read_csv(filename, sep=separator, encoding="latin-1", on_bad_lines="skip")
+            opciones = {"sep": separator, "encoding": "latin-1", "on_bad_lines": "skip"}
+            categorias = []
+            if esquema is not None:
+                tipos = self.validar_esquema_entrada(
+                    pd.read_csv(filename, nrows=0, **opciones).columns, esquema, filename
+                )
+                categorias = [col for col, tipo in tipos.items() if tipo == "category"]
+                opciones["usecols"] = list(tipos)
+                opciones["dtype"] = {col: tipo for col, tipo in tipos.items() if tipo is not None}
+                if chunksize:
+                    # Cada bloque tendría categorías distintas: convertir después de unir
+                    opciones["dtype"].update({col: "str" for col in categorias})
+
+            if chunksize:
+                partes = []
+                total_leidas = 0
+                for bloque in pd.read_csv(filename, chunksize=chunksize, **opciones):
+                    total_leidas += len(bloque)
+                    if filtro_filas is not None:
+                        bloque = bloque[filtro_filas(bloque)]
+                    partes.append(bloque)
+                df = pd.concat(partes, ignore_index=True) if partes else pd.DataFrame()
+                for col in categorias:
+                    df[col] = df[col].astype("category")
+                print(f"  📥 {os.path.basename(filename)}: {total_leidas} filas leídas en bloques, {len(df)} conservadas")
+            else:
+                df = pd.read_csv(filename, **opciones)
+                if filtro_filas is not None:
+                    df = df[filtro_filas(df)].reset_index(drop=True)
+                    for col in categorias:
+                        df[col] = df[col].cat.remove_unused_categories()
             
             # Normalizar DV a mayúsculas si existe columna DV
             dv_columns = [col for col in df.columns if col.upper().strip() in ['DV', 'DIGITO', 'DÍGITO', 'DVV']]
@@ -712,6 +1354,55 @@ class GESDataProcessor:
             print(f"❌ Error cargando {filename}: {e}")
             return None
 
+    def validar_esquema_entrada(self, columnas, esquema, origen=""):
+        """
+        Verificar que estén las columnas requeridas del esquema y retornar
+        {columna: tipo} de las columnas del esquema presentes en el archivo.
+        """
+        definicion = ESQUEMAS_ENTRADA[esquema]
+        columnas = set(columnas)
+        faltantes = [col for col in definicion["requeridas"] if col not in columnas]
+        if faltantes:
+            raise ValueError(
+                f"faltan columnas requeridas para {esquema} en {os.path.basename(str(origen))}: {faltantes}"
+            )
+
+        tipos = dict(definicion["requeridas"])
+        tipos.update({col: tipo for col, tipo in definicion["opcionales"].items() if col in columnas})
+        return tipos
+
+    def _ruts_ges_normalizados(self):
+        """RUTs del índice GES en mayúsculas, para filtrar extractos mientras se leen"""
+        return {str(rut).upper() for rut in self._get_ges_index()}
+
+    def filtro_consultas_ges(self):
+        """Filtro por bloque: consultas de pacientes de la población GES"""
+        ruts_ges = self._ruts_ges_normalizados()
+
+        def filtrar(bloque):
+            return bloque["RUNPaciente"].astype(str).str.upper().isin(ruts_ges).to_numpy()
+
+        return filtrar
+
+    def filtro_farmacia_ges(self):
+        """
+        Filtro por bloque: despachos de pacientes GES y, para casos de revisión,
+        medicamentos especiales de pacientes fuera de la población
+        """
+        ruts_ges = self._ruts_ges_normalizados()
+        palabras = [palabra for palabras, _ in MEDICAMENTOS_REVISION_NO_GES for palabra in palabras]
+        patron = "|".join(re.escape(palabra) for palabra in palabras)
+
+        def filtrar(bloque):
+            ruts = format_rut_series(bloque["RutPaciente"], bloque["DVPaciente"])
+            es_ges = ruts.str.upper().isin(ruts_ges).to_numpy()
+            if "Farmaco_Desc" not in bloque.columns:
+                return es_ges
+            especial = bloque["Farmaco_Desc"].astype(str).str.upper().str.contains(patron, regex=True).to_numpy()
+            return es_ges | (especial & ruts.notna().to_numpy())
+
+        return filtrar
+
     def format_rut(self, rut_number, dv):
         """Formatear RUT"""
         if pd.isna(rut_number) or pd.isna(dv):
@@ -741,23 +1432,92 @@ class GESDataProcessor:
         
         return df
 
+    def build_ges_index(self):
+        """
+        Construir el índice de población GES en una sola pasada.
+
+        Mapea cada RUT tal como viene en la columna RUT, su número sin DV y
+        (si existe columna DV) la forma "numero-DV" a la patología del paciente.
+        Ante RUTs repetidos se conserva la primera fila, igual que la búsqueda original.
+        """
+        self.ges_index = {}
+        self.ges_ruts_valores = set()
+        self.ges_ruts_texto = set()
+        self._ges_index_source = self.ges_df
+
+        if self.ges_df is None or "RUT" not in self.ges_df.columns:
+            return self.ges_index
+
+        # Conjuntos de pertenencia (valor crudo y texto) para esta_en_poblacion_ges
+        for col in ['RUT', 'Rut', 'rut', 'RUT_PACIENTE']:
+            if col in self.ges_df.columns:
+                self.ges_ruts_valores.update(self.ges_df[col].dropna().tolist())
+                self.ges_ruts_texto.update(self.ges_df[col].astype(str).tolist())
+
+        patologia_col = "Ges" if "Ges" in self.ges_df.columns else "Patologia"
+        if patologia_col not in self.ges_df.columns:
+            return self.ges_index
+
+        ruts = self.ges_df["RUT"].astype(str).tolist()
+        patologias = self.ges_df[patologia_col].tolist()
+        if "DV" in self.ges_df.columns:
+            dvs = self.ges_df["DV"].tolist()
+        else:
+            dvs = [None] * len(ruts)
+
+        # Primero las claves exactas, para que tengan prioridad sobre las variantes
+        for rut, patologia in zip(ruts, patologias):
+            self.ges_index.setdefault(rut, patologia)
+
+        # Variantes: número sin DV y número-DV
+        for rut, dv, patologia in zip(ruts, dvs, patologias):
+            numero = rut.split("-")[0]
+            self.ges_index.setdefault(numero, patologia)
+            if "-" not in rut and dv is not None and not pd.isna(dv):
+                self.ges_index.setdefault(f"{numero}-{str(dv).strip().upper()}", patologia)
+
+        return self.ges_index
+
+    def _get_ges_index(self):
+        """Retornar el índice GES, reconstruyéndolo si ges_df fue reemplazado"""
+        if self._ges_index_source is not self.ges_df:
+            self.build_ges_index()
+        return self.ges_index
+
     def get_ges_condition(self, rut):
         """Obtener condición GES de un paciente"""
         if self.ges_df is None:
             return None
 
         # Aceptar rut como '12345678' o '12345678-1' y tratar ambos casos
+        ges_index = self._get_ges_index()
         rut_str = str(rut)
-        posibles = {rut_str}
-        if "-" in rut_str:
-            posibles.add(rut_str.split("-")[0])
-        # Buscar coincidencias en la columna RUT (comparando la parte numérica y/o completa)
-        patient_info = self.ges_df[self.ges_df["RUT"].astype(str).isin(posibles)]
-        if len(patient_info) > 0:
-            # Determinar el nombre de la columna de patología
-            patologia_col = "Ges" if "Ges" in self.ges_df.columns else "Patologia"
-            return patient_info.iloc[0][patologia_col]
-        return None
+        condition = ges_index.get(rut_str)
+        if condition is None and "-" in rut_str:
+            condition = ges_index.get(rut_str.split("-")[0])
+        return condition
+
+    def get_ges_conditions(self, ruts):
+        """
+        Obtener la condición GES de una serie completa de RUTs en una sola pasada.
+
+        Equivalente vectorizado de get_ges_condition: retorna una Series alineada
+        con `ruts` con la patología o None si el RUT no está en la población.
+        """
+        ruts = pd.Series(ruts)
+        if self.ges_df is None or ruts.empty:
+            return pd.Series(None, index=ruts.index, dtype=object)
+
+        ges_index = self._get_ges_index()
+        rut_str = ruts.astype(str)
+        conditions = rut_str.map(ges_index)
+
+        # Reintentar solo con la parte numérica los que traen DV y no calzaron
+        pendientes = conditions.isna() & rut_str.str.contains("-", regex=False)
+        if pendientes.any():
+            conditions[pendientes] = rut_str[pendientes].str.split("-").str[0].map(ges_index)
+
+        return conditions.astype(object).where(conditions.notna(), None)
 
     def get_codigo_prestacion(self, condition):
         """Obtener código de prestación GES"""
@@ -781,12 +1541,13 @@ class GESDataProcessor:
         # Obtener lista de medicamentos GES (asumiendo que hay una columna de nombre)
         # Nota: Ajustar según la estructura real del archivo
         if "Farmaco_Desc" in self.medicamentos_ges_df.columns:
-            medicamentos_ges_list = set(self.medicamentos_ges_df["Farmaco_Desc"].str.upper())
+            columna_ges = self.medicamentos_ges_df["Farmaco_Desc"]
         elif "Medicamento" in self.medicamentos_ges_df.columns:
-            medicamentos_ges_list = set(self.medicamentos_ges_df["Medicamento"].str.upper())
+            columna_ges = self.medicamentos_ges_df["Medicamento"]
         else:
             # Usar la primera columna como medicamentos
-            medicamentos_ges_list = set(self.medicamentos_ges_df.iloc[:, 0].str.upper())
+            columna_ges = self.medicamentos_ges_df.iloc[:, 0]
+        medicamentos_ges_list = pd.unique(columna_ges.str.upper())
 
         print(f"📋 Medicamentos en listado GES: {len(medicamentos_ges_list)}")
 
@@ -796,7 +1557,6 @@ class GESDataProcessor:
             return
 
         # Filtrar solo pacientes GES (excluyendo paliativos)
-        ges_patients = set(self.ges_df["RUT"].astype(str))
         # Determinar el nombre de la columna de patología
         patologia_col = "Ges" if "Ges" in self.ges_df.columns else "Patologia"
         no_paliativos = self.ges_df[self.ges_df[patologia_col] != "Paliativos"]["RUT"].astype(str)
@@ -806,8 +1566,11 @@ class GESDataProcessor:
         farmacia_ges = self.farmacia_df[self.farmacia_df["RUT_Combined"].isin(ges_no_paliativos)]
 
         medicamentos_administrados = farmacia_ges["Farmaco_Desc"].str.upper()
+        # Registros por medicamento en una sola pasada
+        registros_por_medicamento = medicamentos_administrados.value_counts()
 
-        # Encontrar coincidencias
+        # Encontrar coincidencias con el índice del listado GES
+        indice = self.indexar_medicamentos_ges(medicamentos_ges_list)
         coincidencias = []
         no_coincidencias = []
 
@@ -815,31 +1578,20 @@ class GESDataProcessor:
             if pd.isna(med_admin):
                 continue
 
-            encontrado = False
-            for med_ges in medicamentos_ges_list:
-                if pd.isna(med_ges):
-                    continue
-                # Buscar coincidencias parciales (medicamento GES contenido en administrado)
-                if med_ges in med_admin or self.similar_medicine_name(med_admin, med_ges):
-                    coincidencias.append(
-                        {
-                            "medicamento_administrado": med_admin,
-                            "medicamento_ges": med_ges,
-                            "pacientes": len(
-                                farmacia_ges[farmacia_ges["Farmaco_Desc"].str.upper() == med_admin]
-                            ),
-                        }
-                    )
-                    encontrado = True
-                    break
-
-            if not encontrado:
+            med_ges = self.buscar_medicamento_ges(med_admin, indice)
+            if med_ges is not None:
+                coincidencias.append(
+                    {
+                        "medicamento_administrado": med_admin,
+                        "medicamento_ges": med_ges,
+                        "pacientes": int(registros_por_medicamento[med_admin]),
+                    }
+                )
+            else:
                 no_coincidencias.append(
                     {
                         "medicamento_administrado": med_admin,
-                        "pacientes": len(
-                            farmacia_ges[farmacia_ges["Farmaco_Desc"].str.upper() == med_admin]
-                        ),
+                        "pacientes": int(registros_por_medicamento[med_admin]),
                     }
                 )
 
@@ -853,6 +1605,55 @@ class GESDataProcessor:
         print(f"✅ Medicamentos GES encontrados: {len(coincidencias)}")
         print(f"❓ Medicamentos no en listado GES: {len(no_coincidencias)}")
 
+    def indexar_medicamentos_ges(self, medicamentos_ges):
+        """
+        Índice del listado GES para buscar coincidencias sin comparar contra todo el listado:
+        posición de cada nombre, nombres por largo (búsqueda de contenidos) y
+        palabra → nombres que la contienen (candidatos para similar_medicine_name).
+        """
+        posicion = {}
+        for med_ges in medicamentos_ges:
+            if isinstance(med_ges, str) and med_ges not in posicion:
+                posicion[med_ges] = len(posicion)
+
+        por_palabra = {}
+        for med_ges in posicion:
+            for palabra in set(med_ges.replace("-", " ").split()):
+                por_palabra.setdefault(palabra, []).append(med_ges)
+
+        return {
+            "posicion": posicion,
+            "largos": sorted({len(med_ges) for med_ges in posicion}),
+            "por_palabra": por_palabra,
+        }
+
+    def buscar_medicamento_ges(self, med_admin, indice):
+        """
+        Primer medicamento GES (en el orden del listado) contenido en `med_admin`
+        o similar según similar_medicine_name; None si no hay.
+        """
+        posicion = indice["posicion"]
+        encontrados = set()
+
+        # Nombres GES contenidos en el administrado: subcadenas de los largos del listado
+        for largo in indice["largos"]:
+            if largo > len(med_admin):
+                break
+            for inicio in range(len(med_admin) - largo + 1):
+                subcadena = med_admin[inicio:inicio + largo]
+                if subcadena in posicion:
+                    encontrados.add(subcadena)
+
+        # Similares: solo nombres que comparten alguna palabra (Jaccard > 0 requiere intersección)
+        candidatos = set()
+        for palabra in set(med_admin.replace("-", " ").split()):
+            candidatos.update(indice["por_palabra"].get(palabra, ()))
+        encontrados.update(c for c in candidatos - encontrados if self.similar_medicine_name(med_admin, c))
+
+        if not encontrados:
+            return None
+        return min(encontrados, key=posicion.get)
+
     def similar_medicine_name(self, name1, name2):
         """Verificar si dos nombres de medicamentos son similares"""
         # Simplificar nombres eliminando espacios y comparar palabras clave
@@ -926,82 +1727,254 @@ class GESDataProcessor:
         print(f"INFO - Consultas totales GES: {len(consultas_ges)}")
         print(f"INFO - Consultas atendidas/llegó: {len(consultas_validas)}")
 
-        # Aplicar filtro de especialidades GES válidas
-        consultas_especialidad_valida = self.filtrar_consultas_especialidades_ges(consultas_validas)
-        
-        print(f"INFO - Consultas con especialidad GES válida: {len(consultas_especialidad_valida)}")
-
-        consultas_procesadas = []
-
-        # Agrupar consultas por RUT para manejar duplicados
-        consultas_agrupadas = {}
+        # Condición GES una sola vez; con ella se filtra especialidad y se asigna trazadora
+        condiciones = self.get_ges_conditions(consultas_validas["RUNPaciente"].astype(str))
+        mascara = self._mascara_especialidades_ges(consultas_validas, condiciones)
+        consultas_especialidad_valida = consultas_validas[mascara]
 
-        for _, consulta in consultas_especialidad_valida.iterrows():
-            rut_paciente = str(consulta["RUNPaciente"])
-            condition = self.get_ges_condition(rut_paciente)
-
-            if condition:
-                # Determinar código trazadora basado en tipo de consulta
-                prestacion_code = self.determinar_codigo_trazadora_consulta(consulta, condition)
-
-                # Obtener COD_FAM según nuevos requerimientos
-                cod_fam_normalizado = self.get_cod_fam_consulta_actualizado(consulta, condition)
+        print(f"INFO - Consultas con especialidad GES válida: {len(consultas_especialidad_valida)}")
 
-                registro = {
-                    "FECHA": self.format_date_for_excel(consulta["FechaCita"]),
-                    "RUT": self.extract_rut_number(rut_paciente),
-                    "DV": self.extract_rut_dv(rut_paciente),
-                    "PRESTACION": prestacion_code,
-                    "TIPO": "AUGE",  # Cambiar a AUGE en lugar de abreviaturas
-                    "PS-FAM ": self.get_codigo_prestacion(condition),
-                    "ESPECIALIDAD": cod_fam_normalizado,
-                }
+        def clasificar(df, ahora):
+            condiciones_df = self.get_ges_conditions(df["RUNPaciente"].astype(str))
+            eventos = []
+            registros = self.clasificar_consultas_para_carga(df, condiciones_df, ahora, eventos)
+            eventos = unir_eventos(eventos)
+            return {"registros": (registros, np.arange(len(df))),
+                    EVENTOS: (eventos.reset_index(drop=True), eventos.index.to_numpy(dtype=int))}
 
-                # Agrupar por RUT
-                if rut_paciente not in consultas_agrupadas:
-                    consultas_agrupadas[rut_paciente] = []
-                consultas_agrupadas[rut_paciente].append(registro)
+        registros = self._clasificar_con_estado(
+            "consultas", consultas_especialidad_valida, clasificar,
+            auditoria=(["RUNPaciente"], ["FechaCita"], ["EspecialidadLocal"]),
+        )["registros"]
 
-        # Procesar agrupación por RUT para evitar duplicados
+        # Deduplicar por RUT + PRESTACIÓN + FECHA
         print(f"INFO - Deduplicando consultas por RUT y especialidad...")
-        for rut, consultas_rut in consultas_agrupadas.items():
-            consultas_finales = self.agrupar_consultas_por_rut(consultas_rut)
-            consultas_procesadas.extend(consultas_finales)
+        consultas_procesadas = self.deduplicar_consultas(registros)
 
         # Crear DataFrame y guardar archivo en formato Excel
-        if consultas_procesadas:
-            df_resultado = pd.DataFrame(consultas_procesadas)
-            
+        if not consultas_procesadas.empty:
             # Cambiar extensión a .xlsx para Excel
             archivo_excel = archivo_salida.replace('.csv', '.xlsx')
             
             # Guardar en formato Excel usando chunking (500 filas por archivo)
-            self.save_df_in_chunks(df_resultado, archivo_excel, chunk_size=499)
+            self.save_df_in_chunks(consultas_procesadas, archivo_excel, chunk_size=499)
             print(f"OK - Archivo(s) de consultas generados a partir: {archivo_excel}")
             print(f"OK - Total consultas procesadas (deduplicadas): {len(consultas_procesadas)}")
-            print(f"OK - Pacientes únicos con consultas: {len(consultas_agrupadas)}")
+            print(f"OK - Pacientes únicos con consultas: {registros['RUNPaciente'].nunique()}")
         else:
             print("WARNING - No se encontraron consultas para procesar")
 
+        self.eventos.emitir_resumen("Resumen de eventos de consultas")
+        return consultas_procesadas
+
     def filtrar_consultas_especialidades_ges(self, df_consultas):
         """Filtrar consultas para incluir solo especialidades válidas para GES por patología"""
-        from ges_config import es_especialidad_ges_valida
-        
-        consultas_filtradas = []
-        
-        for _, consulta in df_consultas.iterrows():
-            rut_paciente = str(consulta["RUNPaciente"])
-            condition = self.get_ges_condition(rut_paciente)
-            codigo_especialidad = consulta.get("EspecialidadLocal", "")
-            
-            if condition and es_especialidad_ges_valida(codigo_especialidad, condition):
-                consultas_filtradas.append(consulta)
-        
-        if consultas_filtradas:
-            return pd.DataFrame(consultas_filtradas)
+        if df_consultas is None or df_consultas.empty:
+            return pd.DataFrame(columns=df_consultas.columns if df_consultas is not None else [])
+
+        condiciones = self.get_ges_conditions(df_consultas["RUNPaciente"].astype(str))
+        return df_consultas[self._mascara_especialidades_ges(df_consultas, condiciones)]
+
+    def _mascara_especialidades_ges(self, df_consultas, condiciones):
+        """Máscara de consultas cuya (patología, especialidad) está en PARES_ESPECIALIDAD_GES"""
+        if "EspecialidadLocal" in df_consultas.columns:
+            especialidades = df_consultas["EspecialidadLocal"].to_numpy(dtype=object)
+        else:
+            especialidades = np.full(len(df_consultas), "", dtype=object)
+
+        pares = pd.MultiIndex.from_arrays([condiciones.to_numpy(dtype=object), especialidades])
+        return np.asarray(pares.isin(PARES_ESPECIALIDAD_GES), dtype=bool)
+
+    def _firma_clasificacion(self, entrada):
+        """
+        Firma de todo lo que, además de la fila, determina su clasificación (ver ges_estado):
+        tablas de referencia, arancel, reglas, la configuración que usa la clasificación
+        y el código de las funciones que clasifican (funciones_codigo_clasificacion).
+        """
+        trazadora = self.trazadora_processor
+        return firma_contexto(
+            list(entrada.columns), [str(tipo) for tipo in entrada.dtypes],
+            self.ges_df,
+            self._get_severidad_fq_map(), self._get_clasificacion_paliativos_map(),
+            trazadora._get_severidad_fq_map(), trazadora._get_clasificacion_paliativos_map(),
+            trazadora.arancel_df, trazadora.trazadoras_medicamentos, trazadora.exclusiones,
+            self.reglas_trazadoras.firma,
+            ESPECIALIDADES_GES_VALIDAS, sorted(PARES_ESPECIALIDAD_GES), CODIGOS_PRESTACION_GES, CODIGOS_TRAZADORA,
+            TRAZADORAS_FIBROSIS_SEVERIDAD, MEDICAMENTOS_REVISION_NO_GES, ESQUEMAS_ENTRADA,
+            FORMATOS_FECHA, sorted(TEXTOS_FECHA_NULA),
+            firma_codigo_clasificacion(),
+        )
+
+    @staticmethod
+    def _textos_auditoria(df, candidatos):
+        """Primer valor no nulo entre las columnas `candidatos`, como texto (None si no hay)"""
+        valores = pd.Series([None] * len(df), index=df.index, dtype=object)
+        for columna in candidatos:
+            if columna in df.columns:
+                valores = valores.combine_first(df[columna].astype(object))
+        return valores.astype(str).where(valores.notna(), None).tolist()
+
+    def _clasificar_con_estado(self, fuente, entrada, clasificar, auditoria):
+        """
+        Clasificar `entrada` reutilizando los registros ya clasificados del estado persistente.
+
+        `clasificar(df, ahora)` retorna {tipo: (DataFrame, posiciones en df)}. Solo se clasifican
+        las filas que no están en el estado; el resultado se arma en el orden de `entrada`,
+        igual que clasificándola completa. `auditoria` = columnas candidatas de RUT, fecha y
+        especialidad/fármaco que se guardan con cada registro. Retorna {tipo: DataFrame}.
+
+        El tipo EVENTOS (tabla de eventos por fila, ver ges_logging) se guarda con cada fila y
+        se vuelve a contar para las reutilizadas, así el resumen de eventos es el de la entrada completa.
+        """
+        ahora = datetime.now()
+        if entrada.empty or not (self.estado_registros.habilitado and self.cache_entradas.habilitada):
+            return {tipo: df for tipo, (df, _) in clasificar(entrada, ahora).items() if tipo != EVENTOS}
+
+        entrada = entrada.reset_index(drop=True)
+        firma = self._firma_clasificacion(entrada)
+        claves = claves_registros(entrada)
+        guardados = self.estado_registros.cargar(fuente, firma)
+        conocidas = np.concatenate(
+            [df["_clave"].to_numpy(dtype=str) for tipo, df in guardados.items() if tipo != EVENTOS] or [[]]
+        )
+        es_nueva = ~np.isin(claves, conocidas)
+        nuevas = np.flatnonzero(es_nueva)
+        reutilizadas = np.flatnonzero(~es_nueva)
+
+        resultado = clasificar(entrada.iloc[nuevas].reset_index(drop=True), ahora)
+        eventos, posiciones_eventos = resultado.pop(EVENTOS, (pd.DataFrame(columns=COLUMNAS_EVENTOS), []))
+        posiciones_eventos = np.asarray(posiciones_eventos, dtype=int)
+
+        # Lote con las filas nuevas; las que quedaron con la fecha actual (fecha no reconocida) no se guardan
+        tipos = np.full(len(nuevas), OMITIDO, dtype=object)
+        lote = {}
+        for tipo, (df, posiciones) in resultado.items():
+            posiciones = np.asarray(posiciones, dtype=int)
+            tipos[posiciones] = tipo
+            df = df.assign(_clave=claves[nuevas[posiciones]])
+            if "FECHA" in df.columns:
+                fecha_actual = (df["FECHA"] == ahora).to_numpy(dtype=bool)
+                tipos[posiciones[fecha_actual]] = None
+                df = df[~fecha_actual]
+            lote[tipo] = df.reset_index(drop=True)
+        lote[OMITIDO] = pd.DataFrame({"_clave": claves[nuevas[tipos == OMITIDO]]})
+
+        # Eventos de las filas guardadas, una fila por clave (las filas idénticas cuentan lo mismo)
+        primeras = pd.Series(claves[nuevas]).drop_duplicates().index.to_numpy()
+        guardar = np.isin(posiciones_eventos, primeras) & pd.notna(tipos[posiciones_eventos])
+        lote[EVENTOS] = (
+            pd.DataFrame({
+                "_clave": claves[nuevas[posiciones_eventos[guardar]]],
+                "EVENTOS": list(eventos[guardar][COLUMNAS_EVENTOS].itertuples(index=False, name=None)),
+            })
+            .groupby("_clave", sort=False)["EVENTOS"].agg(tuple).reset_index()
+        )
+
+        textos = [self._textos_auditoria(entrada.iloc[nuevas], candidatos) for candidatos in auditoria]
+        registros = [(claves[posicion], tipo, rut, fecha, detalle)
+                     for posicion, tipo, rut, fecha, detalle in zip(nuevas.tolist(), tipos, *textos)
+                     if tipo is not None]
+        self.estado_registros.guardar(fuente, firma, lote, registros)
+        print(f"♻️ Estado de {fuente}: {len(reutilizadas)} filas reutilizadas, {len(nuevas)} clasificadas")
+
+        # Eventos de las filas reutilizadas: solo lo que no contaron ya las nuevas (ej. el mismo RUT)
+        if EVENTOS in guardados and len(reutilizadas):
+            reutilizados = pd.DataFrame({"_clave": claves[reutilizadas]}).merge(guardados[EVENTOS], on="_clave")
+            reutilizados = pd.DataFrame(reutilizados["EVENTOS"].explode().tolist(), columns=COLUMNAS_EVENTOS)
+            total = contar_eventos(pd.concat([eventos, reutilizados], ignore_index=True))
+            for categoria, cantidad in (total - contar_eventos(eventos)).items():
+                self.eventos.sumar(categoria, cantidad)
+
+        # Unir guardados y nuevos en el orden de entrada
+        salida = {}
+        for tipo, (df, posiciones) in resultado.items():
+            partes = []
+            if tipo in guardados and len(reutilizadas):
+                posiciones_reutilizadas = pd.DataFrame({"_clave": claves[reutilizadas], "_posicion": reutilizadas})
+                partes.append(posiciones_reutilizadas.merge(guardados[tipo], on="_clave", how="inner"))
+            if len(df):
+                partes.append(df.assign(_posicion=nuevas[np.asarray(posiciones, dtype=int)]))
+            if not partes:
+                salida[tipo] = df
+                continue
+            unidos = pd.concat(partes, ignore_index=True) if len(partes) > 1 else partes[0]
+            unidos = unidos.sort_values("_posicion", kind="mergesort")
+            salida[tipo] = unidos[list(df.columns)].reset_index(drop=True)
+        return salida
+
+    def clasificar_consultas_para_carga(self, consultas, condiciones, ahora=None, eventos=None):
+        """
+        Construir los registros de carga de consultas GES en forma columnar.
+
+        `condiciones` es la patología GES de cada consulta (alineada por posición).
+        Retorna los registros antes de deduplicar (uno por consulta, en el mismo orden),
+        con RUNPaciente para agrupar por paciente. `ahora` = fecha para fechas no reconocidas.
+        `eventos` (lista) recibe los eventos de cada consulta, con su posición como índice.
+        """
+        columnas = ["FECHA", "RUT", "DV", "PRESTACION", "TIPO", "PS-FAM ", "ESPECIALIDAD", "RUNPaciente"]
+        df = consultas.reset_index(drop=True)
+        if df.empty:
+            return pd.DataFrame(columns=columnas)
+        condiciones = pd.Series(np.asarray(condiciones, dtype=object), index=df.index)
+
+        ruts = df["RUNPaciente"].astype(str)
+        ruts_unicos = pd.unique(ruts)
+        numeros = {rut: self.extract_rut_number(rut) for rut in ruts_unicos}
+        dvs = {rut: self.extract_rut_dv(rut) for rut in ruts_unicos}
+
+        # Trazadora según patología (Fibrosis/Paliativos según severidad y clasificación del RUT)
+        ruts_trazadora = df["RUNPaciente"].map(lambda rut: "" if pd.isna(rut) else str(rut).strip())
+        prestaciones = self.trazadora_processor.determinar_trazadoras_consultas(condiciones, ruts_trazadora, eventos)
+
+        # COD_FAM: Paliativos fijo, resto EspecialidadLocal tal como viene
+        if "EspecialidadLocal" in df.columns:
+            especialidades = df["EspecialidadLocal"].astype(str).str.strip()
+            especialidades = especialidades.where(especialidades != "", "07-102-0")
         else:
-            # Retornar DataFrame vacío con las mismas columnas
-            return pd.DataFrame(columns=df_consultas.columns)
+            especialidades = pd.Series("07-102-0", index=df.index)
+        cod_fam = np.where(condiciones == "Paliativos", "07-116-3", especialidades.to_numpy(dtype=object))
+
+        return pd.DataFrame({
+            "FECHA": self.format_dates_for_excel(df["FechaCita"], etiqueta="consultas", ahora=ahora),
+            "RUT": ruts.map(numeros),
+            "DV": ruts.map(dvs),
+            "PRESTACION": prestaciones,
+            "TIPO": "AUGE",
+            "PS-FAM ": condiciones.map(lambda condition: self.get_codigo_prestacion(condition)),
+            "ESPECIALIDAD": cod_fam,
+            "RUNPaciente": ruts,
+        }, columns=columnas)
+
+    def deduplicar_consultas(self, registros):
+        """
+        Versión columnar de agrupar_consultas_por_rut para todos los pacientes.
+
+        Elimina duplicados por RUT + PRESTACIÓN + FECHA con un ordenamiento estable
+        (paciente en orden de aparición, FECHA descendente) y drop_duplicates.
+        """
+        if registros.empty:
+            return registros.drop(columns=["RUNPaciente"]).reset_index(drop=True)
+
+        grupos = pd.factorize(registros["RUNPaciente"], sort=False)[0]
+        ordenados = registros.assign(_grupo=grupos, _posicion=np.arange(len(registros)))
+        ordenados = ordenados.sort_values(
+            ["_grupo", "FECHA", "_posicion"], ascending=[True, False, True], kind="mergesort"
+        )
+        unicos = ordenados.drop_duplicates(subset=["_grupo", "RUT", "PRESTACION", "FECHA"], keep="first")
+
+        antes = np.bincount(grupos)
+        despues = np.bincount(unicos["_grupo"].to_numpy(), minlength=len(antes))
+        primeras = np.unique(grupos, return_index=True)[1]
+        ruts = registros["RUT"].to_numpy(dtype=object)
+        con_duplicados = np.flatnonzero(antes != despues)
+        self.eventos.sumar("RUT con consultas duplicadas", len(con_duplicados))
+        self.eventos.sumar("Consultas duplicadas eliminadas (prestación y fecha)", (antes - despues).sum())
+        if self.eventos.detalle_activo():
+            for grupo in con_duplicados:
+                self.eventos.logger.debug("    🔄 RUT %s: %s → %s consultas (eliminados duplicados por prestación y fecha)",
+                                          ruts[primeras[grupo]], antes[grupo], despues[grupo])
+
+        return unicos.drop(columns=["_grupo", "_posicion", "RUNPaciente"]).reset_index(drop=True)
 
     def procesar_medicamentos_para_carga(self, df_farmacia, archivo_salida):
         """Procesar medicamentos para generar archivo de carga con agrupación por RUT"""
@@ -1033,9 +2006,9 @@ class GESDataProcessor:
 
         # Asegurar que exista la columna RUT_Combined (cuando se pasa un df manual en tests)
         if "RUT_Combined" not in df_medicamentos_combined.columns:
-            df_medicamentos_combined["RUT_Combined"] = [
-                self.format_rut(row["RutPaciente"], row["DVPaciente"]) for _, row in df_medicamentos_combined.iterrows()
-            ]
+            df_medicamentos_combined["RUT_Combined"] = format_rut_series(
+                df_medicamentos_combined["RutPaciente"], df_medicamentos_combined["DVPaciente"]
+            )
             df_medicamentos_combined = df_medicamentos_combined.dropna(subset=["RUT_Combined"])
 
         # Separar pacientes GES de no-GES
@@ -1048,173 +2021,71 @@ class GESDataProcessor:
         farmacia_ges = df_medicamentos_combined[df_medicamentos_combined["RUT_Combined"].isin(ges_patients)]
         farmacia_no_ges = df_medicamentos_combined[~df_medicamentos_combined["RUT_Combined"].isin(ges_patients)]
 
-        # Lista para casos de revisión (no-GES con medicamentos especiales)
-        casos_revision = []
-        
-        medicamentos_procesados = []
-
-        # Procesar medicamentos por RUT para manejar duplicados
-        medicamentos_agrupados = {}
-        # Registrar medicamentos sin fecha de despacho para revisión
-        casos_sin_fecha = []
+        # Clasificar medicamentos GES en forma columnar (prestación, fecha, familia),
+        # reutilizando clasificaciones de descripciones de corridas anteriores
+        archivo_memo = os.path.join(self.cache_entradas.directorio, "clasificacion_medicamentos.json")
+        persistir_memo = self.memo_medicamentos_persistente and self.cache_entradas.habilitada
+        if persistir_memo:
+            self.reglas_trazadoras.cargar_memo(archivo_memo)
+        def clasificar(df, ahora):
+            eventos = []
+            registros, sin_fecha, posiciones, posiciones_sin_fecha = self.clasificar_medicamentos_para_carga(
+                df, ahora, con_posiciones=True, eventos=eventos
+            )
+            eventos = unir_eventos(eventos)
+            return {"registros": (registros, posiciones), "sin_fecha": (sin_fecha, posiciones_sin_fecha),
+                    EVENTOS: (eventos.reset_index(drop=True), eventos.index.to_numpy(dtype=int))}
 
-        for _, medicamento in farmacia_ges.iterrows():
+        clasificados = self._clasificar_con_estado(
+            "medicamentos", farmacia_ges, clasificar,
+            auditoria=(["RUT_Combined"], ["FechaDespacho", "FechaEmision"], ["Farmaco_Desc"]),
+        )
+        registros, casos_sin_fecha = clasificados["registros"], clasificados["sin_fecha"]
+        print(f"🧠 {self.reglas_trazadoras.resumen_memo()}")
+        if persistir_memo:
             try:
-                rut_paciente = medicamento["RUT_Combined"]
-                condition = self.get_ges_condition(rut_paciente)
-
-                if condition:
-                    # Determinar código trazadora basado en medicamento
-                    # IMPORTANTE: Convertir pandas Series a dict para funciones de trazadora
-                    medicamento_dict = medicamento.to_dict() if hasattr(medicamento, 'to_dict') else medicamento
-                    prestacion_code = self.determinar_codigo_trazadora_medicamento(
-                        medicamento_dict, condition
-                    )
-                    
-                    # Si prestacion_code es None, saltar este medicamento (ej: paliativos con campos vacíos)
-                    if prestacion_code is None:
-                        continue
-
-                    # Obtener COD_FAM según nuevos requerimientos para medicamentos
-                    cod_fam = self.get_cod_fam_medicamento_actualizado(medicamento, condition)
-
-                    # Verificar campos requeridos: usar la fecha según el origen
-                    # - FechaDespacho para datos de farmacia (despacho real)
-                    # - FechaEmision para datos de recetas GES (prescripciones)
-                    origen = medicamento.get("_origen", "farmacia")
-                    if origen == "recetas":
-                        fecha_medicamento = medicamento.get("FechaEmision", "")
-                    else:
-                        fecha_medicamento = medicamento.get("FechaDespacho", "")
-                    
-                    if pd.isna(fecha_medicamento):
-                        fecha_medicamento = ""
-
-                    # Si no hay fecha, registrar el caso y omitirlo del output
-                    if pd.isna(fecha_medicamento) or str(fecha_medicamento).strip() == "":
-                        casos_sin_fecha.append({
-                            "RUT_Combined": rut_paciente,
-                            "Farmaco_Desc": medicamento.get("Farmaco_Desc", ""),
-                            "CantidadDespachada": medicamento.get("CantidadDespachada", ""),
-                            "LocalSolicitante": medicamento.get("LocalSolicitante", ""),
-                            "Fecha": fecha_medicamento,
-                            "Origen": origen,
-                        })
-                        # Omitir este registro
-                        continue
-
-                    # Usar datetime object para FECHA (igual que en consultas)
-                    fecha_formateada = None
-                    try:
-                        fecha_formateada = self.format_date_for_excel(fecha_medicamento)
-                    except Exception as e:
-                        # Si falla el parseo, usar fecha actual como fallback
-                        print(f"⚠️ Error parseando fecha para RUT {rut_paciente}: {fecha_medicamento} - usando fecha actual")
-                        fecha_formateada = datetime.now()
-
-                    registro = {
-                        "FECHA": fecha_formateada,
-                        "RUT": self.extract_rut_number(rut_paciente),
-                        "DV": self.extract_rut_dv(rut_paciente),
-                        "PRESTACION": prestacion_code,
-                        "TIPO": "AUGE",  # Cambiar a AUGE en lugar de ME
-                        "PS-FAM ": self.get_codigo_prestacion(condition),
-                        "ESPECIALIDAD": cod_fam,
-                        "MEDICAMENTO": medicamento.get("Farmaco_Desc", ""),
-                    }
-
-                    # Agrupar por RUT
-                    if rut_paciente not in medicamentos_agrupados:
-                        medicamentos_agrupados[rut_paciente] = []
-                    medicamentos_agrupados[rut_paciente].append(registro)
-                    
-            except Exception as e:
-                print(f"⚠️ Error procesando medicamento para RUT {medicamento.get('RUT_Combined', 'N/A')}: {e}")
-                continue
+                self.reglas_trazadoras.guardar_memo(archivo_memo)
+            except OSError as e:
+                print(f"⚠️ No se pudo guardar clasificaciones de medicamentos: {e}")
 
         # PROCESAR CASOS NO-GES PARA REVISIÓN
         print(f"🔍 Identificando casos NO-GES con medicamentos especiales...")
-        codigos_especiales = ['3002023', '3002123']  # Códigos de paliativos
-        
-        for _, medicamento in farmacia_no_ges.iterrows():
-            try:
-                rut_paciente = medicamento["RUT_Combined"]
-                
-                # Verificar si es un medicamento especial que requiere revisión
-                medicamento_dict = medicamento.to_dict() if hasattr(medicamento, 'to_dict') else medicamento
-                farmaco_desc = str(medicamento.get("Farmaco_Desc", "")).upper()
-                
-                # Detectar si es paliativo u otro medicamento especial
-                es_especial = False
-                tipo_medicamento = ""
-                
-                if any(keyword in farmaco_desc for keyword in ['MORFINA', 'FENTANILO', 'TRAMADOL', 'OXICODONA']):
-                    es_especial = True
-                    tipo_medicamento = "PALIATIVO"
-                elif any(keyword in farmaco_desc for keyword in ['SALBUTAMOL', 'BECLOMETASONA', 'BUDESONIDA']):
-                    es_especial = True
-                    tipo_medicamento = "ASMA"
-                elif any(keyword in farmaco_desc for keyword in ['TOBRAMICINA', 'COLISTINA']):
-                    es_especial = True
-                    tipo_medicamento = "FIBROSIS_QUISTICA"
-                
-                if es_especial:
-                    caso_revision = {
-                        "RUT": rut_paciente,
-                        "FARMACO": medicamento.get("Farmaco_Desc", ""),
-                        "TIPO_MEDICAMENTO": tipo_medicamento,
-                        "FECHA_DESPACHO": medicamento.get("FechaDespacho", ""),
-                        "MOTIVO": "PACIENTE NO ESTÁ EN POBLACIÓN GES",
-                        "ACCION_REQUERIDA": "VERIFICAR SI DEBE INCLUIRSE EN GES"
-                    }
-                    casos_revision.append(caso_revision)
-                    
-            except Exception as e:
-                print(f"⚠️ Error procesando caso no-GES para RUT {medicamento.get('RUT_Combined', 'N/A')}: {e}")
-                continue
+        casos_revision = self.identificar_casos_revision_medicamentos(farmacia_no_ges)
 
         # Guardar casos de revisión si los hay
-        if casos_revision:
+        if not casos_revision.empty:
             archivo_revision = archivo_salida.replace('.xlsx', '_CASOS_REVISION.xlsx').replace('.csv', '_CASOS_REVISION.xlsx')
-            df_revision = pd.DataFrame(casos_revision)
             # Guardar archivo de revisión (particionado si es necesario)
-            self.save_df_in_chunks(df_revision, archivo_revision, chunk_size=499)
+            self.save_df_in_chunks(casos_revision, archivo_revision, chunk_size=499)
             print(f"⚠️ CASOS PARA REVISIÓN: {len(casos_revision)} casos guardados en {archivo_revision}")
             print(f"   Estos pacientes NO están en población GES pero reciben medicamentos especiales")
 
         # Guardar lista de medicamentos sin fecha si existen
-        if casos_sin_fecha:
+        if not casos_sin_fecha.empty:
             archivo_sin_fecha = archivo_salida.replace('.xlsx', '_SIN_FECHA.xlsx').replace('.csv', '_SIN_FECHA.xlsx')
-            df_sin_fecha = pd.DataFrame(casos_sin_fecha)
-            self.save_df_in_chunks(df_sin_fecha, archivo_sin_fecha, chunk_size=499)
+            self.save_df_in_chunks(casos_sin_fecha, archivo_sin_fecha, chunk_size=499)
             print(f"⚠️ MEDICAMENTOS SIN FECHA: {len(casos_sin_fecha)} casos guardados en {archivo_sin_fecha}")
 
-        # Procesar agrupación por RUT manteniendo códigos excluyentes separados
+        # Deduplicar por RUT + PRESTACIÓN manteniendo códigos excluyentes separados
         print(f"📋 Agrupando medicamentos por RUT...")
-        total_before_dedup = sum(len(meds) for meds in medicamentos_agrupados.values())
-        for rut, medicamentos_rut in medicamentos_agrupados.items():
-            medicamentos_finales = self.agrupar_medicamentos_por_rut(medicamentos_rut)
-            medicamentos_procesados.extend(medicamentos_finales)
+        total_before_dedup = len(registros)
+        medicamentos_procesados = self.deduplicar_medicamentos(registros)
         total_after_dedup = len(medicamentos_procesados)
         print(f"   📊 Antes de deduplicar: {total_before_dedup} registros")
         print(f"   📊 Después de deduplicar: {total_after_dedup} registros")
         print(f"   📊 Eliminados por duplicados: {total_before_dedup - total_after_dedup}")
 
         # Crear DataFrame y guardar archivo en formato Excel
-        if medicamentos_procesados:
-            df_resultado = pd.DataFrame(medicamentos_procesados)
+        if not medicamentos_procesados.empty:
             # Eliminar la columna auxiliar MEDICAMENTO antes de guardar
-            if "MEDICAMENTO" in df_resultado.columns:
-                df_resultado = df_resultado.drop("MEDICAMENTO", axis=1)
+            df_resultado = medicamentos_procesados.drop("MEDICAMENTO", axis=1)
 
             # Eliminar filas donde FECHA esté vacía o nula
-            # FECHA ahora es datetime object, solo verificar si es nulo
-            if "FECHA" in df_resultado.columns:
-                conteo_before = len(df_resultado)
-                df_resultado = df_resultado[df_resultado["FECHA"].notnull()]
-                removed = conteo_before - len(df_resultado)
-                if removed > 0:
-                    print(f"⚠️ Se eliminaron {removed} filas sin fecha del output final")
+            conteo_before = len(df_resultado)
+            df_resultado = df_resultado[df_resultado["FECHA"].notnull()]
+            removed = conteo_before - len(df_resultado)
+            if removed > 0:
+                print(f"⚠️ Se eliminaron {removed} filas sin fecha del output final")
 
             # Cambiar extensión a .xlsx para Excel
             archivo_excel = archivo_salida.replace('.csv', '.xlsx')
@@ -1223,9 +2094,262 @@ class GESDataProcessor:
             self.save_df_in_chunks(df_resultado, archivo_excel, chunk_size=499)
             print(f"✅ Archivo(s) de medicamentos generados a partir: {archivo_excel}")
             print(f"✅ Medicamentos procesados: {len(medicamentos_procesados)}")
-            print(f"✅ Medicamentos únicos por RUT: {len(medicamentos_agrupados)}")
+            print(f"✅ Medicamentos únicos por RUT: {registros['RUT_Combined'].nunique()}")
         else:
             print("❌ No se encontraron medicamentos para procesar")
+            df_resultado = medicamentos_procesados
+
+        self.eventos.emitir_resumen("Resumen de eventos de medicamentos")
+        return df_resultado
+
+    def clasificar_medicamentos_para_carga(self, farmacia_ges, ahora=None, con_posiciones=False, eventos=None):
+        """
+        Construir los registros de carga de medicamentos GES en forma columnar.
+
+        Retorna (registros, casos_sin_fecha) en el orden de entrada y antes de
+        deduplicar. `registros` conserva RUT_Combined para agrupar por paciente.
+        Con `con_posiciones` agrega la posición en `farmacia_ges` de cada fila de ambos.
+        `ahora` = fecha para fechas no reconocidas. `eventos` (lista) recibe los eventos
+        de cada fila, con su posición en `farmacia_ges` como índice.
+        """
+        columnas_registro = ["FECHA", "RUT", "DV", "PRESTACION", "TIPO", "PS-FAM ",
+                             "ESPECIALIDAD", "MEDICAMENTO", "RUT_Combined"]
+        columnas_sin_fecha = ["RUT_Combined", "Farmaco_Desc", "CantidadDespachada",
+                              "LocalSolicitante", "Fecha", "Origen"]
+
+        df = farmacia_ges.reset_index(drop=True)
+        posiciones = np.arange(len(df))
+        condiciones = self.get_ges_conditions(df["RUT_Combined"]).reset_index(drop=True)
+        con_condicion = np.array([bool(condition) for condition in condiciones.tolist()], dtype=bool)
+        df = df[con_condicion].reset_index(drop=True)
+        posiciones = posiciones[con_condicion]
+        condiciones = condiciones[con_condicion].reset_index(drop=True)
+
+        # Prestación por patología; None = saltar (ej: paliativos sin clasificación)
+        eventos_condicion = None if eventos is None else []
+        prestaciones = self.determinar_codigos_trazadora_medicamentos(df, condiciones, eventos_condicion)
+        if eventos is not None:
+            eventos += [tabla.set_axis(posiciones[tabla.index.to_numpy(dtype=int)]) for tabla in eventos_condicion]
+        con_prestacion = prestaciones.notna().to_numpy()
+        df = df[con_prestacion].reset_index(drop=True)
+        posiciones = posiciones[con_prestacion]
+        condiciones = condiciones[con_prestacion].reset_index(drop=True)
+        prestaciones = prestaciones[con_prestacion].reset_index(drop=True)
+
+        def columna(nombre, default=""):
+            if nombre in df.columns:
+                return df[nombre]
+            return pd.Series([default] * len(df), index=df.index, dtype=object)
+
+        # Fecha según el origen: FechaEmision para recetas GES, FechaDespacho para farmacia
+        origen = columna("_origen", "farmacia")
+        es_receta = (origen == "recetas").to_numpy()
+        fechas = pd.Series(
+            np.where(es_receta,
+                     columna("FechaEmision").to_numpy(dtype=object),
+                     columna("FechaDespacho").to_numpy(dtype=object)),
+            index=df.index, dtype=object,
+        )
+        fechas[fechas.isna()] = ""
+        sin_fecha = np.array([str(fecha).strip() == "" for fecha in fechas.tolist()], dtype=bool)
+
+        casos_sin_fecha = pd.DataFrame({
+            "RUT_Combined": df["RUT_Combined"],
+            "Farmaco_Desc": columna("Farmaco_Desc"),
+            "CantidadDespachada": columna("CantidadDespachada"),
+            "LocalSolicitante": columna("LocalSolicitante"),
+            "Fecha": fechas,
+            "Origen": origen,
+        }, columns=columnas_sin_fecha)[sin_fecha].reset_index(drop=True)
+
+        posiciones_sin_fecha = posiciones[sin_fecha]
+        con_fecha = ~sin_fecha
+        df = df[con_fecha].reset_index(drop=True)
+        posiciones = posiciones[con_fecha]
+        if df.empty:
+            registros = pd.DataFrame(columns=columnas_registro)
+            if con_posiciones:
+                return registros, casos_sin_fecha, posiciones, posiciones_sin_fecha
+            return registros, casos_sin_fecha
+        condiciones = condiciones[con_fecha].reset_index(drop=True)
+        prestaciones = prestaciones[con_fecha].reset_index(drop=True)
+        fechas = fechas[con_fecha].reset_index(drop=True)
+
+        # RUT y DV se extraen una vez por RUT único
+        ruts = df["RUT_Combined"]
+        ruts_unicos = pd.unique(ruts)
+        numeros = {rut: self.extract_rut_number(rut) for rut in ruts_unicos}
+        dvs = {rut: self.extract_rut_dv(rut) for rut in ruts_unicos}
+
+        registros = pd.DataFrame({
+            "FECHA": self.format_dates_for_excel(fechas, etiqueta="medicamentos", ahora=ahora),
+            "RUT": ruts.map(numeros),
+            "DV": ruts.map(dvs),
+            "PRESTACION": prestaciones,
+            "TIPO": "AUGE",
+            "PS-FAM ": condiciones.map(lambda condition: self.get_codigo_prestacion(condition)),
+            "ESPECIALIDAD": np.where(condiciones == "Paliativos", "07-116-3", "07-102-0"),
+            "MEDICAMENTO": columna("Farmaco_Desc"),
+            "RUT_Combined": ruts,
+        }, columns=columnas_registro)
+        if con_posiciones:
+            return registros, casos_sin_fecha, posiciones, posiciones_sin_fecha
+        return registros, casos_sin_fecha
+
+    def determinar_codigos_trazadora_medicamentos(self, df, condiciones, eventos=None):
+        """
+        Versión columnar de determinar_codigo_trazadora_medicamento.
+
+        Asigna la trazadora con el motor de reglas (una evaluación por descripción
+        distinta) y resuelve severidad FQ / clasificación paliativa una vez por RUT.
+        None = saltar medicamento. `eventos` (lista) recibe los eventos de cada fila.
+        """
+        condiciones = pd.Series(condiciones.to_numpy(dtype=object), index=df.index)
+        codigos = pd.Series([None] * len(df), index=df.index, dtype=object)
+        if df.empty:
+            return codigos
+
+        descripciones = self._descripciones_medicamentos(df)
+        ruts_pacientes = self._ruts_pacientes_medicamentos(df)
+
+        # Patologías con reglas: palabras clave por prioridad y, si corresponde, datos del paciente
+        for patologia in self.reglas_trazadoras.patologias():
+            mascara = (condiciones == patologia).to_numpy()
+            if mascara.any():
+                asignados = self.reglas_trazadoras.clasificar(descripciones[mascara], patologia)
+                codigos[mascara] = self._resolver_trazadoras_paciente(
+                    asignados, ruts_pacientes[mascara], eventos
+                ).to_numpy()
+                for codigo, cantidad in codigos[mascara].value_counts().items():
+                    self.eventos.sumar(f"Trazadora {patologia} {codigo}", cantidad)
+                if eventos is not None:
+                    eventos.append(eventos_por_fila(codigos[mascara].map(
+                        lambda codigo: None if pd.isna(codigo) else f"Trazadora {patologia} {codigo}"
+                    )))
+
+        # Otras patologías: regla fila a fila del procesador de trazadoras
+        otras = ~condiciones.isin(self.reglas_trazadoras.patologias()).to_numpy()
+        if otras.any():
+            resultados = []
+            capturar = contextlib.nullcontext if eventos is None else self.eventos.capturar
+            for indice, medicamento, condition in zip(df.index[otras], df[otras].to_dict("records"), condiciones[otras]):
+                with capturar() as capturados:
+                    resultados.append(self.determinar_codigo_trazadora_medicamento(medicamento, condition))
+                if eventos is not None:
+                    eventos += [eventos_por_fila(pd.Series([categoria] * cantidad, index=[indice] * cantidad))
+                                for categoria, cantidad in capturados.items()]
+            codigos[otras] = resultados
+
+        return codigos
+
+    def _resolver_trazadoras_paciente(self, asignados, ruts_pacientes, eventos=None):
+        """
+        Reemplazar los códigos que dependen del paciente (severidad FQ / paliativos), una vez por RUT.
+        `eventos` (lista) recibe los eventos de cada fila (ver ContadorEventos.resolver_por_unidad).
+        """
+        resolutores = {
+            RESOLVER_SEVERIDAD_FQ: self._trazadora_fibrosis_por_severidad,
+            RESOLVER_CLASIFICACION_PALIATIVOS: self._trazadora_paliativo_medicamento,
+        }
+        resultado = asignados.copy()
+        for resolver, funcion in resolutores.items():
+            mascara = (asignados == resolver).to_numpy()
+            if mascara.any():
+                por_rut = self.eventos.resolver_por_unidad(funcion, ruts_pacientes[mascara], resolver, eventos)
+                resultado[mascara] = por_rut.to_numpy(dtype=object)
+        return resultado
+
+    def _resolver_trazadora_paciente(self, codigo, rut_paciente):
+        """Versión escalar de _resolver_trazadoras_paciente"""
+        if codigo == RESOLVER_SEVERIDAD_FQ:
+            return self._trazadora_fibrosis_por_severidad(rut_paciente)
+        if codigo == RESOLVER_CLASIFICACION_PALIATIVOS:
+            return self._trazadora_paliativo_medicamento(rut_paciente)
+        return codigo
+
+    def _descripciones_medicamentos(self, df):
+        """Descripción del medicamento por fila, con los mismos campos candidatos que la versión escalar"""
+        campos = ["Farmaco_Desc", "MEDICAMENTO", "medicamento", "Farmaco", "FARMACO"]
+        campos += [c for c in df.columns if isinstance(c, str) and c.lower() in ["farmaco_desc", "medicamento", "farmaco"]]
+
+        descripciones = [""] * len(df)
+        for campo in campos:
+            if campo not in df.columns:
+                continue
+            for i, valor in enumerate(df[campo].tolist()):
+                if not descripciones[i] and valor and str(valor).strip():
+                    descripciones[i] = str(valor)
+        return pd.Series(descripciones, index=df.index, dtype=object)
+
+    def _ruts_pacientes_medicamentos(self, df):
+        """RUT del paciente por fila (RUNPaciente, RUT o RutPaciente) como texto"""
+        vacio = [""] * len(df)
+        candidatos = [df[c].tolist() if c in df.columns else vacio for c in ("RUNPaciente", "RUT", "RutPaciente")]
+        return pd.Series([str(a or b or c) for a, b, c in zip(*candidatos)], index=df.index, dtype=object)
+
+    @staticmethod
+    def _contiene_palabras(texto, palabras):
+        """Máscara booleana: el texto contiene alguna de las palabras"""
+        patron = "|".join(re.escape(palabra) for palabra in palabras)
+        return texto.str.contains(patron, regex=True).fillna(False).to_numpy(dtype=bool)
+
+    def identificar_casos_revision_medicamentos(self, farmacia_no_ges):
+        """Pacientes NO-GES que reciben medicamentos especiales (paliativos, asma, FQ)"""
+        columnas = ["RUT", "FARMACO", "TIPO_MEDICAMENTO", "FECHA_DESPACHO", "MOTIVO", "ACCION_REQUERIDA"]
+        df = farmacia_no_ges.reset_index(drop=True)
+        if df.empty:
+            return pd.DataFrame(columns=columnas)
+
+        vacio = pd.Series([""] * len(df), index=df.index, dtype=object)
+        farmaco = df["Farmaco_Desc"] if "Farmaco_Desc" in df.columns else vacio
+        texto = farmaco.astype(str).str.upper()
+
+        mascaras = [self._contiene_palabras(texto, palabras) for palabras, _ in MEDICAMENTOS_REVISION_NO_GES]
+        tipos = np.select(mascaras, [tipo for _, tipo in MEDICAMENTOS_REVISION_NO_GES], default="")
+        es_especial = tipos != ""
+
+        casos = pd.DataFrame({
+            "RUT": df["RUT_Combined"],
+            "FARMACO": farmaco,
+            "TIPO_MEDICAMENTO": tipos.astype(object),
+            "FECHA_DESPACHO": df["FechaDespacho"] if "FechaDespacho" in df.columns else vacio,
+            "MOTIVO": "PACIENTE NO ESTÁ EN POBLACIÓN GES",
+            "ACCION_REQUERIDA": "VERIFICAR SI DEBE INCLUIRSE EN GES",
+        }, columns=columnas)
+        return casos[es_especial].reset_index(drop=True)
+
+    def deduplicar_medicamentos(self, registros):
+        """
+        Versión columnar de agrupar_medicamentos_por_rut para todos los pacientes.
+
+        Mantiene el registro más reciente por RUT + PRESTACIÓN con un solo ordenamiento
+        estable (paciente en orden de aparición, FECHA descendente) y drop_duplicates.
+        """
+        if registros.empty:
+            return registros.drop(columns=["RUT_Combined"]).reset_index(drop=True)
+
+        grupos = pd.factorize(registros["RUT_Combined"], sort=False)[0]
+        ordenados = registros.assign(_grupo=grupos, _posicion=np.arange(len(registros)))
+        ordenados = ordenados.sort_values(
+            ["_grupo", "FECHA", "_posicion"], ascending=[True, False, True], kind="mergesort"
+        )
+        unicos = ordenados.drop_duplicates(subset=["_grupo", "RUT", "PRESTACION"], keep="first")
+
+        antes = np.bincount(grupos)
+        despues = np.bincount(unicos["_grupo"].to_numpy(), minlength=len(antes))
+        primeras = np.unique(grupos, return_index=True)[1]
+        ruts = registros["RUT"].to_numpy(dtype=object)
+        con_duplicados = np.flatnonzero(antes != despues)
+        self.eventos.sumar("RUT con medicamentos duplicados", len(con_duplicados))
+        self.eventos.sumar("Medicamentos duplicados eliminados (RUT+PRESTACIÓN)", (antes - despues).sum())
+        if self.eventos.detalle_activo():
+            for grupo in con_duplicados:
+                self.eventos.logger.debug(
+                    "    🔄 RUT %s: %s → %s medicamentos (eliminados %s duplicados por RUT+PRESTACIÓN)",
+                    ruts[primeras[grupo]], antes[grupo], despues[grupo], antes[grupo] - despues[grupo],
+                )
+
+        return unicos.drop(columns=["_grupo", "_posicion", "RUT_Combined"]).reset_index(drop=True)
 
     def determinar_codigo_trazadora_consulta(self, consulta, condition):
         """Determinar código trazadora para consulta usando datos del arancel"""
@@ -1274,7 +2398,6 @@ class GESDataProcessor:
                 for field in possible_fields:
                     if field in medicamento and medicamento[field] and str(medicamento[field]).strip():
                         medicamento_desc = str(medicamento[field])
-                        print(f"🔬 DEBUG: Usando campo '{field}' = '{medicamento_desc[:50]}...'")
                         break
                 
                 if not medicamento_desc:
@@ -1282,7 +2405,6 @@ class GESDataProcessor:
                     for key, value in medicamento.items():
                         if value and str(value).strip() and key.lower() in ["farmaco_desc", "medicamento", "farmaco"]:
                             medicamento_desc = str(value)
-                            print(f"🔬 DEBUG: Campo fallback '{key}' = '{medicamento_desc[:50]}...'")
                             break
                 
                 rut_paciente = str(medicamento.get("RUNPaciente", "") or medicamento.get("RUT", "") or medicamento.get("RutPaciente", ""))
@@ -1290,104 +2412,10 @@ class GESDataProcessor:
                 medicamento_desc = str(medicamento)
                 rut_paciente = ""
             
-            # Para PALIATIVOS: Usar nuestra función mejorada que maneja campos vacíos
-            if condition == "Paliativos":
-                tipo_paliativo = self.determinar_tipo_paliativo(rut_paciente)
-                
-                if tipo_paliativo == "progresivo":
-                    return "3002023"  # Progresivo - cáncer terminal
-                elif tipo_paliativo == "no_progresivo":
-                    return "3002123"  # No progresivo - tratamiento integral
-                elif tipo_paliativo == "campo_vacio":
-                    print(f"⚠️ PALIATIVO SKIPPED: RUT {rut_paciente} - Campo vacío, saltando procesamiento")
-                    return None  # Saltar este medicamento
-                else:  # tipo_paliativo es None (no encontrado o error)
-                    print(f"⚠️ PALIATIVO SKIPPED: RUT {rut_paciente} - No encontrado en BD, saltando procesamiento")
-                    return None  # Saltar este medicamento
-            
-            # Para FIBROSIS: Usar severidad específica Y mapeo por medicamento mejorado
-            elif condition == "Fibrosis":
-                # Mapeo específico de medicamentos FQ con detección mejorada
-                medicamento_lower = medicamento_desc.lower()
-                
-                # TRIKAFTA - medicamento específico para FQ con código 2508141
-                if "trikafta" in medicamento_lower or "trikafta" in medicamento_desc.lower():
-                    return "2508141"  # TRIKAFTA - Código específico
-                
-                # TOBRAMICINA - detección ampliada para diferentes presentaciones
-                if any(keyword in medicamento_lower for keyword in [
-                    "tobramicina", "tobrex", "bramitob", "nebcin"
-                ]):
-                    return "3004004"  # TRATAMIENTO FARMACOLOGICO CON TOBRAMICINA
-                
-                # Usar severidad para el resto de medicamentos
-                if rut_paciente:
-                    try:
-                        severidad = self.determinar_severidad_fq(int(rut_paciente))
-                    except:
-                        severidad = "leve"  # Por defecto si hay error
-                else:
-                    severidad = "leve"  # Por defecto
-                
-                if severidad == "grave":
-                    return "2505256"  # TRATAMIENTO FIBROSIS QUISTICA GRAVE
-                elif severidad == "moderada":
-                    return "2505260"  # TRATAMIENTO FIBROSIS QUISTICA MODERADA
-                else:  # leve
-                    return "2505263"  # TRATAMIENTO FIBROSIS QUISTICA LEVE
-            
-            # Para EPOC: Usar nueva trazadora
-            elif condition == "EPOC":
-                return "3801002"  # Nueva trazadora EPOC medicamentos
-            
-            # Para ASMA: Mapear por medicamento específico con detección mejorada
-            elif condition == "ASMA":
-                medicamento_lower = medicamento_desc.lower()
-                print(f"🔬 DEBUG ASMA: {medicamento_desc[:50]}... → lower: {medicamento_lower[:50]}...")
-                
-                # MEPOLIZUMAB Y OMALIZUMAB - medicamentos biológicos específicos con código 2508156
-                if any(keyword in medicamento_lower for keyword in ["mepolizumab", "omalizumab"]):
-                    print(f"🎯 DETECTADO MEPOLIZUMAB/OMALIZUMAB → 2508156")
-                    return "2508156"  # Código específico para biológicos de ASMA
-                
-                # Mapeo específico de medicamentos ASMA según arancel (orden de prioridad)
-                # 1. SALBUTAMOL - broncodilatador específico
-                if "salbutamol" in medicamento_lower:
-                    print(f"🎯 DETECTADO SALBUTAMOL → 3902001")
-                    return "3902001"  # SALBUTAMOL 200 DOSIS (100 UG)
-                
-                # 2. TEOFILINA - broncodilatador oral
-                elif "teofilina" in medicamento_lower or "aminofilina" in medicamento_lower:
-                    print(f"🎯 DETECTADO TEOFILINA → 3902003")
-                    return "3902003"  # TEOFILINA ANH CM 200MG
-                
-                # 3. PREDNISONA - corticoesteroide oral
-                elif "prednizona" in medicamento_lower or "prednisona" in medicamento_lower:
-                    print(f"🎯 DETECTADO PREDNISONA → 3902004")
-                    return "3902004"  # PREDNISONA 5 MG
-                
-                # 4. IPRATROPIO - anticolinérgico
-                elif "ipratropio" in medicamento_lower or "ipatropio" in medicamento_lower:
-                    print(f"🎯 DETECTADO IPRATROPIO → 3902006")
-                    return "3902006"  # IPRATROPIO BROMURO INH. 20 MCG/1DO FC 200 DOSIS
-                
-                # 5. DESLORATADINA - antihistamínico específico (no loratadina genérica)
-                elif "desloratadina" in medicamento_lower:
-                    print(f"🎯 DETECTADO DESLORATADINA → 3902005")
-                    return "3902005"  # DESLORATADINA 5 MG
-                
-                # 6. CORTICOIDES INHALATORIOS - detección ampliada
-                elif any(keyword in medicamento_lower for keyword in [
-                    "budesonida", "budes", "fluticasona", "fluti", "beclometasona", "mometasona",
-                    "corticoide", "formoterol", "salmeterol", "vilanterol"
-                ]):
-                    print(f"🎯 DETECTADO CORTICOIDE → 3902002")
-                    return "3902002"  # CORTICOIDE INHALATORIO/BETA2 DE ACCIÓN PROLONGADA
-                
-                # Por defecto: SALBUTAMOL
-                else:
-                    print(f"🎯 NO DETECTADO → 3902001 (default)")
-                    return "3902001"  # SALBUTAMOL por defecto
+            # ASMA / Fibrosis / EPOC / Paliativos: reglas de reglas_trazadoras.csv
+            if self.reglas_trazadoras.tiene_reglas(condition):
+                codigo = self.reglas_trazadoras.clasificar_descripcion(medicamento_desc, condition)
+                return self._resolver_trazadora_paciente(codigo, rut_paciente)
             
             # Intentar usar trazadora processor para otras condiciones
             elif hasattr(self.trazadora_processor, "determinar_trazadora_medicamento"):
@@ -1414,6 +2442,35 @@ class GESDataProcessor:
             else:
                 return "2301001"
 
+    def _trazadora_paliativo_medicamento(self, rut_paciente):
+        """Código de medicamento paliativo según clasificación (None = saltar medicamento)"""
+        tipo_paliativo = self.determinar_tipo_paliativo(rut_paciente)
+
+        if tipo_paliativo == "progresivo":
+            return "3002023"  # Progresivo - cáncer terminal
+        elif tipo_paliativo == "no_progresivo":
+            return "3002123"  # No progresivo - tratamiento integral
+        elif tipo_paliativo == "campo_vacio":
+            self.eventos.registrar("Medicamentos paliativos omitidos (condición vacía)",
+                                   "⚠️ PALIATIVO SKIPPED: RUT %s - Campo vacío, saltando procesamiento", rut_paciente)
+            return None
+        else:  # tipo_paliativo es None (no encontrado o error)
+            self.eventos.registrar("Medicamentos paliativos omitidos (sin clasificación)",
+                                   "⚠️ PALIATIVO SKIPPED: RUT %s - No encontrado en BD, saltando procesamiento", rut_paciente)
+            return None
+
+    def _trazadora_fibrosis_por_severidad(self, rut_paciente):
+        """Código de tratamiento FQ según la severidad del paciente (leve por defecto)"""
+        if rut_paciente:
+            try:
+                severidad = self.determinar_severidad_fq(int(rut_paciente))
+            except:
+                severidad = "leve"  # Por defecto si hay error
+        else:
+            severidad = "leve"  # Por defecto
+
+        return TRAZADORAS_FIBROSIS_SEVERIDAD.get(severidad, TRAZADORAS_FIBROSIS_SEVERIDAD["leve"])
+
     def determinar_tipo_prestacion(self, consulta):
         """Determinar tipo de prestación"""
         # Lógica simplificada
@@ -1432,11 +2489,10 @@ class GESDataProcessor:
         if len(medicamentos_rut) == 1:
             return medicamentos_rut
 
-        # Ordenar primero por fecha para mantener la más reciente
-        # FECHA ya es datetime object, no necesita conversión
-        medicamentos_rut_sorted = sorted(medicamentos_rut, 
-                                       key=lambda x: x.get("FECHA") if isinstance(x.get("FECHA"), (pd.Timestamp, datetime)) else pd.to_datetime(x.get("FECHA"), errors='coerce'), 
-                                       reverse=True)
+        # Ordenar primero por fecha para mantener la más reciente (fechas parseadas una sola vez)
+        fechas = self._claves_fecha(medicamentos_rut)
+        orden = sorted(range(len(medicamentos_rut)), key=lambda i: fechas[i], reverse=True)
+        medicamentos_rut_sorted = [medicamentos_rut[i] for i in orden]
 
         # Deduplicar por RUT + PRESTACIÓN: mantener SOLO el más reciente
         medicamentos_unicos = {}
@@ -1458,10 +2514,20 @@ class GESDataProcessor:
         if len(medicamentos_rut) != len(medicamentos_finales):
             rut_sample = medicamentos_rut[0].get("RUT", "")
             eliminados = len(medicamentos_rut) - len(medicamentos_finales)
-            print(f"    🔄 RUT {rut_sample}: {len(medicamentos_rut)} → {len(medicamentos_finales)} medicamentos (eliminados {eliminados} duplicados por RUT+PRESTACIÓN)")
+            self.eventos.registrar("RUT con medicamentos duplicados",
+                                   "    🔄 RUT %s: %s → %s medicamentos (eliminados %s duplicados por RUT+PRESTACIÓN)",
+                                   rut_sample, len(medicamentos_rut), len(medicamentos_finales), eliminados)
+            self.eventos.sumar("Medicamentos duplicados eliminados (RUT+PRESTACIÓN)", eliminados)
 
         return medicamentos_finales
 
+    def _claves_fecha(self, registros):
+        """FECHA de cada registro como datetime para ordenar (se parsea en bloque si viene como texto)"""
+        fechas = [registro.get("FECHA") for registro in registros]
+        if all(isinstance(fecha, (pd.Timestamp, datetime)) for fecha in fechas):
+            return fechas
+        return parse_dates_series(fechas)[0].tolist()
+
     def normalizar_codigo_familia(self, cod_fam):
         """
         Normalizar códigos de familia manteniendo las terminaciones importantes:
@@ -1524,10 +2590,10 @@ class GESDataProcessor:
         # Agrupar por RUT + PRESTACION + FECHA para eliminar duplicados exactos
         consultas_unicas = {}
 
-        # Ordenar primero por fecha para mantener la más reciente
-        consultas_rut_sorted = sorted(consultas_rut, 
-                                    key=lambda x: pd.to_datetime(x.get("FECHA"), format="%d-%m-%Y", errors='coerce'), 
-                                    reverse=True)
+        # Ordenar primero por fecha para mantener la más reciente (fechas parseadas una sola vez)
+        fechas = self._claves_fecha(consultas_rut)
+        orden = sorted(range(len(consultas_rut)), key=lambda i: fechas[i], reverse=True)
+        consultas_rut_sorted = [consultas_rut[i] for i in orden]
 
         for consulta in consultas_rut_sorted:
             # Crear clave única por RUT + PRESTACIÓN + FECHA
@@ -1545,49 +2611,50 @@ class GESDataProcessor:
         
         if len(consultas_rut) != len(consultas_finales):
             rut = consultas_rut[0].get("RUT", "")  # Cambiado de NUMDOCUMENTO a RUT
-            print(f"    🔄 RUT {rut}: {len(consultas_rut)} → {len(consultas_finales)} consultas (eliminados duplicados por prestación y fecha)")
-            # Imprimir detalles de las consultas eliminadas para debug
-            fechas_originales = set(c.get("FECHA", "") for c in consultas_rut)
-            fechas_finales = set(c.get("FECHA", "") for c in consultas_finales)
-            fechas_eliminadas = fechas_originales - fechas_finales
-            if fechas_eliminadas:
-                print(f"       📅 Fechas eliminadas: {sorted(list(fechas_eliminadas))}")
+            self.eventos.registrar("RUT con consultas duplicadas",
+                                   "    🔄 RUT %s: %s → %s consultas (eliminados duplicados por prestación y fecha)",
+                                   rut, len(consultas_rut), len(consultas_finales))
+            self.eventos.sumar("Consultas duplicadas eliminadas (prestación y fecha)", len(consultas_rut) - len(consultas_finales))
+            # Detalle de las consultas eliminadas para debug
+            if self.eventos.detalle_activo():
+                fechas_originales = set(c.get("FECHA", "") for c in consultas_rut)
+                fechas_finales = set(c.get("FECHA", "") for c in consultas_finales)
+                fechas_eliminadas = fechas_originales - fechas_finales
+                if fechas_eliminadas:
+                    self.eventos.logger.debug("       📅 Fechas eliminadas: %s", sorted(list(fechas_eliminadas)))
 
         return consultas_finales
 
     def format_date(self, date_str):
         """Formatear fecha para el archivo de carga"""
-        try:
-            if pd.isna(date_str):
-                return datetime.now().strftime("%d-%m-%Y")
-
-            # Intentar diferentes formatos
-            for fmt in ["%d-%m-%Y", "%Y-%m-%d", "%d/%m/%Y"]:
-                try:
-                    return pd.to_datetime(str(date_str), format=fmt).strftime("%d-%m-%Y")
-                except:
-                    continue
-
-            return pd.to_datetime(str(date_str)).strftime("%d-%m-%Y")
-        except:
-            return datetime.now().strftime("%d-%m-%Y")
+        fecha = self.format_date_for_excel(date_str)
+        if pd.isna(fecha):
+            fecha = datetime.now()
+        return fecha.strftime("%d-%m-%Y")
 
     def format_date_for_excel(self, date_str):
         """Formatear fecha como datetime object para Excel (como en archivo de referencia)"""
-        try:
-            if pd.isna(date_str):
-                return datetime.now()
+        return self.format_dates_for_excel([date_str]).iloc[0]
 
-            # Intentar diferentes formatos y retornar datetime object
-            for fmt in ["%d-%m-%Y", "%Y-%m-%d", "%d/%m/%Y"]:
-                try:
-                    return pd.to_datetime(str(date_str), format=fmt)
-                except:
-                    continue
+    def format_dates_for_excel(self, fechas, etiqueta=None, ahora=None):
+        """
+        Versión columnar de format_date_for_excel (ver parse_dates_series).
 
-            return pd.to_datetime(str(date_str))
-        except:
-            return datetime.now()
+        Con `etiqueta` se acumula el conteo por formato en self.estadisticas_fechas
+        y se imprime un resumen para diagnóstico.
+        """
+        resultado, conteo = parse_dates_series(fechas, ahora=ahora)
+
+        if etiqueta:
+            acumulado = self.estadisticas_fechas.setdefault(etiqueta, {})
+            for formato, cantidad in conteo.items():
+                acumulado[formato] = acumulado.get(formato, 0) + cantidad
+            detalle = ", ".join(f"{formato}: {cantidad}" for formato, cantidad in conteo.items() if cantidad)
+            print(f"   📅 Fechas {etiqueta}: {detalle or 'sin registros'}")
+            if conteo["no_reconocida"] or conteo["sin_fecha"]:
+                print(f"   ⚠️ {conteo['no_reconocida'] + conteo['sin_fecha']} fechas sin formato reconocido, usando fecha actual")
+
+        return resultado
 
     def save_df_in_chunks(self, df, target_path, chunk_size=499):
         """
@@ -1597,6 +2664,10 @@ class GESDataProcessor:
         - Si requiere particionado, la primera parte se guarda en `target_path` y
           las siguientes en `base_part2.ext`, `base_part3.ext`, ...
         - Soporta .xlsx, .xls y .csv (elige motor adecuado automáticamente).
+        - Cada parte se escribe en un temporal y se renombra (ges_salidas), en paralelo
+          según salida_pool/salida_trabajadores, y se deja `base_MANIFIESTO.json`.
+        - Antes de las partes se escribe el resultado completo (`base_COMPLETO.csv/.parquet`).
+        - Se eliminan partes y canónicos que una corrida anterior con el mismo nombre dejó de más.
         """
         try:
             if df is None or df.empty:
@@ -1625,31 +2696,38 @@ class GESDataProcessor:
                 target_path = base + ext
 
             total = len(df)
-            if total <= chunk_size:
-                # Guardar todo en un solo archivo
-                if ext == '.csv':
-                    df.to_csv(target_path, index=False)
-                else:
-                    df.to_excel(target_path, index=False, engine=engine)
+            # Resultado completo en un solo archivo; las partes se derivan del mismo DataFrame
+            canonicos = guardar_salida_canonica(df, target_path, self.salida_canonica)
+
+            # Particionar: primera parte en target_path para compatibilidad
+            partes = []
+            for part_index, start in enumerate(range(0, total, chunk_size), start=1):
+                part_path = target_path if part_index == 1 else f"{base}_part{part_index}{ext}"
+                partes.append((df.iloc[start:start+chunk_size], part_path))
+
+            if ext == '.csv':
+                motor = 'csv'
+            elif ext == '.xlsx' and self.escritura_excel_rapida:
+                motor = 'ges_excel'
+            else:
+                motor = engine
+            # Sin partes ni canónicos sobrantes de una corrida anterior más grande con el mismo nombre
+            limpiar_salida_anterior(target_path, len(partes), canonicos, self.salida_manifiesto)
+            try:
+                hashes = escribir_partes(partes, motor, self.salida_pool, self.salida_trabajadores)
+            except Exception as e:
+                # Las partes de este destino se eliminaron; el manifiesto deja constancia del error
+                if self.salida_manifiesto:
+                    guardar_manifiesto_partes(target_path, [], [], total, canonicos, error=str(e) or type(e).__name__)
+                raise
+            if self.salida_manifiesto:
+                guardar_manifiesto_partes(target_path, partes, hashes, total, canonicos)
+
+            if len(partes) == 1:
                 print(f"✅ Archivo guardado: {target_path} ({total} filas)")
                 return
-
-            # Particionar y guardar. Primera parte en target_path para compatibilidad.
-            part_index = 1
-            for start in range(0, total, chunk_size):
-                part_df = df.iloc[start:start+chunk_size]
-                if part_index == 1:
-                    part_path = target_path
-                else:
-                    part_path = f"{base}_part{part_index}{ext}"
-
-                if ext == '.csv':
-                    part_df.to_csv(part_path, index=False)
-                else:
-                    part_df.to_excel(part_path, index=False, engine=engine)
-
+            for part_index, (part_df, part_path) in enumerate(partes, start=1):
                 print(f"✅ Parte {part_index} guardada: {part_path} ({len(part_df)} filas)")
-                part_index += 1
 
         except Exception as e:
             print(f"❌ Error guardando archivos en chunks para {target_path}: {e}")
@@ -1843,7 +2921,7 @@ class GESDataProcessor:
 
             # Consultas por especialidad
             if "EspecialidadLocal" in consultas_ges.columns:
-                especialidades = consultas_ges["EspecialidadLocal"].value_counts()
+                especialidades = consultas_ges["EspecialidadLocal"].astype(object).value_counts()
 
                 f.write("CONSULTAS POR ESPECIALIDAD:\n")
                 f.write("-" * 30 + "\n")
@@ -1854,7 +2932,7 @@ class GESDataProcessor:
             if "EstadoCita_Desc" in consultas_ges.columns:
                 f.write("\nESTADOS DE CITAS:\n")
                 f.write("-" * 20 + "\n")
-                estados = consultas_ges["EstadoCita_Desc"].value_counts()
+                estados = consultas_ges["EstadoCita_Desc"].astype(object).value_counts()
                 for estado, count in estados.items():
                     f.write(f"{estado}: {count} citas\n")
 
@@ -1899,23 +2977,52 @@ class GESDataProcessor:
         print(f"✅ Reporte estadístico general generado: {reporte_file}")
 
     def procesar_todo(self):
-        """Procesar todo el flujo completo"""
+        """Procesar todo el flujo completo (con tiempos por etapa y manifiesto de la corrida)"""
         print("🚀 INICIANDO PROCESAMIENTO COMPLETO GES")
         print("=" * 50)
 
+        medicion = PerfilEjecucion(self.perfilar_etapas, self.outputs_path)
+        self.ultima_medicion = medicion
+        try:
+            return self._procesar_etapas(medicion)
+        finally:
+            if medicion.etapas:
+                medicion.imprimir_resumen()
+                archivos = {tipo: archivo for tipo, archivo in self.selected_files.items() if archivo}
+                try:
+                    manifiesto = medicion.guardar_manifiesto(self.outputs_path, {"archivos_entrada": archivos})
+                    print(f"🧾 Manifiesto de ejecución: {manifiesto}")
+                except OSError as e:
+                    print(f"⚠️ No se pudo guardar el manifiesto de ejecución: {e}")
+
+    def _procesar_etapas(self, medicion):
+        """Etapas de procesar_todo, cada una medida en `medicion`"""
         # 1. Cargar datos
-        if not self.load_data():
+        with medicion.etapa("carga") as etapa:
+            cargado = self.load_data()
+            etapa["filas_salida"] = {
+                "poblacion_ges": contar_filas(self.ges_df),
+                "consultas": contar_filas(self.consulta_df),
+                "farmacia": contar_filas(self.farmacia_df),
+                "medicamentos_ges": contar_filas(self.medicamentos_ges_df),
+                "recetas_ges": contar_filas(self.recetas_ges_df),
+            }
+        if not cargado:
             return False
 
         # 1.5. Cargar arancel GES para trazadoras
-        print("\n📋 CARGANDO ARANCEL GES...")
-        if self.trazadora_processor.cargar_arancel_ges():
-            self.trazadora_processor.extraer_trazadoras_medicamentos()
-            self.trazadora_processor.extraer_trazadoras_consultas()
-            # self.trazadora_processor.extraer_especialidades_del_arancel()  # Método no existe
+        with medicion.etapa("arancel") as etapa:
+            print("\n📋 CARGANDO ARANCEL GES...")
+            if self.trazadora_processor.cargar_arancel_ges():
+                self.trazadora_processor.extraer_trazadoras_medicamentos()
+                self.trazadora_processor.extraer_trazadoras_consultas()
+                # self.trazadora_processor.extraer_especialidades_del_arancel()  # Método no existe
+            etapa["filas_salida"] = contar_filas(self.trazadora_processor.arancel_df)
 
         # 2. Analizar medicamentos GES
-        self.analizar_medicamentos_ges()
+        with medicion.etapa("analisis_medicamentos", contar_filas(self.farmacia_df)) as etapa:
+            self.analizar_medicamentos_ges()
+            etapa["filas_salida"] = len(self.medicamentos_encontrados.get("coincidencias", []))
 
         # 3. Procesar consultas
         if hasattr(self, "consulta_df") and self.consulta_df is not None:
@@ -1923,7 +3030,8 @@ class GESDataProcessor:
                 self.outputs_path,
                 f"CARGA_CONSULTAS_GES_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xls",
             )
-            self.procesar_consultas_para_carga(self.consulta_df, archivo_consultas)
+            with medicion.etapa("consultas", contar_filas(self.consulta_df)) as etapa:
+                etapa["filas_salida"] = contar_filas(self.procesar_consultas_para_carga(self.consulta_df, archivo_consultas))
 
         # 4. Procesar medicamentos
         if hasattr(self, "farmacia_df") and self.farmacia_df is not None:
@@ -1931,17 +3039,23 @@ class GESDataProcessor:
                 self.outputs_path,
                 f"CARGA_MEDICAMENTOS_GES_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xls",
             )
-            self.procesar_medicamentos_para_carga(self.farmacia_df, archivo_medicamentos)
+            filas_entrada = len(self.farmacia_df) + (contar_filas(self.recetas_ges_df) or 0)
+            with medicion.etapa("medicamentos", filas_entrada) as etapa:
+                etapa["filas_salida"] = contar_filas(
+                    self.procesar_medicamentos_para_carga(self.farmacia_df, archivo_medicamentos)
+                )
 
         # 5. Generar archivo de cruce con especialidades
         if self.ges_df is not None:
-            self.trazadora_processor.generar_archivo_cruce(
-                self.ges_df, self.consulta_df, self.farmacia_df
-            )
+            with medicion.etapa("cruce", len(self.ges_df)):
+                self.trazadora_processor.generar_archivo_cruce(
+                    self.ges_df, self.consulta_df, self.farmacia_df
+                )
 
         # 6. Generar archivos adicionales
-        self.generar_reporte_medicamentos_ges()
-        self.generar_reportes_detallados()
+        with medicion.etapa("reportes"):
+            self.generar_reporte_medicamentos_ges()
+            self.generar_reportes_detallados()
 
         print("\n🎉 PROCESAMIENTO COMPLETADO")
         print("Revisa la carpeta 'outputs' para ver los resultados")
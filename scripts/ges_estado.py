@@ -0,0 +1,195 @@
+"""
+Estado persistente de registros ya clasificados (SQLite).
+
+Guarda, por fuente (consultas / medicamentos), el resultado de clasificar cada
+registro de entrada, identificado por un hash de su contenido. En la corrida
+siguiente solo se clasifican los registros nuevos o modificados; el resto se
+toma del estado. La deduplicación se repite sobre el total, así que la salida
+es la misma que procesando todo desde cero.
+
+Los resultados se guardan por lote (un DataFrame por tipo de resultado en cada
+corrida) y cada registro queda además en la tabla `registros` con su RUT, fecha
+y especialidad/fármaco, para consultarlo. Cada fuente guarda la firma del
+contexto de clasificación (población GES, severidad FQ, paliativos, reglas de
+trazadoras, configuración y código de la clasificación, y VERSION_ESTADO); si
+la firma cambia, su estado se descarta.
+"""
+
+import contextlib
+import hashlib
+import os
+import pickle
+import sqlite3
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# Subir cuando cambie la forma en que se guardan los registros clasificados (el código
+# que los clasifica ya va en la firma del contexto)
+VERSION_ESTADO = 2
+
+# Tipo de resultado de las filas que no generan registro (ej. paciente sin patología)
+OMITIDO = "_omitido"
+
+# Tipo de resultado con los eventos que contó cada fila al clasificarse (tupla por clave),
+# para repetir sus conteos cuando la fila se reutiliza
+EVENTOS = "_eventos"
+
+# Lotes a partir de los cuales se juntan en uno solo al guardar
+MAX_LOTES = 12
+
+# Claves de hash de pandas (16 caracteres) para formar una clave de 128 bits por registro
+_CLAVES_HASH = ("estado_registros", "registros_estado")
+_HEX = np.array([f"{i:02x}" for i in range(256)])
+
+
+def claves_registros(df):
+    """Clave de contenido de cada fila de `df` (todas sus columnas), 32 caracteres hexadecimales"""
+    if df.empty:
+        return np.array([], dtype="<U32")
+    partes = [pd.util.hash_pandas_object(df, index=False, hash_key=clave).to_numpy().astype(">u8")
+              for clave in _CLAVES_HASH]
+    octetos = np.column_stack(partes).view(np.uint8).reshape(len(df), 16)
+    return np.ascontiguousarray(_HEX[octetos]).view("<U32").ravel()
+
+
+def firma_contexto(*partes):
+    """
+    Firma SHA-256 de los datos de referencia de una clasificación.
+    Acepta DataFrames, diccionarios, rutas de archivos de código y textos.
+    """
+    sha = hashlib.sha256(f"v{VERSION_ESTADO}".encode("utf-8"))
+    for parte in partes:
+        if isinstance(parte, pd.DataFrame):
+            sha.update(repr([(str(c), str(t)) for c, t in parte.dtypes.items()]).encode("utf-8"))
+            sha.update(pd.util.hash_pandas_object(parte, index=False).to_numpy().tobytes())
+        elif isinstance(parte, dict):
+            sha.update(repr(sorted((str(k), str(v)) for k, v in parte.items())).encode("utf-8"))
+        elif isinstance(parte, str) and os.path.isfile(parte):
+            with open(parte, "rb") as f:
+                sha.update(f.read())
+        else:
+            sha.update(repr(parte).encode("utf-8"))
+        sha.update(b"\x00")
+    return sha.hexdigest()
+
+
+class EstadoRegistros:
+    """Registros clasificados por fuente en `ruta` (por defecto outputs/.cache/estado_registros.sqlite)"""
+
+    def __init__(self, ruta, habilitado=True):
+        self.ruta = ruta
+        self.habilitado = habilitado
+
+    def _conectar(self):
+        os.makedirs(os.path.dirname(self.ruta) or ".", exist_ok=True)
+        conexion = sqlite3.connect(self.ruta)
+        conexion.execute("PRAGMA cache_size = -65536")
+        conexion.execute("CREATE TABLE IF NOT EXISTS contextos (fuente TEXT PRIMARY KEY, firma TEXT, actualizado TEXT)")
+        conexion.execute(
+            "CREATE TABLE IF NOT EXISTS lotes (fuente TEXT, lote INTEGER, filas INTEGER, datos BLOB, creado TEXT, "
+            "PRIMARY KEY (fuente, lote))"
+        )
+        conexion.execute(
+            "CREATE TABLE IF NOT EXISTS registros (fuente TEXT, clave TEXT, tipo TEXT, rut TEXT, fecha TEXT, "
+            "detalle TEXT, actualizado TEXT, PRIMARY KEY (fuente, clave))"
+        )
+        return conexion
+
+    def cargar(self, fuente, firma):
+        """
+        Resultados guardados de `fuente` como {tipo: DataFrame con columna _clave}.
+        Si el contexto guardado no coincide con `firma`, el estado de la fuente se descarta.
+        """
+        if not self.habilitado:
+            return {}
+        try:
+            with contextlib.closing(self._conectar()) as conexion, conexion:
+                fila = conexion.execute("SELECT firma FROM contextos WHERE fuente = ?", (fuente,)).fetchone()
+                if fila is None or fila[0] != firma:
+                    if fila is not None:
+                        print(f"♻️ Estado de {fuente}: cambió el contexto de clasificación, se reclasifica todo")
+                    self._descartar(conexion, fuente, firma)
+                    return {}
+                lotes = [pickle.loads(datos) for (datos,) in conexion.execute(
+                    "SELECT datos FROM lotes WHERE fuente = ? ORDER BY lote", (fuente,))]
+        except (sqlite3.Error, pickle.UnpicklingError, EOFError) as e:
+            print(f"⚠️ Estado de registros ilegible, se reclasifica {fuente}: {e}")
+            return {}
+        return _juntar_lotes(lotes)
+
+    def guardar(self, fuente, firma, lote, registros):
+        """
+        Agregar un lote {tipo: DataFrame con _clave} de `fuente` y sus registros
+        [(clave, tipo, rut, fecha, detalle)] bajo el contexto `firma`.
+        """
+        if not self.habilitado:
+            return
+        actualizado = datetime.now().isoformat(timespec="seconds")
+        filas = sum(len(df) for df in lote.values())
+        try:
+            with contextlib.closing(self._conectar()) as conexion, conexion:
+                conexion.execute("INSERT OR REPLACE INTO contextos VALUES (?, ?, ?)", (fuente, firma, actualizado))
+                if filas:
+                    numero = conexion.execute(
+                        "SELECT COALESCE(MAX(lote), 0) + 1 FROM lotes WHERE fuente = ?", (fuente,)).fetchone()[0]
+                    conexion.execute("INSERT INTO lotes VALUES (?, ?, ?, ?, ?)",
+                                     (fuente, numero, filas, pickle.dumps(lote, protocol=pickle.HIGHEST_PROTOCOL),
+                                      actualizado))
+                    if numero > MAX_LOTES:
+                        self._compactar(conexion, fuente, actualizado)
+                # En orden de clave: inserta mucho más rápido en el índice de la tabla
+                conexion.executemany(
+                    "INSERT OR REPLACE INTO registros VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    ((fuente, clave, tipo, rut, fecha, detalle, actualizado)
+                     for clave, tipo, rut, fecha, detalle in sorted(registros, key=lambda registro: registro[0])),
+                )
+        except sqlite3.Error as e:
+            print(f"⚠️ No se pudo guardar estado de {fuente}: {e}")
+
+    def contar(self, fuente=None):
+        """Cantidad de registros guardados (de una fuente o en total)"""
+        if not os.path.exists(self.ruta):
+            return 0
+        with contextlib.closing(self._conectar()) as conexion:
+            if fuente is None:
+                return conexion.execute("SELECT COUNT(*) FROM registros").fetchone()[0]
+            return conexion.execute("SELECT COUNT(*) FROM registros WHERE fuente = ?", (fuente,)).fetchone()[0]
+
+    def limpiar(self):
+        """Eliminar el estado guardado"""
+        if os.path.exists(self.ruta):
+            os.remove(self.ruta)
+
+    @staticmethod
+    def _descartar(conexion, fuente, firma):
+        conexion.execute("DELETE FROM lotes WHERE fuente = ?", (fuente,))
+        conexion.execute("DELETE FROM registros WHERE fuente = ?", (fuente,))
+        conexion.execute("INSERT OR REPLACE INTO contextos VALUES (?, ?, ?)",
+                         (fuente, firma, datetime.now().isoformat(timespec="seconds")))
+
+    @staticmethod
+    def _compactar(conexion, fuente, actualizado):
+        """Juntar todos los lotes de `fuente` en uno solo"""
+        lotes = [pickle.loads(datos) for (datos,) in conexion.execute(
+            "SELECT datos FROM lotes WHERE fuente = ? ORDER BY lote", (fuente,))]
+        lote = _juntar_lotes(lotes)
+        conexion.execute("DELETE FROM lotes WHERE fuente = ?", (fuente,))
+        conexion.execute("INSERT INTO lotes VALUES (?, 1, ?, ?, ?)",
+                         (fuente, sum(len(df) for df in lote.values()),
+                          pickle.dumps(lote, protocol=pickle.HIGHEST_PROTOCOL), actualizado))
+
+
+def _juntar_lotes(lotes):
+    """Unir lotes {tipo: DataFrame}; si una clave aparece en varios lotes gana el más reciente"""
+    por_tipo = {}
+    for lote in lotes:
+        for tipo, df in lote.items():
+            if len(df):
+                por_tipo.setdefault(tipo, []).append(df)
+    return {
+        tipo: (pd.concat(partes, ignore_index=True) if len(partes) > 1 else partes[0])
+        .drop_duplicates("_clave", keep="last").reset_index(drop=True)
+        for tipo, partes in por_tipo.items()
+    }
@@ -0,0 +1,103 @@
+"""
+Escritura rápida de planillas .xlsx con openpyxl en modo write-only.
+
+Genera las mismas celdas que DataFrame.to_excel(index=False, engine="openpyxl")
+(valores, formato de fechas y estilo del encabezado) escribiendo fila a fila,
+sin armar el modelo completo del libro en memoria.
+"""
+
+import datetime
+import math
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, Side
+from pandas.api.types import is_bool, is_float, is_integer, is_scalar
+
+# Formatos que usa pandas para fechas
+FORMATO_FECHA_HORA = "YYYY-MM-DD HH:MM:SS"
+FORMATO_FECHA = "YYYY-MM-DD"
+
+# Estilo del encabezado de pandas: negrita, borde fino y centrado arriba
+_BORDE_FINO = Side(style="thin")
+ESTILO_ENCABEZADO = {
+    "font": Font(bold=True),
+    "border": Border(left=_BORDE_FINO, right=_BORDE_FINO, top=_BORDE_FINO, bottom=_BORDE_FINO),
+    "alignment": Alignment(horizontal="center", vertical="top"),
+}
+
+
+def valor_celda(valor):
+    """(valor, formato) de una celda, con las mismas conversiones que pandas al escribir Excel"""
+    if is_scalar(valor) and pd.isna(valor):
+        valor = ""
+    elif is_float(valor) and math.isinf(valor):
+        valor = "inf" if valor > 0 else "-inf"
+    if getattr(valor, "tzinfo", None) is not None:
+        raise ValueError("Excel no admite fechas con zona horaria")
+
+    if is_integer(valor):
+        return int(valor), None
+    if is_float(valor):
+        return float(valor), None
+    if is_bool(valor):
+        return bool(valor), None
+    if isinstance(valor, datetime.datetime):
+        return valor, FORMATO_FECHA_HORA
+    if isinstance(valor, datetime.date):
+        return valor, FORMATO_FECHA
+    if isinstance(valor, datetime.timedelta):
+        return valor.total_seconds() / 86400, "0"
+    return str(valor), None
+
+
+def _celda(hoja, valor, formato=None, estilo=None):
+    celda = WriteOnlyCell(hoja, value=valor)
+    if formato:
+        celda.number_format = formato
+    for atributo, objeto in (estilo or {}).items():
+        setattr(celda, atributo, objeto)
+    return celda
+
+
+def _valores_columna(hoja, serie):
+    """Valores de una columna listos para append (celdas con formato solo donde hace falta)"""
+    tipo = serie.dtype
+    if pd.api.types.is_integer_dtype(tipo) and not isinstance(tipo, pd.CategoricalDtype) and not serie.hasnans:
+        return serie.tolist()
+    if pd.api.types.is_bool_dtype(tipo) and not isinstance(tipo, pd.CategoricalDtype) and not serie.hasnans:
+        return serie.tolist()
+    if pd.api.types.is_float_dtype(tipo) and isinstance(tipo, np.dtype):
+        valores = serie.to_numpy()
+        if np.isfinite(valores).all():
+            return valores.tolist()
+    if tipo == object and pd.api.types.infer_dtype(serie, skipna=False) == "string":
+        return serie.tolist()
+
+    celdas = []
+    for valor in serie:
+        valor, formato = valor_celda(valor)
+        celdas.append(_celda(hoja, valor, formato) if formato else valor)
+    return celdas
+
+
+def escribir_xlsx(df, ruta, hoja="Sheet1"):
+    """Escribir `df` (sin índice) en un .xlsx de una hoja, igual que DataFrame.to_excel"""
+    libro = Workbook(write_only=True)
+    hoja_excel = libro.create_sheet(hoja)
+
+    # Convertir todo antes de la primera fila: un valor no admitido falla sin dejar el libro a medio escribir
+    columnas = [_valores_columna(hoja_excel, df.iloc[:, i]) for i in range(df.shape[1])]
+    encabezado = []
+    for columna in df.columns:
+        valor, formato = valor_celda(columna)
+        encabezado.append(_celda(hoja_excel, valor, formato, ESTILO_ENCABEZADO))
+    hoja_excel.append(encabezado)
+
+    for fila in zip(*columnas):
+        hoja_excel.append(fila)
+
+    libro.save(ruta)
+    return len(df)
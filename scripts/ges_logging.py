@@ -0,0 +1,175 @@
+"""
+Registro de eventos del procesamiento GES.
+
+Los mensajes por fila (RUT sin clasificación, duplicados eliminados, trazadora
+asignada...) van al logger "ges.detalle" en nivel DEBUG y se cuentan por
+categoría; al final de cada etapa se muestra solo el resumen de conteos.
+Con LOG_NIVEL = "DEBUG" o un archivo de log se obtiene el detalle completo.
+"""
+
+import contextlib
+import logging
+import logging.handlers
+import os
+import sys
+from collections import Counter
+
+import pandas as pd
+
+from ges_config import LOG_ARCHIVO, LOG_ARCHIVO_MAX_BYTES, LOG_ARCHIVO_RESPALDOS, LOG_NIVEL
+
+LOGGER_GES = "ges"
+
+
+class _HandlerConsola(logging.Handler):
+    """Escribe en el sys.stdout vigente (respeta redirect_stdout de la GUI, tests y procesos)"""
+
+    def emit(self, record):
+        try:
+            sys.stdout.write(self.format(record) + "\n")
+        except Exception:
+            self.handleError(record)
+
+
+def obtener_logger(nombre=None):
+    """Logger de la jerarquía GES ("ges" o "ges.<nombre>")"""
+    return logging.getLogger(f"{LOGGER_GES}.{nombre}" if nombre else LOGGER_GES)
+
+
+def configurar_logging(nivel=LOG_NIVEL, archivo=LOG_ARCHIVO, max_bytes=LOG_ARCHIVO_MAX_BYTES,
+                       respaldos=LOG_ARCHIVO_RESPALDOS):
+    """
+    Configurar el logger "ges": consola en `nivel` y, si se indica `archivo`,
+    detalle completo (DEBUG) en un archivo rotativo. Se puede llamar de nuevo para cambiarlo.
+    """
+    logger = obtener_logger()
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+
+    nivel_consola = logging.getLevelName(str(nivel).upper()) if not isinstance(nivel, int) else nivel
+    if not isinstance(nivel_consola, int):
+        raise ValueError(f"Nivel de log desconocido: {nivel}")
+
+    consola = _HandlerConsola()
+    consola.setLevel(nivel_consola)
+    consola.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(consola)
+    nivel_logger = nivel_consola
+
+    if archivo:
+        os.makedirs(os.path.dirname(os.path.abspath(archivo)), exist_ok=True)
+        detalle = logging.handlers.RotatingFileHandler(
+            archivo, maxBytes=max_bytes, backupCount=respaldos, encoding="utf-8"
+        )
+        detalle.setLevel(logging.DEBUG)
+        detalle.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+        logger.addHandler(detalle)
+        nivel_logger = logging.DEBUG
+
+    logger.setLevel(nivel_logger)
+    logger.propagate = False
+    return logger
+
+
+def asegurar_logging():
+    """Configurar con los valores de ges_config si nadie lo hizo antes"""
+    if not obtener_logger().handlers:
+        configurar_logging()
+
+
+# Tabla de eventos por fila: categoría, unidad (None = evento de la fila; si no, se cuenta
+# una vez por unidad, ej. un RUT resuelto una sola vez) y cantidad
+COLUMNAS_EVENTOS = ["CATEGORIA", "UNIDAD", "CANTIDAD"]
+
+
+def eventos_por_fila(categorias):
+    """Tabla de eventos de una categoría por fila (Series; None = sin evento), con el índice de `categorias`"""
+    categorias = categorias[categorias.notna()]
+    return pd.DataFrame({"CATEGORIA": categorias.to_numpy(dtype=object), "UNIDAD": None, "CANTIDAD": 1},
+                        index=categorias.index, columns=COLUMNAS_EVENTOS)
+
+
+def unir_eventos(eventos):
+    """Una sola tabla de eventos (índice = fila) a partir de una lista de tablas"""
+    eventos = [tabla for tabla in eventos if len(tabla)]
+    if not eventos:
+        return pd.DataFrame(columns=COLUMNAS_EVENTOS)
+    return pd.concat(eventos) if len(eventos) > 1 else eventos[0]
+
+
+def contar_eventos(eventos):
+    """Conteo por categoría de una tabla de eventos: por fila se suman; por unidad, una vez cada unidad"""
+    por_unidad = eventos["UNIDAD"].notna().to_numpy(dtype=bool)
+    conteo = Counter()
+    for tabla in (eventos[~por_unidad], eventos[por_unidad].drop_duplicates(["CATEGORIA", "UNIDAD"])):
+        conteo.update({categoria: int(cantidad) for categoria, cantidad
+                       in tabla.groupby("CATEGORIA")["CANTIDAD"].sum().items()})
+    return conteo
+
+
+class ContadorEventos:
+    """Conteo de eventos por categoría, con el detalle por fila solo si el nivel lo pide"""
+
+    def __init__(self, logger=None):
+        self.logger = logger or obtener_logger("detalle")
+        self.conteos = Counter()
+
+    def detalle_activo(self, nivel=logging.DEBUG):
+        """True si vale la pena armar los mensajes por fila"""
+        return self.logger.isEnabledFor(nivel)
+
+    def registrar(self, categoria, mensaje=None, *args, nivel=logging.DEBUG):
+        """Contar un evento y registrar su mensaje (formateado solo si el nivel está activo)"""
+        self.conteos[categoria] += 1
+        if mensaje is not None and self.logger.isEnabledFor(nivel):
+            self.logger.log(nivel, mensaje, *args)
+
+    def sumar(self, categoria, cantidad):
+        """Sumar varios eventos de una categoría de una vez"""
+        if cantidad:
+            self.conteos[categoria] += int(cantidad)
+
+    @contextlib.contextmanager
+    def capturar(self):
+        """Entrega un Counter con los eventos contados dentro del bloque (también suman al total)"""
+        antes = self.conteos.copy()
+        capturados = Counter()
+        try:
+            yield capturados
+        finally:
+            capturados.update(self.conteos - antes)
+
+    def resolver_por_unidad(self, funcion, valores, unidad, eventos=None):
+        """
+        `funcion(valor)` una vez por valor distinto de la Series `valores`, mapeado a cada fila.
+        Con `eventos` (lista) agrega una tabla de eventos con lo que contó cada valor, una fila
+        por fila de `valores` (mismo índice) y UNIDAD "<unidad>|<valor>": en el total cuenta una vez.
+        """
+        if eventos is None:
+            return valores.map({valor: funcion(valor) for valor in pd.unique(valores)})
+        resueltos, contados = {}, []
+        for valor in pd.unique(valores):
+            with self.capturar() as capturados:
+                resueltos[valor] = funcion(valor)
+            contados += [(valor, categoria, cantidad) for categoria, cantidad in capturados.items()]
+        if contados:
+            tabla = pd.DataFrame(contados, columns=["_valor", "CATEGORIA", "CANTIDAD"])
+            filas = pd.DataFrame({"_valor": valores.to_numpy(dtype=object), "_fila": valores.index})
+            unidos = filas.merge(tabla, on="_valor")
+            eventos.append(pd.DataFrame({
+                "CATEGORIA": unidos["CATEGORIA"].to_numpy(dtype=object),
+                "UNIDAD": (f"{unidad}|" + unidos["_valor"].astype(str)).to_numpy(dtype=object),
+                "CANTIDAD": unidos["CANTIDAD"].to_numpy(),
+            }, index=unidos["_fila"].to_numpy()))
+        return valores.map(resueltos)
+
+    def emitir_resumen(self, titulo="Resumen de eventos"):
+        """Mostrar los conteos acumulados (mayor primero) y reiniciarlos"""
+        if not self.conteos:
+            return
+        logger = obtener_logger()
+        logger.info(f"📊 {titulo}:")
+        for categoria, cantidad in sorted(self.conteos.items(), key=lambda item: (-item[1], item[0])):
+            logger.info(f"   {categoria}: {cantidad:,}")
+        self.conteos.clear()
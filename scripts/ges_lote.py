@@ -0,0 +1,375 @@
+"""
+Procesamiento por lote de todos los meses de inputs/.
+
+Descubre el juego de archivos de cada mes (consultas, farmacia y recetas GES; el
+mes se reconoce en el nombre, ej. reporte_consulta_ago.csv) y procesa cada mes en
+un proceso aparte. Las tablas de referencia (población GES, medicamentos GES,
+paliativos, severidad FQ) se cargan una sola vez; cada proceso de trabajo arma
+sus índices y el arancel una vez y los comparte con todos los meses que procesa.
+
+Cada mes deja sus archivos de carga, cruce y reportes en
+outputs/LOTE_<fecha>/<mes>/ (con su log y manifiesto de ejecución) y el lote un
+RESUMEN_ANUAL.xlsx con los totales por mes y los pacientes únicos del año.
+
+Uso:
+    python scripts/ges_lote.py --meses ene feb mar --procesos 4
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import re
+import sys
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+import pandas as pd
+
+from ges_cache import CacheEntradas
+from ges_config import LOTE_PROCESOS, MESES_ARCHIVOS
+from ges_data_processor import GESDataProcessor
+from ges_estado import EstadoRegistros
+from ges_profiling import PerfilEjecucion, contar_filas
+
+# Palabra del nombre de archivo → mes ("agosto" → "ago")
+ALIAS_MESES = {alias: mes for mes, alias_mes in MESES_ARCHIVOS.items() for alias in alias_mes}
+
+COLUMNAS_RESUMEN = [
+    "MES", "ARCHIVO_CONSULTAS", "ARCHIVO_FARMACIA", "ARCHIVOS_RECETAS",
+    "FILAS_CONSULTAS", "FILAS_FARMACIA", "FILAS_RECETAS",
+    "REGISTROS_CONSULTAS", "REGISTROS_MEDICAMENTOS",
+    "PACIENTES_CONSULTAS", "PACIENTES_MEDICAMENTOS", "PACIENTES_TOTAL",
+    "SEGUNDOS", "ESTADO",
+]
+
+_PLANTILLA_LOTE = None  # Procesador con las referencias ya indexadas, uno por proceso de trabajo
+
+
+def normalizar_mes(texto):
+    """Mes abreviado ("ago") de un texto como "ago", "Agosto" o "AUG"; None si no es un mes"""
+    return ALIAS_MESES.get(str(texto).strip().lower())
+
+
+def mes_de_archivo(nombre):
+    """Mes abreviado que aparece como palabra en el nombre del archivo, o None"""
+    base = os.path.splitext(os.path.basename(nombre))[0].lower()
+    for palabra in re.split(r"[^a-záéíóúñ]+", base):
+        if palabra in ALIAS_MESES:
+            return ALIAS_MESES[palabra]
+    return None
+
+
+def tipo_de_archivo(nombre):
+    """Tipo de entrada mensual según el nombre ("consultas", "farmacia", "recetas_ges") o None"""
+    nombre = os.path.basename(nombre).lower()
+    if nombre.endswith(".csv") and "consulta" in nombre:
+        return "consultas"
+    if nombre.endswith(".csv") and "farmacia" in nombre:
+        return "farmacia"
+    if nombre.startswith("recetas") and nombre.endswith((".xlsx", ".xls")):
+        return "recetas_ges"
+    return None
+
+
+def descubrir_meses(inputs_path):
+    """
+    Juego de archivos de cada mes en `inputs_path`, en orden de calendario:
+    {mes: {"consultas": ruta o None, "farmacia": ruta o None, "recetas_ges": [rutas]}}.
+    Si un mes tiene varios archivos de consultas o farmacia se usa el más reciente.
+    """
+    encontrados = {}
+    for nombre in sorted(os.listdir(inputs_path)) if os.path.isdir(inputs_path) else []:
+        ruta = os.path.join(inputs_path, nombre)
+        tipo, mes = tipo_de_archivo(nombre), mes_de_archivo(nombre)
+        if tipo is None or not os.path.isfile(ruta):
+            continue
+        if mes is None:
+            print(f"⚠️  {nombre}: no se reconoce el mes en el nombre, se omite del lote")
+            continue
+        encontrados.setdefault(mes, {}).setdefault(tipo, []).append(ruta)
+
+    meses = {}
+    for mes in MESES_ARCHIVOS:
+        if mes not in encontrados:
+            continue
+        archivos = {"consultas": None, "farmacia": None, "recetas_ges": sorted(encontrados[mes].get("recetas_ges", []))}
+        for tipo in ("consultas", "farmacia"):
+            rutas = sorted(encontrados[mes].get(tipo, []), key=os.path.getmtime, reverse=True)
+            if len(rutas) > 1:
+                print(f"ℹ️  {mes}: {len(rutas)} archivos de {tipo}, se usa el más reciente ({os.path.basename(rutas[0])})")
+            archivos[tipo] = rutas[0] if rutas else None
+        meses[mes] = archivos
+    return meses
+
+
+def _iniciar_trabajador(base_path, tablas, trabajadores_internos=None):
+    """Preparar el procesador plantilla del proceso: índices de referencia, arancel y trazadoras"""
+    global _PLANTILLA_LOTE
+    salida = io.StringIO()
+    with contextlib.redirect_stdout(salida):
+        plantilla = GESDataProcessor(base_path=base_path, auto_select_files=False)
+        plantilla.usar_tablas_referencia(tablas)
+        trazadoras = plantilla.trazadora_processor
+        if trazadoras.cargar_arancel_ges():
+            trazadoras.extraer_trazadoras_medicamentos()
+            trazadoras.extraer_trazadoras_consultas()
+        trazadoras._get_severidad_fq_map()
+        trazadoras._get_clasificacion_paliativos_map()
+    plantilla.salida_preparacion = salida.getvalue()
+    plantilla.trabajadores_internos = trabajadores_internos
+    _PLANTILLA_LOTE = plantilla
+
+
+def _procesador_mes(plantilla, mes, archivos, carpeta):
+    """Procesador de un mes: referencias compartidas con la plantilla, salidas en `carpeta`"""
+    processor = GESDataProcessor(base_path=plantilla.base_path, auto_select_files=False)
+
+    # Caché de entradas y estado de registros propios del mes (cada mes reemplazaría la entrada del otro)
+    cache_mes = os.path.join(processor.outputs_path, ".cache", f"lote_{mes}")
+    processor.cache_entradas = CacheEntradas(cache_mes, habilitada=processor.cache_entradas.habilitada,
+                                             codigo=processor.cache_entradas.codigo)
+    processor.estado_registros = EstadoRegistros(
+        os.path.join(cache_mes, "estado_registros.sqlite"), habilitado=processor.estado_registros.habilitado
+    )
+
+    processor.outputs_path = carpeta
+    processor.trazadora_processor.outputs_path = carpeta
+    processor.compartir_referencias(plantilla)
+    processor.selected_files = {tipo: ruta for tipo, ruta in archivos.items() if ruta}
+    if plantilla.trabajadores_internos is not None:
+        # Los meses ya corren en paralelo: sin pools anidados dentro de cada mes
+        processor.recetas_procesos = plantilla.trabajadores_internos
+        processor.salida_trabajadores = plantilla.trabajadores_internos
+    return processor
+
+
+def _pacientes(df):
+    """RUT-DV únicos de un resultado de carga"""
+    if df is None or len(df) == 0 or "RUT" not in df.columns:
+        return set()
+    dvs = df["DV"].astype(str) if "DV" in df.columns else ""
+    return set((df["RUT"].astype(str) + "-" + dvs).tolist())
+
+
+def procesar_mes(tarea):
+    """
+    Procesar un mes (mes, archivos, carpeta) con las mismas etapas que procesar_todo.
+    Lo impreso queda en <carpeta>/PROCESAMIENTO_<mes>.log. Retorna el resumen del mes;
+    función de módulo para el pool de procesos.
+    """
+    mes, archivos, carpeta = tarea
+    plantilla = _PLANTILLA_LOTE
+    os.makedirs(carpeta, exist_ok=True)
+    resumen = {
+        "mes": mes,
+        "archivos": archivos,
+        "filas": {},
+        "registros": {},
+        "pacientes": {"consultas": set(), "medicamentos": set()},
+        "segundos": 0.0,
+        "error": None,
+    }
+
+    salida = io.StringIO()
+    medicion = PerfilEjecucion(directorio_perfiles=carpeta)
+    with contextlib.redirect_stdout(salida):
+        print(plantilla.salida_preparacion, end="")
+        print(f"🗓️  PROCESANDO MES: {mes}")
+        try:
+            processor = _procesador_mes(plantilla, mes, archivos, carpeta)
+            with medicion.etapa("carga") as etapa:
+                processor.load_consultas()
+                processor.load_farmacia()
+                processor.load_recetas_ges()
+                resumen["filas"] = {
+                    "consultas": contar_filas(processor.consulta_df),
+                    "farmacia": contar_filas(processor.farmacia_df),
+                    "recetas_ges": contar_filas(processor.recetas_ges_df),
+                }
+                etapa["filas_salida"] = dict(resumen["filas"])
+
+            with medicion.etapa("analisis_medicamentos", contar_filas(processor.farmacia_df)):
+                processor.analizar_medicamentos_ges()
+
+            if processor.consulta_df is not None:
+                archivo = os.path.join(carpeta, f"CARGA_CONSULTAS_GES_{mes}.xlsx")
+                with medicion.etapa("consultas", contar_filas(processor.consulta_df)) as etapa:
+                    consultas = processor.procesar_consultas_para_carga(processor.consulta_df, archivo)
+                    etapa["filas_salida"] = resumen["registros"]["consultas"] = contar_filas(consultas)
+                resumen["pacientes"]["consultas"] = _pacientes(consultas)
+
+            if processor.farmacia_df is not None:
+                archivo = os.path.join(carpeta, f"CARGA_MEDICAMENTOS_GES_{mes}.xlsx")
+                filas_entrada = len(processor.farmacia_df) + (contar_filas(processor.recetas_ges_df) or 0)
+                with medicion.etapa("medicamentos", filas_entrada) as etapa:
+                    medicamentos = processor.procesar_medicamentos_para_carga(processor.farmacia_df, archivo)
+                    etapa["filas_salida"] = resumen["registros"]["medicamentos"] = contar_filas(medicamentos)
+                resumen["pacientes"]["medicamentos"] = _pacientes(medicamentos)
+
+            with medicion.etapa("cruce", len(processor.ges_df)):
+                processor.trazadora_processor.generar_archivo_cruce(
+                    processor.ges_df, processor.consulta_df, processor.farmacia_df
+                )
+
+            with medicion.etapa("reportes"):
+                processor.generar_reporte_medicamentos_ges()
+                processor.generar_reportes_detallados()
+        except Exception as e:
+            resumen["error"] = str(e) or type(e).__name__
+            print(f"❌ Error procesando {mes}: {resumen['error']}")
+            traceback.print_exc(file=sys.stdout)
+        finally:
+            if medicion.etapas:
+                medicion.imprimir_resumen()
+                try:
+                    medicion.guardar_manifiesto(carpeta, {"mes": mes, "archivos_entrada": archivos})
+                except OSError as e:
+                    print(f"⚠️ No se pudo guardar el manifiesto de ejecución: {e}")
+
+    resumen["segundos"] = round(sum(etapa["segundos"] for etapa in medicion.etapas), 3)
+    with open(os.path.join(carpeta, f"PROCESAMIENTO_{mes}.log"), "w", encoding="utf-8") as f:
+        f.write(salida.getvalue())
+    return resumen
+
+
+def ejecutar_meses(tareas, base_path, tablas, procesos=None):
+    """
+    Procesar las tareas [(mes, archivos, carpeta)] en un pool de procesos (None = núcleos
+    disponibles, 1 = secuencial). Retorna los resúmenes en el orden de `tareas`.
+    """
+    procesos = min(len(tareas), procesos or os.cpu_count() or 1)
+    if procesos > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=procesos, initializer=_iniciar_trabajador,
+                                     initargs=(base_path, tablas, 1)) as ejecutor:
+                resumenes = []
+                for resumen in ejecutor.map(procesar_mes, tareas):
+                    _informar_mes(resumen)
+                    resumenes.append(resumen)
+                return resumenes
+        except (OSError, BrokenProcessPool) as e:
+            print(f"⚠️  No se pudo procesar en paralelo ({e}), procesando los meses en secuencia")
+
+    _iniciar_trabajador(base_path, tablas)
+    resumenes = []
+    for tarea in tareas:
+        resumen = procesar_mes(tarea)
+        _informar_mes(resumen)
+        resumenes.append(resumen)
+    return resumenes
+
+
+def _informar_mes(resumen):
+    if resumen["error"]:
+        print(f"  ❌ {resumen['mes']}: {resumen['error']}")
+        return
+    registros = resumen["registros"]
+    print(f"  ✓ {resumen['mes']}: {registros.get('consultas') or 0} consultas, "
+          f"{registros.get('medicamentos') or 0} medicamentos ({resumen['segundos']:.1f}s)")
+
+
+def resumen_anual(resumenes):
+    """DataFrame con una fila por mes y la fila TOTAL (pacientes únicos en el año, no la suma)"""
+    filas = []
+    todos = {"consultas": set(), "medicamentos": set()}
+    for resumen in resumenes:
+        archivos, pacientes = resumen["archivos"], resumen["pacientes"]
+        for tipo in todos:
+            todos[tipo] |= pacientes[tipo]
+        filas.append({
+            "MES": resumen["mes"],
+            "ARCHIVO_CONSULTAS": os.path.basename(archivos["consultas"]) if archivos.get("consultas") else "",
+            "ARCHIVO_FARMACIA": os.path.basename(archivos["farmacia"]) if archivos.get("farmacia") else "",
+            "ARCHIVOS_RECETAS": len(archivos.get("recetas_ges") or []),
+            "FILAS_CONSULTAS": resumen["filas"].get("consultas") or 0,
+            "FILAS_FARMACIA": resumen["filas"].get("farmacia") or 0,
+            "FILAS_RECETAS": resumen["filas"].get("recetas_ges") or 0,
+            "REGISTROS_CONSULTAS": resumen["registros"].get("consultas") or 0,
+            "REGISTROS_MEDICAMENTOS": resumen["registros"].get("medicamentos") or 0,
+            "PACIENTES_CONSULTAS": len(pacientes["consultas"]),
+            "PACIENTES_MEDICAMENTOS": len(pacientes["medicamentos"]),
+            "PACIENTES_TOTAL": len(pacientes["consultas"] | pacientes["medicamentos"]),
+            "SEGUNDOS": resumen["segundos"],
+            "ESTADO": f"error: {resumen['error']}" if resumen["error"] else "ok",
+        })
+
+    df = pd.DataFrame(filas, columns=COLUMNAS_RESUMEN)
+    total = {columna: df[columna].sum() for columna in COLUMNAS_RESUMEN if columna.startswith(("FILAS_", "REGISTROS_"))}
+    total.update({
+        "MES": "TOTAL",
+        "ARCHIVO_CONSULTAS": "",
+        "ARCHIVO_FARMACIA": "",
+        "ARCHIVOS_RECETAS": df["ARCHIVOS_RECETAS"].sum(),
+        "PACIENTES_CONSULTAS": len(todos["consultas"]),
+        "PACIENTES_MEDICAMENTOS": len(todos["medicamentos"]),
+        "PACIENTES_TOTAL": len(todos["consultas"] | todos["medicamentos"]),
+        "SEGUNDOS": round(df["SEGUNDOS"].sum(), 3),
+        "ESTADO": "ok" if (df["ESTADO"] == "ok").all() else f"{(df['ESTADO'] != 'ok').sum()} meses con error",
+    })
+    return pd.concat([df, pd.DataFrame([total], columns=COLUMNAS_RESUMEN)], ignore_index=True)
+
+
+def procesar_meses(base_path=None, meses=None, procesos=None):
+    """
+    Procesar todos los meses de inputs/ (o solo `meses`, ej. ["ene", "feb"]).
+    Retorna (resumen anual, carpeta del lote), o (None, None) si no hay nada que procesar.
+    """
+    print("🚀 INICIANDO PROCESAMIENTO POR LOTE DE MESES")
+    print("=" * 50)
+
+    processor = GESDataProcessor(base_path=base_path)
+    disponibles = descubrir_meses(processor.inputs_path)
+    if meses:
+        pedidos = [normalizar_mes(mes) or mes for mes in meses]
+        faltantes = [mes for mes in pedidos if mes not in disponibles]
+        if faltantes:
+            print(f"⚠️  Meses sin archivos en inputs/: {', '.join(faltantes)}")
+        disponibles = {mes: archivos for mes, archivos in disponibles.items() if mes in pedidos}
+    if not disponibles:
+        print("❌ No se encontraron archivos mensuales en inputs/")
+        return None, None
+    print(f"🗓️  Meses a procesar: {', '.join(disponibles)}")
+
+    # Tablas de referencia comunes: se leen una vez para todo el lote
+    print("\n📊 CARGANDO TABLAS DE REFERENCIA...")
+    if not processor.load_poblacion_ges():
+        return None, None
+    processor.load_medicamentos_ges()
+    processor.load_clasificacion_paliativos()
+    processor.load_severidad_fq()
+
+    carpeta_lote = os.path.join(processor.outputs_path, f"LOTE_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+    tareas = [(mes, archivos, os.path.join(carpeta_lote, mes)) for mes, archivos in disponibles.items()]
+    procesos = procesos if procesos is not None else LOTE_PROCESOS
+
+    print(f"\n⚙️  PROCESANDO {len(tareas)} MESES...")
+    resumenes = ejecutar_meses(tareas, processor.base_path, processor.tablas_referencia(), procesos)
+
+    resumen = resumen_anual(resumenes)
+    archivo_resumen = os.path.join(carpeta_lote, "RESUMEN_ANUAL.xlsx")
+    resumen.to_excel(archivo_resumen, index=False)
+
+    print("\n📋 RESUMEN ANUAL")
+    print(resumen[["MES", "REGISTROS_CONSULTAS", "REGISTROS_MEDICAMENTOS", "PACIENTES_TOTAL", "ESTADO"]]
+          .to_string(index=False))
+    print(f"\n🎉 LOTE COMPLETADO: {carpeta_lote}")
+    return resumen, carpeta_lote
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Procesar todos los meses de inputs/ en un lote")
+    parser.add_argument("--base", default=None, help="carpeta con inputs/ y outputs/ (por defecto la del proyecto)")
+    parser.add_argument("--meses", nargs="+", default=None, help="meses a procesar (ej. ene feb); por defecto todos")
+    parser.add_argument("--procesos", type=int, default=None,
+                        help="meses en paralelo (por defecto LOTE_PROCESOS o los núcleos disponibles)")
+    args = parser.parse_args(argv)
+
+    resumen, _ = procesar_meses(args.base, args.meses, args.procesos)
+    return 0 if resumen is not None and (resumen["ESTADO"] == "ok").all() else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,6 +5,8 @@ import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 import threading
 
+from ges_data_processor import format_rut_series
+
 class GESAnalyzer:
     def __init__(self):
         self.root = tk.Tk()
@@ -176,10 +178,9 @@ class GESAnalyzer:
             self.farmacia_df = self.load_csv_safely(self.farmacia_file, ';')
             if self.farmacia_df is not None:
                 # Fix RUT format
-                self.farmacia_df['RUT_Combined'] = [
-                    self.format_rut(row['RutPaciente'], row['DVPaciente'])
-                    for _, row in self.farmacia_df.iterrows()
-                ]
+                self.farmacia_df['RUT_Combined'] = format_rut_series(
+                    self.farmacia_df['RutPaciente'], self.farmacia_df['DVPaciente']
+                )
                 self.farmacia_df = self.farmacia_df.dropna(subset=['RUT_Combined'])
                 medication_patients = set(self.farmacia_df['RUT_Combined'].astype(str))
             else:
@@ -382,82 +383,58 @@ Use the export buttons below to generate detailed reports and patient lists.
     
     def generate_patient_cases_excel(self, filename):
         """Generate Excel file with detailed patient cases"""
+        sheets = [
+            ('ges_with_both_list', 'Complete_Care_Patients', True, True),
+            ('ges_with_appointments_list', 'Patients_with_Appointments', True, False),
+            ('ges_with_medications_list', 'Patients_with_Medications', False, True),
+        ]
+        # Per-patient counts computed once for the three sheets
+        cases = self.build_patient_case_table(
+            set().union(*(self.results[key] for key, _, _, _ in sheets))
+        )
+
         # Create different sheets for different categories
         with pd.ExcelWriter(filename, engine='openpyxl') as writer:
-            
-            # Sheet 1: Patients with both appointments and medications
-            if len(self.results['ges_with_both_list']) > 0:
-                both_data = []
-                for patient_rut in self.results['ges_with_both_list']:
-                    row = {'RUT': patient_rut}
-                    
-                    # Get GES condition
-                    patient_info = None
-                    if self.ges_df is not None:
-                        patient_info = self.ges_df[self.ges_df['RUT'].astype(str) == patient_rut]
-                    if patient_info is not None and len(patient_info) > 0:
-                        row['GES_Condition'] = patient_info.iloc[0]['Patologia']
-                    
-                    # Count appointments and medications
-                    if self.consulta_df is not None:
-                        appointments = self.consulta_df[self.consulta_df['RUNPaciente'].astype(str) == patient_rut]
-                        row['Total_Appointments'] = len(appointments)
-                        row['Attended_Appointments'] = len(appointments[appointments['EstadoCita_Desc'] == 'Atendido'])
-                    
-                    if self.farmacia_df is not None:
-                        medications = self.farmacia_df[self.farmacia_df['RUT_Combined'].astype(str) == patient_rut]
-                        row['Total_Prescriptions'] = len(medications)
-                        row['Dispensed_Prescriptions'] = len(medications[medications['EstadoActualDeFarmacia_Desc'] == 'Despachado'])
-                    
-                    both_data.append(row)
-                
-                both_df = pd.DataFrame(both_data)
-                both_df.to_excel(writer, sheet_name='Complete_Care_Patients', index=False)
-            
-            # Sheet 2: All GES patients with appointments
-            if len(self.results['ges_with_appointments_list']) > 0:
-                apt_data = []
-                for patient_rut in self.results['ges_with_appointments_list']:
-                    row = {'RUT': patient_rut}
-                    
-                    patient_info = None
-                    if self.ges_df is not None:
-                        patient_info = self.ges_df[self.ges_df['RUT'].astype(str) == patient_rut]
-                    if patient_info is not None and len(patient_info) > 0:
-                        row['GES_Condition'] = patient_info.iloc[0]['Patologia']
-                    
-                    if self.consulta_df is not None:
-                        appointments = self.consulta_df[self.consulta_df['RUNPaciente'].astype(str) == patient_rut]
-                        row['Total_Appointments'] = len(appointments)
-                        row['Attended_Appointments'] = len(appointments[appointments['EstadoCita_Desc'] == 'Atendido'])
-                    
-                    apt_data.append(row)
-                
-                apt_df = pd.DataFrame(apt_data)
-                apt_df.to_excel(writer, sheet_name='Patients_with_Appointments', index=False)
-            
-            # Sheet 3: All GES patients with medications
-            if len(self.results['ges_with_medications_list']) > 0:
-                med_data = []
-                for patient_rut in self.results['ges_with_medications_list']:
-                    row = {'RUT': patient_rut}
-                    
-                    patient_info = None
-                    if self.ges_df is not None:
-                        patient_info = self.ges_df[self.ges_df['RUT'].astype(str) == patient_rut]
-                    if patient_info is not None and len(patient_info) > 0:
-                        row['GES_Condition'] = patient_info.iloc[0]['Patologia']
-                    
-                    if self.farmacia_df is not None:
-                        medications = self.farmacia_df[self.farmacia_df['RUT_Combined'].astype(str) == patient_rut]
-                        row['Total_Prescriptions'] = len(medications)
-                        row['Dispensed_Prescriptions'] = len(medications[medications['EstadoActualDeFarmacia_Desc'] == 'Despachado'])
-                    
-                    med_data.append(row)
-                
-                med_df = pd.DataFrame(med_data)
-                med_df.to_excel(writer, sheet_name='Patients_with_Medications', index=False)
-    
+            for key, sheet_name, with_appointments, with_medications in sheets:
+                if len(self.results[key]) == 0:
+                    continue
+                columns = [c for c in cases.columns if c == 'GES_Condition'
+                           or (with_appointments and c in ('Total_Appointments', 'Attended_Appointments'))
+                           or (with_medications and c in ('Total_Prescriptions', 'Dispensed_Prescriptions'))]
+                sheet_df = cases.loc[list(self.results[key]), columns].reset_index()
+                sheet_df.to_excel(writer, sheet_name=sheet_name, index=False)
+
+    def build_patient_case_table(self, patient_ruts):
+        """GES condition and appointment/prescription counts per patient RUT (one groupby per source)"""
+        cases = pd.DataFrame(index=pd.Index(list(patient_ruts), dtype=object, name='RUT'))
+
+        # GES condition (first row of the patient in the population file)
+        if self.ges_df is not None:
+            ges_ruts = self.ges_df['RUT'].astype(str)
+            first_rows = ~ges_ruts.duplicated().to_numpy()
+            conditions = pd.Series(self.ges_df['Patologia'].to_numpy()[first_rows], index=ges_ruts[first_rows])
+            cases['GES_Condition'] = conditions.reindex(cases.index)
+
+        def counts(ruts, mask):
+            total = ruts.value_counts()
+            matching = ruts[mask].value_counts()
+            return (total.reindex(cases.index, fill_value=0).astype('int64'),
+                    matching.reindex(cases.index, fill_value=0).astype('int64'))
+
+        if self.consulta_df is not None:
+            cases['Total_Appointments'], cases['Attended_Appointments'] = counts(
+                self.consulta_df['RUNPaciente'].astype(str),
+                (self.consulta_df['EstadoCita_Desc'] == 'Atendido').to_numpy(),
+            )
+
+        if self.farmacia_df is not None:
+            cases['Total_Prescriptions'], cases['Dispensed_Prescriptions'] = counts(
+                self.farmacia_df['RUT_Combined'].astype(str),
+                (self.farmacia_df['EstadoActualDeFarmacia_Desc'] == 'Despachado').to_numpy(),
+            )
+
+        return cases
+
     def generate_summary_csv(self, filename):
         """Generate summary statistics CSV"""
         summary_data = {
@@ -0,0 +1,207 @@
+"""
+Medición por etapa del procesamiento GES.
+
+Cada etapa registra tiempo real, tiempo de CPU, memoria pico durante la etapa y
+filas de entrada/salida. Al final se guarda un manifiesto JSON en outputs/
+para comparar corridas; las etapas indicadas se ejecutan además bajo cProfile
+(archivo .prof, abrir con `python -m pstats` o snakeviz).
+"""
+
+import contextlib
+import cProfile
+import ctypes
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def memoria_pico_mb():
+    """Memoria residente pico del proceso desde que partió, en MB (None si la plataforma no la informa)"""
+    if resource is not None:
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux informa KB; macOS, bytes
+        return round(pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024, 1)
+
+    if os.name == "nt":
+        from ctypes import wintypes
+
+        class _ContadoresMemoria(ctypes.Structure):
+            _fields_ = [
+                ("cb", wintypes.DWORD),
+                ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t),
+                ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t),
+                ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+
+        try:
+            contadores = _ContadoresMemoria()
+            contadores.cb = ctypes.sizeof(contadores)
+            proceso = ctypes.windll.kernel32.GetCurrentProcess()
+            if ctypes.windll.psapi.GetProcessMemoryInfo(proceso, ctypes.byref(contadores), contadores.cb):
+                return round(contadores.PeakWorkingSetSize / (1024 * 1024), 1)
+        except (AttributeError, OSError):
+            pass
+
+    return None
+
+
+class PicoMemoriaEtapa:
+    """
+    Memoria pico de un bloque. En Linux se reinicia el pico residente del proceso
+    (/proc/self/clear_refs) y se lee VmHWM al terminar; en otras plataformas se usa
+    tracemalloc (memoria asignada por Python y numpy durante el bloque).
+    """
+
+    def __init__(self):
+        self.fuente = "rss" if _reiniciar_pico_rss() else "tracemalloc"
+        self._inicio_tracemalloc = False
+        if self.fuente == "tracemalloc":
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._inicio_tracemalloc = True
+            tracemalloc.reset_peak()
+
+    def terminar(self):
+        """Pico del bloque en MB (None si no se pudo medir)"""
+        if self.fuente == "rss":
+            return _pico_rss_mb()
+        pico = tracemalloc.get_traced_memory()[1]
+        if self._inicio_tracemalloc:
+            tracemalloc.stop()
+        return round(pico / (1024 * 1024), 1)
+
+
+def _reiniciar_pico_rss():
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return _pico_rss_mb() is not None
+    except OSError:
+        return False
+
+
+def _pico_rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for linea in f:
+                if linea.startswith("VmHWM:"):
+                    return round(int(linea.split()[1]) / 1024, 1)
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def contar_filas(df):
+    """Filas de un DataFrame (None si no hay datos)"""
+    return None if df is None else len(df)
+
+
+class PerfilEjecucion:
+    """Registro de etapas de una corrida y su manifiesto JSON"""
+
+    def __init__(self, perfilar=(), directorio_perfiles=None):
+        self.perfilar = set(perfilar or ())
+        self.directorio_perfiles = directorio_perfiles
+        self.inicio = datetime.now()
+        self.etapas = []
+
+    @contextlib.contextmanager
+    def etapa(self, nombre, filas_entrada=None):
+        """
+        Medir el bloque como una etapa. Entrega el registro de la etapa para
+        completar `filas_salida` (o corregir `filas_entrada`) dentro del bloque.
+        """
+        registro = {"etapa": nombre, "filas_entrada": filas_entrada, "filas_salida": None}
+        perfil = cProfile.Profile() if nombre in self.perfilar else None
+        memoria = PicoMemoriaEtapa()
+        inicio_real = time.perf_counter()
+        inicio_cpu = time.process_time()
+        if perfil is not None:
+            perfil.enable()
+        try:
+            yield registro
+            registro["estado"] = "ok"
+        except BaseException as e:
+            registro["estado"] = f"error: {e}"
+            raise
+        finally:
+            if perfil is not None:
+                perfil.disable()
+                registro["perfil"] = self._guardar_perfil(perfil, nombre)
+            registro["segundos"] = round(time.perf_counter() - inicio_real, 3)
+            registro["cpu_segundos"] = round(time.process_time() - inicio_cpu, 3)
+            registro["memoria_pico_mb"] = memoria.terminar()
+            registro["medicion_memoria"] = memoria.fuente
+            self.etapas.append(registro)
+
+    def _guardar_perfil(self, perfil, nombre):
+        directorio = self.directorio_perfiles or os.getcwd()
+        os.makedirs(directorio, exist_ok=True)
+        ruta = os.path.join(directorio, f"PERFIL_{nombre}_{self.inicio.strftime('%Y%m%d_%H%M%S')}.prof")
+        perfil.dump_stats(ruta)
+        return ruta
+
+    def manifiesto(self, extra=None):
+        """Contenido del manifiesto: entorno, etapas y totales"""
+        fin = datetime.now()
+        contenido = {
+            "inicio": self.inicio.isoformat(timespec="seconds"),
+            "fin": fin.isoformat(timespec="seconds"),
+            "segundos_totales": round(sum(etapa["segundos"] for etapa in self.etapas), 3),
+            "cpu_segundos_totales": round(sum(etapa["cpu_segundos"] for etapa in self.etapas), 3),
+            "memoria_pico_proceso_mb": memoria_pico_mb(),
+            "entorno": {
+                "python": platform.python_version(),
+                "pandas": pd.__version__,
+                "plataforma": platform.platform(),
+                "procesadores": os.cpu_count(),
+            },
+            "etapas": self.etapas,
+        }
+        contenido.update(extra or {})
+        return contenido
+
+    def guardar_manifiesto(self, directorio, extra=None):
+        """Escribir MANIFIESTO_EJECUCION_<timestamp>.json en `directorio` y retornar su ruta"""
+        os.makedirs(directorio, exist_ok=True)
+        ruta = os.path.join(directorio, f"MANIFIESTO_EJECUCION_{self.inicio.strftime('%Y%m%d_%H%M%S')}.json")
+        with open(ruta, "w", encoding="utf-8") as f:
+            json.dump(self.manifiesto(extra), f, ensure_ascii=False, indent=2, default=str)
+        return ruta
+
+    def imprimir_resumen(self):
+        """Tabla de tiempos por etapa"""
+        print("\n⏱️ TIEMPOS POR ETAPA:")
+        for etapa in self.etapas:
+            filas = ""
+            if etapa["filas_entrada"] is not None or etapa["filas_salida"] is not None:
+                filas = f" | filas {_formatear_filas(etapa['filas_entrada'])} → {_formatear_filas(etapa['filas_salida'])}"
+            memoria = f" | pico {etapa['memoria_pico_mb']} MB" if etapa["memoria_pico_mb"] is not None else ""
+            print(f"   {etapa['etapa']}: {etapa['segundos']:.2f}s (CPU {etapa['cpu_segundos']:.2f}s){memoria}{filas}")
+            if etapa.get("perfil"):
+                print(f"      🔬 Perfil: {etapa['perfil']}")
+
+
+def _formatear_filas(filas):
+    if filas is None:
+        return "-"
+    if isinstance(filas, dict):
+        return f"{sum(n for n in filas.values() if n is not None):,}"
+    return f"{filas:,}"
@@ -0,0 +1,257 @@
+"""
+Escritura de archivos de salida particionados (partes de carga de 499 filas).
+
+Cada parte se escribe en un archivo temporal de la misma carpeta y se renombra
+al terminar, de modo que nunca queda una parte a medio escribir con el nombre
+final. Las partes son independientes y pueden escribirse en un pool de hilos o
+procesos. Al final se deja un manifiesto JSON con la ruta, el rango de filas y
+el SHA-256 de cada parte.
+
+Antes de las partes se escribe la salida canónica: el resultado completo en un
+solo archivo (<base>_COMPLETO.csv y, si hay motor Parquet instalado,
+<base>_COMPLETO.parquet), que es lo que conviene leer para comparar o auditar.
+Los archivos de una corrida anterior con el mismo destino que la actual no
+reemplaza (partes sobrantes, formatos canónicos no escritos) se eliminan, y
+leer_salida lee solo lo que lista el manifiesto.
+"""
+
+import glob
+import hashlib
+import importlib.util
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+import pandas as pd
+
+from ges_excel import escribir_xlsx
+
+POOLS = {"procesos": ProcessPoolExecutor, "hilos": ThreadPoolExecutor}
+
+_aviso_parquet = {"mostrado": False}  # avisar una sola vez por proceso que falta el motor Parquet
+
+
+def sha256_archivo(ruta):
+    """Hash SHA-256 del contenido de un archivo"""
+    sha = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(bloque)
+    return sha.hexdigest()
+
+
+def escribir_parte(parte):
+    """
+    Escribir una parte (df, ruta, motor) en un temporal y renombrarla a `ruta`.
+    Motor: "csv", "parquet", "ges_excel" o un motor de DataFrame.to_excel. Retorna
+    el SHA-256 del archivo; función de módulo para el pool de procesos.
+    """
+    df, ruta, motor = parte
+    base, ext = os.path.splitext(ruta)
+    temporal = f"{base}.tmp{os.getpid()}{ext}"
+    try:
+        if motor == "csv":
+            df.to_csv(temporal, index=False)
+        elif motor == "parquet":
+            df.to_parquet(temporal, index=False, engine=motor_parquet())
+        elif motor == "ges_excel":
+            escribir_xlsx(df, temporal)
+        else:
+            df.to_excel(temporal, index=False, engine=motor)
+        os.replace(temporal, ruta)
+    finally:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+    return sha256_archivo(ruta)
+
+
+def escribir_partes(partes, motor, pool="procesos", trabajadores=None):
+    """
+    Escribir partes [(df, ruta)] con `motor`; en paralelo si hay más de una y más de un trabajador
+    (None = núcleos disponibles). Retorna los SHA-256 en el orden de `partes`.
+    Si una parte falla se eliminan todas las rutas de `partes` (escritas en esta llamada o
+    de una corrida anterior con el mismo nombre) y se relanza el error.
+    """
+    tareas = [(df, ruta, motor) for df, ruta in partes]
+    trabajadores = min(len(tareas), trabajadores or os.cpu_count() or 1)
+    resultados = None
+    if trabajadores > 1:
+        try:
+            with POOLS[pool](max_workers=trabajadores) as ejecutor:
+                futuros = [ejecutor.submit(escribir_parte, tarea) for tarea in tareas]
+                resultados = [_resultado(futuro.result) for futuro in futuros]
+        except (OSError, BrokenProcessPool) as e:
+            print(f"  ⚠️  No se pudo escribir en paralelo ({e}), escribiendo en secuencia")
+            resultados = None
+
+    if resultados is None:
+        resultados = []
+        for tarea in tareas:
+            resultados.append(_resultado(lambda: escribir_parte(tarea)))
+            if isinstance(resultados[-1], Exception):
+                break
+
+    errores = [resultado for resultado in resultados if isinstance(resultado, Exception)]
+    if errores:
+        # Sin partes sueltas con el nombre final: ni las nuevas ni las anteriores que no se reemplazaron
+        for _, ruta, _ in tareas:
+            if os.path.exists(ruta):
+                os.remove(ruta)
+        raise errores[0]
+    return resultados
+
+
+def _resultado(obtener):
+    """Resultado de `obtener()` o la excepción que lanzó (un pool roto se relanza)"""
+    try:
+        return obtener()
+    except BrokenProcessPool:
+        raise
+    except Exception as e:
+        return e
+
+
+def motor_parquet():
+    """Motor Parquet instalado ("pyarrow" o "fastparquet"), o None (dependencia opcional)"""
+    for modulo in ("pyarrow", "fastparquet"):
+        if importlib.util.find_spec(modulo) is not None:
+            return modulo
+    return None
+
+
+def ruta_canonica(ruta_destino, formato):
+    """Ruta de la salida canónica de `ruta_destino` en `formato` (<base>_COMPLETO.<formato>)"""
+    return f"{os.path.splitext(ruta_destino)[0]}_COMPLETO.{formato}"
+
+
+def guardar_salida_canonica(df, ruta_destino, formatos):
+    """
+    Escribir el resultado completo en un archivo por formato ("csv", "parquet").
+    Parquet se omite con un aviso si no hay motor instalado. Retorna {formato: {archivo, sha256}}.
+    """
+    canonicos = {}
+    for formato in formatos:
+        if formato == "parquet" and motor_parquet() is None:
+            if not _aviso_parquet["mostrado"]:
+                print("  ℹ️  Salida Parquet omitida: instale pyarrow o fastparquet para generarla")
+                _aviso_parquet["mostrado"] = True
+            continue
+        ruta = ruta_canonica(ruta_destino, formato)
+        try:
+            sha = escribir_parte((df, ruta, formato))
+        except (ValueError, TypeError, ImportError) as e:
+            print(f"  ⚠️  No se pudo escribir salida {formato} ({e})")
+            continue
+        canonicos[formato] = {"archivo": os.path.basename(ruta), "sha256": sha}
+    return canonicos
+
+
+def partes_en_disco(ruta_destino):
+    """Partes siguientes de `ruta_destino` que hay en disco ([(número, ruta)] de <base>_partN<ext>, en orden)"""
+    base, ext = os.path.splitext(ruta_destino)
+    patron = re.compile(re.escape(os.path.basename(base)) + r"_part(\d+)" + re.escape(ext) + "$")
+    encontradas = []
+    for ruta in glob.glob(f"{glob.escape(base)}_part*{ext}"):
+        coincide = patron.match(os.path.basename(ruta))
+        if coincide:
+            encontradas.append((int(coincide.group(1)), ruta))
+    return sorted(encontradas)
+
+
+def limpiar_salida_anterior(ruta_destino, partes, canonicos, manifiesto=True):
+    """
+    Eliminar archivos de una corrida anterior con el mismo destino que esta no reemplaza:
+    partes con número mayor a `partes`, salidas canónicas en formatos no escritos ahora
+    y, si esta corrida no deja manifiesto, el manifiesto anterior.
+    """
+    if not manifiesto and os.path.exists(ruta_manifiesto(ruta_destino)):
+        os.remove(ruta_manifiesto(ruta_destino))
+    for numero, ruta in partes_en_disco(ruta_destino):
+        if numero > partes:
+            os.remove(ruta)
+    for formato in ("csv", "parquet"):
+        ruta = ruta_canonica(ruta_destino, formato)
+        if formato not in canonicos and os.path.exists(ruta):
+            os.remove(ruta)
+
+
+def leer_salida(ruta_destino):
+    """
+    Leer el resultado completo de una salida según su manifiesto: Parquet canónico (si hay motor),
+    si no el CSV canónico, y si no las partes listadas, en orden. Sin manifiesto (salidas
+    anteriores a él) se buscan los mismos archivos por nombre.
+    """
+    ruta_json = ruta_manifiesto(ruta_destino)
+    if not os.path.exists(ruta_json):
+        return _leer_salida_sin_manifiesto(ruta_destino)
+
+    with open(ruta_json, encoding="utf-8") as f:
+        manifiesto = json.load(f)
+    if manifiesto.get("estado", "ok") != "ok":
+        raise ValueError(f"La salida {os.path.basename(ruta_destino)} quedó incompleta: {manifiesto.get('error')}")
+
+    carpeta = os.path.dirname(ruta_destino)
+    canonicos = manifiesto.get("canonicos") or {}
+    if "parquet" in canonicos and motor_parquet() is not None:
+        return pd.read_parquet(os.path.join(carpeta, canonicos["parquet"]["archivo"]), engine=motor_parquet())
+    if "csv" in canonicos:
+        return pd.read_csv(os.path.join(carpeta, canonicos["csv"]["archivo"]))
+
+    lector = pd.read_csv if os.path.splitext(ruta_destino)[1].lower() == ".csv" else pd.read_excel
+    return pd.concat([lector(os.path.join(carpeta, parte["archivo"])) for parte in manifiesto["partes"]],
+                     ignore_index=True)
+
+
+def _leer_salida_sin_manifiesto(ruta_destino):
+    ruta_parquet = ruta_canonica(ruta_destino, "parquet")
+    if os.path.exists(ruta_parquet) and motor_parquet() is not None:
+        return pd.read_parquet(ruta_parquet, engine=motor_parquet())
+    ruta_csv = ruta_canonica(ruta_destino, "csv")
+    if os.path.exists(ruta_csv):
+        return pd.read_csv(ruta_csv)
+
+    lector = pd.read_csv if os.path.splitext(ruta_destino)[1].lower() == ".csv" else pd.read_excel
+    rutas = [ruta_destino] + [ruta for _, ruta in partes_en_disco(ruta_destino)]
+    return pd.concat([lector(ruta) for ruta in rutas], ignore_index=True)
+
+
+def ruta_manifiesto(ruta_destino):
+    """Ruta del manifiesto de partes de `ruta_destino` (<base>_MANIFIESTO.json)"""
+    return f"{os.path.splitext(ruta_destino)[0]}_MANIFIESTO.json"
+
+
+def guardar_manifiesto_partes(ruta_destino, partes, hashes, total, canonicos=None, error=None):
+    """
+    Escribir el manifiesto de partes (ruta, filas y SHA-256) junto a `ruta_destino`; retorna su ruta.
+    Con `error` queda con estado "error" (la escritura de partes falló y no hay partes válidas).
+    """
+    contenido = {
+        "destino": os.path.basename(ruta_destino),
+        "generado": datetime.now().isoformat(timespec="seconds"),
+        "estado": "error" if error else "ok",
+        "error": error,
+        "filas": total,
+        "canonicos": canonicos or {},
+        "partes": [],
+    }
+    inicio = 0
+    for numero, ((df, ruta), sha) in enumerate(zip(partes, hashes), start=1):
+        contenido["partes"].append({
+            "parte": numero,
+            "archivo": os.path.basename(ruta),
+            "fila_inicio": inicio,
+            "fila_fin": inicio + len(df),
+            "filas": len(df),
+            "sha256": sha,
+        })
+        inicio += len(df)
+
+    ruta = ruta_manifiesto(ruta_destino)
+    temporal = ruta + ".tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(contenido, f, ensure_ascii=False, indent=2)
+    os.replace(temporal, ruta)
+    return ruta
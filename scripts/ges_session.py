@@ -0,0 +1,126 @@
+"""
+Sesión de carga para la interfaz GES.
+
+Mantiene los datos de entrada cargados en el GESDataProcessor entre acciones y
+solo recarga las fuentes cuyos archivos cambiaron (ruta, tamaño o fecha de
+modificación) desde la última carga.
+"""
+
+import os
+
+from ges_config import (
+    ARCHIVO_POBLACION_GES,
+    ARCHIVOS_CLASIFICACION_PALIATIVOS,
+    ARCHIVOS_MEDICAMENTOS_GES,
+    ARCHIVOS_SEVERIDAD_FQ,
+)
+
+# Fuentes en orden de carga (la población GES primero: filtra consultas y farmacia)
+FUENTES = [
+    "poblacion_ges",
+    "consultas",
+    "farmacia",
+    "medicamentos_ges",
+    "clasificacion_paliativos",
+    "severidad_fq",
+    "recetas_ges",
+]
+
+# Fuentes que necesita cada etapa de la interfaz
+ETAPAS = {
+    "analisis_medicamentos": ["poblacion_ges", "farmacia", "medicamentos_ges"],
+    "consultas": ["poblacion_ges", "consultas", "clasificacion_paliativos", "severidad_fq"],
+    "medicamentos": ["poblacion_ges", "farmacia", "clasificacion_paliativos", "severidad_fq", "recetas_ges"],
+    "completo": FUENTES,
+}
+
+
+class SesionGES:
+    """Carga única de entradas por sesión; recarga solo las fuentes modificadas"""
+
+    def __init__(self, processor):
+        self.processor = processor
+        self.firmas = {}  # fuente → firma de sus archivos en la última carga
+        self.cargadores = {
+            "poblacion_ges": processor.load_poblacion_ges,
+            "consultas": processor.load_consultas,
+            "farmacia": processor.load_farmacia,
+            "medicamentos_ges": processor.load_medicamentos_ges,
+            "clasificacion_paliativos": processor.load_clasificacion_paliativos,
+            "severidad_fq": processor.load_severidad_fq,
+            "recetas_ges": processor.load_recetas_ges,
+        }
+
+    def archivos_fuente(self, fuente):
+        """Archivos de los que depende una fuente"""
+        p = self.processor
+        poblacion = os.path.join(p.inputs_path, ARCHIVO_POBLACION_GES)
+        if fuente == "poblacion_ges":
+            return [poblacion]
+        if fuente in ("consultas", "farmacia"):
+            # Se filtran por población GES: si cambia, también hay que recargarlas
+            return [p.selected_files.get(fuente), poblacion]
+        if fuente == "recetas_ges":
+            recetas = p.selected_files.get("recetas_ges") or []
+            return sorted(recetas) if isinstance(recetas, list) else [recetas]
+        candidatos = {
+            "medicamentos_ges": ARCHIVOS_MEDICAMENTOS_GES,
+            "clasificacion_paliativos": ARCHIVOS_CLASIFICACION_PALIATIVOS,
+            "severidad_fq": ARCHIVOS_SEVERIDAD_FQ,
+        }[fuente]
+        return [os.path.join(p.inputs_path, nombre) for nombre in candidatos]
+
+    def firma_fuente(self, fuente):
+        """Ruta, tamaño y mtime de cada archivo de la fuente (None si no existe)"""
+        firma = []
+        for ruta in self.archivos_fuente(fuente):
+            if ruta and os.path.exists(ruta):
+                stat = os.stat(ruta)
+                firma.append((ruta, stat.st_size, stat.st_mtime_ns))
+            else:
+                firma.append((ruta, None, None))
+        if fuente in ("consultas", "farmacia"):
+            firma.append(("csv_chunksize", self.processor.csv_chunksize, None))
+        return tuple(firma)
+
+    def fuentes_desactualizadas(self, fuentes=None):
+        """Fuentes (en orden de carga) que nunca se cargaron o cuyos archivos cambiaron"""
+        fuentes = FUENTES if fuentes is None else fuentes
+        return [f for f in FUENTES if f in fuentes and self.firmas.get(f) != self.firma_fuente(f)]
+
+    def invalidar(self, fuentes=None):
+        """Forzar recarga de las fuentes indicadas (todas por defecto)"""
+        for fuente in FUENTES if fuentes is None else fuentes:
+            self.firmas.pop(fuente, None)
+
+    def preparar(self, etapa="completo"):
+        """Dejar cargadas y al día las fuentes que necesita `etapa`"""
+        p = self.processor
+        print(f"\n📊 PREPARANDO DATOS ({etapa})...")
+
+        try:
+            if not p.setup_input_files():
+                print("❌ No se pudieron configurar los archivos de entrada")
+                return False
+
+            pendientes = self.fuentes_desactualizadas(ETAPAS[etapa])
+            if not pendientes:
+                print("✓ Datos de la sesión al día, sin recargar")
+                return True
+
+            print(f"🔄 Recargando: {', '.join(pendientes)}")
+            for fuente in pendientes:
+                firma = self.firma_fuente(fuente)
+                resultado = self.cargadores[fuente]()
+                if fuente == "poblacion_ges" and not resultado:
+                    return False
+                if fuente in ("clasificacion_paliativos", "severidad_fq"):
+                    # El procesador de trazadoras relee estos archivos por su cuenta
+                    p.trazadora_processor.reiniciar_indices_rut()
+                self.firmas[fuente] = firma
+
+            return True
+
+        except Exception as e:
+            print(f"❌ Error cargando datos: {e}")
+            return False
@@ -1,8 +1,13 @@
 import os
 from datetime import datetime
 
+import numpy as np
 import pandas as pd
 
+from ges_config import TRAZADORAS_FIBROSIS_SEVERIDAD
+from ges_logging import ContadorEventos
+from trazadora_rules import RESOLVER_SEVERIDAD_FQ, TrazadoraRuleEngine
+
 
 class TrazadoraProcessor:
     def __init__(self, base_path=None):
@@ -16,6 +21,26 @@ class TrazadoraProcessor:
         self.trazadoras_medicamentos = {}
         self.exclusiones = {}
 
+        # Índices RUT (sin DV) → severidad FQ / condición paliativos, de los archivos propios
+        # del procesador de trazadoras (inputs/severidad_FQ.xlsx y clasificacion_paliativos.csv),
+        # cargados al primer uso. Solo el modo lote los comparte (compartir_referencias).
+        self.severidad_fq_df = None
+        self.clasificacion_paliativos_df = None
+        self.severidad_fq_map = {}
+        self.clasificacion_paliativos_map = {}
+        self._severidad_fq_source = None
+        self._clasificacion_paliativos_source = None
+        # True tras intentar cargar o indexar la tabla (una carga fallida no se reintenta);
+        # una tabla asignada directamente se indexa sin leer el archivo
+        self._severidad_fq_cargada = False
+        self._clasificacion_paliativos_cargada = False
+
+        # Reglas de trazadoras de medicamentos (mismas que GESDataProcessor)
+        self.reglas_trazadoras = TrazadoraRuleEngine.desde_archivo()
+
+        # Eventos por fila (GESDataProcessor comparte el suyo para un solo resumen)
+        self.eventos = ContadorEventos()
+
     def cargar_arancel_ges(self):
         """Cargar el archivo de arancel GES"""
         try:
@@ -137,6 +162,99 @@ class TrazadoraProcessor:
                     f"OK - {patologia_corta} (Consultas): {len(trazadoras)} trazadoras, {len(exclusiones)} exclusiones"
                 )
 
+    def _buscar_columna(self, df, candidatas):
+        """Retornar la primera columna del DataFrame que coincida (ignorando espacios)"""
+        columnas = {str(col).strip(): col for col in reversed(list(df.columns))}
+        for candidata in candidatas:
+            if candidata.strip() in columnas:
+                return columnas[candidata.strip()]
+        return None
+
+    def _indexar_por_rut(self, df, columnas_rut, columna_valor):
+        """Construir dict RUT (sin DV) → valor, conservando la primera fila por RUT"""
+        indice = {}
+        if df is None:
+            return indice
+
+        rut_col = self._buscar_columna(df, columnas_rut)
+        valor_col = self._buscar_columna(df, [columna_valor])
+        if rut_col is None or valor_col is None:
+            return indice
+
+        ruts = df[rut_col].astype(str).str.split('-').str[0].tolist()
+        for rut, valor in zip(ruts, df[valor_col].tolist()):
+            indice.setdefault(rut, valor)
+        return indice
+
+    def indexar_severidad_fq(self, severidad_fq_df):
+        """Registrar la tabla de severidad FQ y construir su índice por RUT"""
+        self.severidad_fq_df = severidad_fq_df
+        self._severidad_fq_cargada = True
+        self.severidad_fq_map = self._indexar_por_rut(severidad_fq_df, ['RUT', 'Rut', 'rut'], 'Severidad')
+        self._severidad_fq_source = severidad_fq_df
+        return self.severidad_fq_map
+
+    def indexar_clasificacion_paliativos(self, clasificacion_df):
+        """Registrar la clasificación de paliativos y construir su índice por RUT"""
+        self.clasificacion_paliativos_df = clasificacion_df
+        self._clasificacion_paliativos_cargada = True
+        self.clasificacion_paliativos_map = self._indexar_por_rut(clasificacion_df, ['RUT'], 'condicion')
+        self._clasificacion_paliativos_source = clasificacion_df
+        return self.clasificacion_paliativos_map
+
+    def reiniciar_indices_rut(self):
+        """Descartar índices de severidad FQ / paliativos para releerlos desde inputs/ al próximo uso"""
+        self.severidad_fq_df = None
+        self.clasificacion_paliativos_df = None
+        self._severidad_fq_cargada = False
+        self._clasificacion_paliativos_cargada = False
+        self.severidad_fq_map = {}
+        self.clasificacion_paliativos_map = {}
+        self._severidad_fq_source = None
+        self._clasificacion_paliativos_source = None
+
+    def compartir_referencias(self, otro):
+        """Tomar arancel, trazadoras e índices RUT ya cargados por `otro` (modo lote por meses)"""
+        for atributo in ('arancel_df', 'trazadoras_medicamentos', 'trazadoras_consultas', 'exclusiones',
+                         'severidad_fq_df', 'severidad_fq_map', '_severidad_fq_source', '_severidad_fq_cargada',
+                         'clasificacion_paliativos_df', 'clasificacion_paliativos_map',
+                         '_clasificacion_paliativos_source', '_clasificacion_paliativos_cargada'):
+            if hasattr(otro, atributo):
+                setattr(self, atributo, getattr(otro, atributo))
+
+    def _get_severidad_fq_map(self):
+        """Índice de severidad FQ; carga severidad_FQ.xlsx al primer uso"""
+        if not self._severidad_fq_cargada and self.severidad_fq_df is None:
+            try:
+                severidad_file = os.path.join(self.base_path, "inputs", "severidad_FQ.xlsx")
+                df = pd.read_excel(severidad_file)
+                # Limpiar nombres de columnas (quitar espacios)
+                df.columns = df.columns.str.strip()
+            except Exception as e:
+                print(f"Error cargando severidad FQ: {e}")
+                df = None
+            self.indexar_severidad_fq(df)
+        elif self._severidad_fq_source is not self.severidad_fq_df:
+            self.indexar_severidad_fq(self.severidad_fq_df)
+        return self.severidad_fq_map
+
+    def _get_clasificacion_paliativos_map(self):
+        """Índice de paliativos; carga clasificacion_paliativos.csv al primer uso"""
+        if not self._clasificacion_paliativos_cargada and self.clasificacion_paliativos_df is None:
+            try:
+                clasificacion_file = os.path.join(self.base_path, "inputs", "clasificacion_paliativos.csv")
+                df = pd.read_csv(clasificacion_file, sep=';')
+                # Limpiar nombres de columnas (quitar espacios extra)
+                df.columns = df.columns.str.strip()
+                print(f"Cargando clasificación paliativos con columnas: {list(df.columns)}")
+            except Exception as e:
+                print(f"Error cargando clasificación paliativos: {e}")
+                df = None
+            self.indexar_clasificacion_paliativos(df)
+        elif self._clasificacion_paliativos_source is not self.clasificacion_paliativos_df:
+            self.indexar_clasificacion_paliativos(self.clasificacion_paliativos_df)
+        return self.clasificacion_paliativos_map
+
     def determinar_trazadora_medicamento(self, medicamento_desc, patologia, rut_paciente=None):
         """Determinar la trazadora apropiada para un medicamento según patología y tipo de medicamento"""
         
@@ -164,74 +282,32 @@ class TrazadoraProcessor:
             return "2301001"  # Código por defecto
     
     def _determinar_trazadora_asma_medicamento(self, medicamento_desc):
-        """Determinar trazadora específica para medicamentos de ASMA según tipo"""
-        medicamento_desc = medicamento_desc.upper()
-        
-        # Monoclonales específicos para ASMA (Mepolizumab / Omalizumab)
-        if any(med in medicamento_desc for med in ["MEPOLIZUMAB", "OMALIZUMAB"]):
-            return self.normalizar_codigo_trazadora("2508156")  # MAB ASMA (MEPOLIZUMAB/OMALIZUMAB)
-
-            return self.normalizar_codigo_trazadora("3902006")  # Ipratropio bromuro
-        elif any(med in medicamento_desc for med in ["PREDNIZONA", "PREDNISONA", "DELTISONA"]):
-            return self.normalizar_codigo_trazadora("3902004")  # Prednizona
-        elif any(med in medicamento_desc for med in ["DESLORATADINA", "AERIUS", "AZOMYR"]):
-            return self.normalizar_codigo_trazadora("3902005")  # Desloratadina
-        elif any(med in medicamento_desc for med in ["BUDESONIDA", "BECLOMETASONA", "FLUTICASONA", "INHALATORIO", "INHALED"]):
-            return self.normalizar_codigo_trazadora("3902002")  # Corticoide inhalatorio
-        else:
-            return self.normalizar_codigo_trazadora("3902001")  # Por defecto salbutamol
+        """Determinar trazadora específica para medicamentos de ASMA según tipo (reglas_trazadoras.csv)"""
+        return self.normalizar_codigo_trazadora(
+            self.reglas_trazadoras.clasificar_descripcion(medicamento_desc, "ASMA")
+        )
     
     def _determinar_trazadora_fibrosis_medicamento(self, medicamento_desc, rut_paciente):
-        """Determinar trazadora específica para medicamentos de Fibrosis según severidad y tipo"""
-        medicamento_desc = medicamento_desc.upper()
-
-        # Trazadora específica para TRIKAFTA (independiente de severidad)
-        if any(med in medicamento_desc for med in ["TRIKAFTA", "ELEXACAFTOR", "TEZACAFTOR", "IVACAFTOR"]):
-            return self.normalizar_codigo_trazadora("2508141")  # TRIKAFTA para Fibrosis Quística
-        
-        # Determinar severidad del paciente
-        severidad = "leve"  # Por defecto
-        if rut_paciente:
-            severidad = self._obtener_severidad_fq(rut_paciente)
-        
-        # Trazadoras específicas según medicamento y severidad
-        if any(med in medicamento_desc for med in ["TOBRAMICINA", "TOBI"]):
-            return self.normalizar_codigo_trazadora("3004004")  # TRATAMIENTO FARMACOLOGICO CON TOBRAMICINA PARA PACIENTES CON FIBROSIS QUISTICA GRAVE
-        else:
-            # Trazadoras según severidad para otros medicamentos
-            if severidad == "grave":
-                return self.normalizar_codigo_trazadora("2505256")  # TRATAMIENTO FIBROSIS QUÍSTICA GRAVE
-            elif severidad == "moderada":
-                return self.normalizar_codigo_trazadora("2505260")  # TRATAMIENTO FIBROSIS QUÍSTICA MODERADA  
-            else:  # leve
-                return self.normalizar_codigo_trazadora("2505263")  # TRATAMIENTO FIBROSIS QUÍSTICA LEVE
+        """Determinar trazadora específica para medicamentos de Fibrosis según medicamento y severidad"""
+        codigo = self.reglas_trazadoras.clasificar_descripcion(medicamento_desc, "Fibrosis")
+        if codigo == RESOLVER_SEVERIDAD_FQ:
+            severidad = self._obtener_severidad_fq(rut_paciente) if rut_paciente else "leve"
+            codigo = TRAZADORAS_FIBROSIS_SEVERIDAD[severidad]
+        return self.normalizar_codigo_trazadora(codigo)
     
     def _determinar_trazadora_paliativos_medicamento(self, rut_paciente):
         """Determinar trazadora para medicamentos de Paliativos según progresión"""
         if not rut_paciente:
             return self.normalizar_codigo_trazadora("3002123")  # No progresivo por defecto
             
-        # Cargar datos de clasificación si no están cargados
-        if not hasattr(self, 'clasificacion_paliativos_df'):
-            try:
-                clasificacion_file = os.path.join(self.base_path, "inputs", "clasificacion_paliativos.csv")
-                self.clasificacion_paliativos_df = pd.read_csv(clasificacion_file, sep=';')
-                # Limpiar nombres de columnas (quitar espacios extra)
-                self.clasificacion_paliativos_df.columns = self.clasificacion_paliativos_df.columns.str.strip()
-                print(f"Cargando clasificación paliativos con columnas: {list(self.clasificacion_paliativos_df.columns)}")
-            except Exception as e:
-                print(f"Error cargando clasificación paliativos: {e}")
-                return self.normalizar_codigo_trazadora("3002123")  # No progresivo por defecto
+        clasificacion_map = self._get_clasificacion_paliativos_map()
         
         # Normalizar RUT (quitar guiones y dígito verificador)
         rut_normalizado = str(rut_paciente).split('-')[0].replace('-', '')
         
-        # Buscar condición del paciente usando la nueva estructura
-        # El archivo tiene columnas: RUT y condicion
-        rut_series = self.clasificacion_paliativos_df['RUT'].astype(str).str.split('-').str[0]
-        mask = rut_series == rut_normalizado
-        if mask.any():
-            condicion = str(self.clasificacion_paliativos_df[mask]['condicion'].iloc[0]).strip()
+        # Buscar condición del paciente (índice RUT → condicion)
+        if rut_normalizado in clasificacion_map:
+            condicion = str(clasificacion_map[rut_normalizado]).strip()
             
             # Mapear condición a trazadora
             # NP y CP-NO = No progresivo
@@ -241,41 +317,28 @@ class TrazadoraProcessor:
             else:
                 return self.normalizar_codigo_trazadora("3002023")  # Progresivo - cáncer terminal
         
-        print(f"⚠️ RUT {rut_paciente}: No se encontró clasificación paliativos, usando NO PROGRESIVO por defecto")
+        self.eventos.registrar("Paliativos sin clasificación (NO PROGRESIVO por defecto)",
+                               "⚠️ RUT %s: No se encontró clasificación paliativos, usando NO PROGRESIVO por defecto", rut_paciente)
         return self.normalizar_codigo_trazadora("3002123")  # No progresivo por defecto
     
     def _obtener_severidad_fq(self, rut_paciente):
         """Obtener severidad de Fibrosis Quística para un paciente"""
-        if not hasattr(self, 'severidad_fq_df'):
-            try:
-                severidad_file = os.path.join(self.base_path, "inputs", "severidad_FQ.xlsx")
-                self.severidad_fq_df = pd.read_excel(severidad_file)
-                # Limpiar nombres de columnas (quitar espacios)
-                self.severidad_fq_df.columns = self.severidad_fq_df.columns.str.strip()
-            except Exception as e:
-                print(f"Error cargando severidad FQ: {e}")
-                return "leve"
+        severidad_map = self._get_severidad_fq_map()
         
         # Normalizar RUT (quitar guiones y dígito verificador)
         rut_normalizado = str(rut_paciente).split('-')[0].replace('-', '')
         
-        # Buscar severidad del paciente en la columna RUT (con posibles espacios)
-        for col in ['RUT', 'Rut', 'rut', 'Rut ']:
-            if col in self.severidad_fq_df.columns:
-                # Extraer solo el número del RUT de la columna (sin DV)
-                rut_series = self.severidad_fq_df[col].astype(str).str.split('-').str[0]
-                mask = rut_series == rut_normalizado
-                if mask.any():
-                    severidad = str(self.severidad_fq_df[mask]['Severidad'].iloc[0]).lower().strip()
-                    
-                    # Mapear severidad actualizada a nombres estándar
-                    if severidad in ['severo', 'grave']:
-                        return "grave"
-                    elif severidad in ['moderado', 'moderada']:
-                        return "moderada" 
-                    elif severidad in ['leve']:
-                        return "leve"
-                break
+        # Buscar severidad del paciente (índice RUT → Severidad)
+        if rut_normalizado in severidad_map:
+            severidad = str(severidad_map[rut_normalizado]).lower().strip()
+            
+            # Mapear severidad actualizada a nombres estándar
+            if severidad in ['severo', 'grave']:
+                return "grave"
+            elif severidad in ['moderado', 'moderada']:
+                return "moderada" 
+            elif severidad in ['leve']:
+                return "leve"
         
         return "leve"  # Por defecto
 
@@ -307,44 +370,56 @@ class TrazadoraProcessor:
             
         return self.normalizar_codigo_trazadora(codigo)
     
+    def determinar_trazadoras_consultas(self, patologias, ruts_pacientes, eventos=None):
+        """
+        Versión columnar de determinar_trazadora_consulta.
+
+        Fibrosis y Paliativos se resuelven una vez por RUT único; el resto
+        con el código fijo de la patología. `eventos` (lista) recibe los eventos
+        de cada consulta (ver ContadorEventos.resolver_por_unidad).
+        """
+        patologias = pd.Series(patologias).map(lambda p: "" if pd.isna(p) else str(p).strip())
+        ruts_pacientes = pd.Series(np.asarray(ruts_pacientes, dtype=object), index=patologias.index)
+
+        codigos_fijos = {"EPOC": "0101110", "ASMA": "0101113"}
+        codigos = patologias.map(codigos_fijos).fillna("0101322").map(self.normalizar_codigo_trazadora)
+
+        por_rut = [
+            ("Fibrosis", self._determinar_trazadora_fibrosis_consulta),
+            ("Paliativos", self._determinar_trazadora_paliativos_consulta),
+        ]
+        for patologia, determinar in por_rut:
+            mascara = (patologias == patologia).to_numpy()
+            if mascara.any():
+                resueltos = self.eventos.resolver_por_unidad(determinar, ruts_pacientes[mascara], patologia, eventos)
+                codigos[mascara] = resueltos.to_numpy(dtype=object)
+
+        return codigos.astype(object)
+
     def _determinar_trazadora_fibrosis_consulta(self, rut_paciente):
         """Determinar trazadora para Fibrosis según severidad usando severidad_FQ.xlsx"""
         if not rut_paciente:
             return "3004501"  # Leve por defecto
             
-        # Cargar datos de severidad si no están cargados
-        if not hasattr(self, 'severidad_fq_df'):
-            try:
-                severidad_file = os.path.join(self.base_path, "inputs", "severidad_FQ.xlsx")
-                self.severidad_fq_df = pd.read_excel(severidad_file)
-                # Limpiar nombres de columnas (quitar espacios)
-                self.severidad_fq_df.columns = self.severidad_fq_df.columns.str.strip()
-            except Exception as e:
-                print(f"Error cargando severidad FQ: {e}")
-                return "3004501"  # Leve por defecto
+        severidad_map = self._get_severidad_fq_map()
         
         # Normalizar RUT (quitar guiones y dígito verificador)
         rut_normalizado = str(rut_paciente).split('-')[0].replace('-', '')
         
-        # Buscar severidad del paciente en la columna RUT (con posibles espacios)
-        for col in ['RUT', 'Rut', 'rut', 'Rut ']:
-            if col in self.severidad_fq_df.columns:
-                # Extraer solo el número del RUT de la columna (sin DV)
-                rut_series = self.severidad_fq_df[col].astype(str).str.split('-').str[0]
-                mask = rut_series == rut_normalizado
-                if mask.any():
-                    severidad = str(self.severidad_fq_df[mask]['Severidad'].iloc[0]).lower().strip()
-                    
-                    # Mapear severidad actualizada a trazadora
-                    if severidad in ['severo', 'grave']:
-                        return self.normalizar_codigo_trazadora("3004503")
-                    elif severidad in ['moderado', 'moderada']:
-                        return self.normalizar_codigo_trazadora("3004502") 
-                    elif severidad in ['leve']:
-                        return self.normalizar_codigo_trazadora("3004501")
-                break
+        # Buscar severidad del paciente (índice RUT → Severidad)
+        if rut_normalizado in severidad_map:
+            severidad = str(severidad_map[rut_normalizado]).lower().strip()
+            
+            # Mapear severidad actualizada a trazadora
+            if severidad in ['severo', 'grave']:
+                return self.normalizar_codigo_trazadora("3004503")
+            elif severidad in ['moderado', 'moderada']:
+                return self.normalizar_codigo_trazadora("3004502") 
+            elif severidad in ['leve']:
+                return self.normalizar_codigo_trazadora("3004501")
         
-        print(f"⚠️ RUT {rut_paciente}: No se encontró severidad FQ, usando LEVE por defecto")
+        self.eventos.registrar("FQ sin severidad registrada (LEVE por defecto)",
+                               "⚠️ RUT %s: No se encontró severidad FQ, usando LEVE por defecto", rut_paciente)
         return self.normalizar_codigo_trazadora("3004501")  # Leve por defecto
     
     def _determinar_trazadora_paliativos_consulta(self, rut_paciente):
@@ -352,27 +427,14 @@ class TrazadoraProcessor:
         if not rut_paciente:
             return self.normalizar_codigo_trazadora("3002123")  # No progresivo por defecto
             
-        # Cargar datos de clasificación si no están cargados
-        if not hasattr(self, 'clasificacion_paliativos_df'):
-            try:
-                clasificacion_file = os.path.join(self.base_path, "inputs", "clasificacion_paliativos.csv")
-                self.clasificacion_paliativos_df = pd.read_csv(clasificacion_file, sep=';')
-                # Limpiar nombres de columnas (quitar espacios extra)
-                self.clasificacion_paliativos_df.columns = self.clasificacion_paliativos_df.columns.str.strip()
-                print(f"Cargando clasificación paliativos con columnas: {list(self.clasificacion_paliativos_df.columns)}")
-            except Exception as e:
-                print(f"Error cargando clasificación paliativos: {e}")
-                return self.normalizar_codigo_trazadora("3002123")  # No progresivo por defecto
+        clasificacion_map = self._get_clasificacion_paliativos_map()
         
         # Normalizar RUT (quitar guiones y dígito verificador)
         rut_normalizado = str(rut_paciente).split('-')[0].replace('-', '')
         
-        # Buscar condición del paciente usando la nueva estructura
-        # El archivo tiene columnas: RUT y condicion
-        rut_series = self.clasificacion_paliativos_df['RUT'].astype(str).str.split('-').str[0]
-        mask = rut_series == rut_normalizado
-        if mask.any():
-            condicion = str(self.clasificacion_paliativos_df[mask]['condicion'].iloc[0]).strip()
+        # Buscar condición del paciente (índice RUT → condicion)
+        if rut_normalizado in clasificacion_map:
+            condicion = str(clasificacion_map[rut_normalizado]).strip()
             
             # Mapear condición a trazadora
             # NP y CP-NO = No progresivo
@@ -382,7 +444,8 @@ class TrazadoraProcessor:
             else:
                 return self.normalizar_codigo_trazadora("3002023")  # Progresivo - cáncer terminal
         
-        print(f"⚠️ RUT {rut_paciente}: No se encontró clasificación paliativos, usando NO PROGRESIVO por defecto")
+        self.eventos.registrar("Paliativos sin clasificación (NO PROGRESIVO por defecto)",
+                               "⚠️ RUT %s: No se encontró clasificación paliativos, usando NO PROGRESIVO por defecto", rut_paciente)
         return self.normalizar_codigo_trazadora("3002123")  # No progresivo por defecto
 
     def generar_archivo_cruce(self, ges_df, consultas_df, farmacia_df):
@@ -392,99 +455,52 @@ class TrazadoraProcessor:
 
         print("\n📊 GENERANDO ARCHIVO DE CRUCE...")
 
-        # Crear DataFrame base con todos los pacientes GES
-        cruce_data = []
-
-        # Convertir RUTs a string y normalizar a mayúsculas para comparación (evita mismatches por dv minúscula)
-        ges_patients = set(ges_df["RUT"].astype(str).str.upper())
-        consultas_ruts = (
-            set(consultas_df["RUNPaciente"].astype(str).str.upper()) if consultas_df is not None else set()
+        # RUT de cada paciente GES tal como viene y normalizado a mayúsculas
+        # (la marca de atención compara el RUT original; los conteos, el normalizado)
+        ruts = ges_df["RUT"].map(str)
+        ruts_upper = ruts.str.upper()
+        # Determinar el nombre de la columna de patología
+        patologia_col = "Ges" if "Ges" in ges_df.columns else "Patologia"
+
+        # Conteos y especialidades por RUT, en una pasada por archivo
+        consultas = self._resumen_atenciones_por_rut(consultas_df, "RUNPaciente", "EspecialidadLocal")
+        medicamentos = self._resumen_atenciones_por_rut(
+            farmacia_df, "RUT_Combined", "LocalSolicitante", self._limpiar_local_solicitante
         )
-        farmacia_ruts = set(farmacia_df["RUT_Combined"].astype(str).str.upper()) if farmacia_df is not None else set()
-
-        for _, paciente in ges_df.iterrows():
-            rut_completo = str(paciente["RUT"])
-            rut_original = rut_completo  # Mantener el RUT original para comparación
-            rut_original_upper = rut_original.upper()  # Normalizar para comparaciones posteriores
-            # Determinar el nombre de la columna de patología
-            patologia_col = "Ges" if "Ges" in ges_df.columns else "Patologia"
-            patologia = paciente[patologia_col]
-
-            # Separar RUT y DV para el reporte
-            if "-" in rut_completo:
-                rut_partes = rut_completo.split("-")
-                rut_display = rut_partes[0]
-                dv_display = rut_partes[1] if len(rut_partes) > 1 else ""
-            else:
-                rut_display = rut_completo
-                dv_display = paciente.get("DV", "") if "DV" in paciente else ""
-
-            # Verificar si tuvo consultas (usar RUT original)
-            tuvo_consulta = rut_original in consultas_ruts
-            consultas_count = 0
-            especialidades_consulta = []
-
-            if tuvo_consulta and consultas_df is not None:
-                consultas_paciente = consultas_df[
-                    consultas_df["RUNPaciente"].astype(str).str.upper() == rut_original_upper
-                ]
-                consultas_count = len(consultas_paciente)
-
-                # Obtener especialidades únicas
-                if "EspecialidadLocal" in consultas_paciente.columns:
-                    especialidades_consulta = (
-                        consultas_paciente["EspecialidadLocal"].dropna().unique().tolist()
-                    )
-
-            # Verificar si tuvo medicamentos (usar RUT original)
-            tuvo_medicamento = rut_original in farmacia_ruts
-            medicamentos_count = 0
-            especialidades_farmacia = []
-
-            if tuvo_medicamento and farmacia_df is not None:
-                medicamentos_paciente = farmacia_df[farmacia_df["RUT_Combined"].astype(str).str.upper() == rut_original_upper]
-                medicamentos_count = len(medicamentos_paciente)
-
-                # Obtener locales solicitantes únicos (especialidades que prescribieron)
-                if "LocalSolicitante" in medicamentos_paciente.columns:
-                    especialidades_raw = (
-                        medicamentos_paciente["LocalSolicitante"].dropna().unique().tolist()
-                    )
-                    # Limpiar especialidades (quitar INT- y -R/-P)
-                    especialidades_farmacia = []
-                    for esp in especialidades_raw:
-                        esp_clean = str(esp).strip()
-                        if esp_clean.startswith("INT-"):
-                            esp_clean = esp_clean[4:]  # Eliminar "INT-"
-                        if esp_clean.endswith("-R") or esp_clean.endswith("-P"):
-                            esp_clean = esp_clean[:-2]  # Eliminar "-R" o "-P"
-                        if esp_clean:
-                            especialidades_farmacia.append(esp_clean)
-
-            cruce_data.append(
-                {
-                    "RUT": rut_display,
-                    "DV": dv_display,
-                    "PATOLOGIA_GES": patologia,
-                    "TUVO_CONSULTA": "SÍ" if tuvo_consulta else "NO",
-                    "NUM_CONSULTAS": consultas_count,
-                    "ESPECIALIDADES_CONSULTA": (
-                        "; ".join(especialidades_consulta) if especialidades_consulta else ""
-                    ),
-                    "TUVO_MEDICAMENTO": "SÍ" if tuvo_medicamento else "NO",
-                    "NUM_MEDICAMENTOS": medicamentos_count,
-                    "ESPECIALIDADES_PRESCRIPCION": (
-                        "; ".join(especialidades_farmacia) if especialidades_farmacia else ""
-                    ),
-                    "ATENCION_COMPLETA": "SÍ" if (tuvo_consulta and tuvo_medicamento) else "NO",
-                    "SOLO_CONSULTA": "SÍ" if (tuvo_consulta and not tuvo_medicamento) else "NO",
-                    "SOLO_MEDICAMENTO": "SÍ" if (not tuvo_consulta and tuvo_medicamento) else "NO",
-                    "SIN_ATENCION": "SÍ" if (not tuvo_consulta and not tuvo_medicamento) else "NO",
-                }
-            )
-
-        # Crear DataFrame y guardar
-        df_cruce = pd.DataFrame(cruce_data)
+        tuvo_consulta = ruts.isin(consultas["ruts"]).to_numpy()
+        tuvo_medicamento = ruts.isin(medicamentos["ruts"]).to_numpy()
+
+        # Separar RUT y DV para el reporte
+        partes = ruts.str.split("-")
+        con_guion = ruts.str.contains("-", regex=False).to_numpy()
+        dv_columna = ges_df["DV"].astype(object) if "DV" in ges_df.columns else pd.Series("", index=ges_df.index, dtype=object)
+        rut_display = np.where(con_guion, partes.str[0], ruts)
+        dv_display = np.where(con_guion, partes.str[1].fillna(""), dv_columna.to_numpy())
+
+        def marca(condicion):
+            return np.where(condicion, "SÍ", "NO")
+
+        def por_rut(resumen, campo, tuvo, vacio):
+            valores = ruts_upper.map(resumen[campo]).to_numpy(dtype=object)
+            return np.where(tuvo & pd.notna(valores), valores, vacio)
+
+        df_cruce = pd.DataFrame({
+            "RUT": rut_display,
+            "DV": dv_display,
+            "PATOLOGIA_GES": ges_df[patologia_col].to_numpy(),
+            "TUVO_CONSULTA": marca(tuvo_consulta),
+            "NUM_CONSULTAS": por_rut(consultas, "conteos", tuvo_consulta, 0).astype("int64"),
+            "ESPECIALIDADES_CONSULTA": por_rut(consultas, "especialidades", tuvo_consulta, ""),
+            "TUVO_MEDICAMENTO": marca(tuvo_medicamento),
+            "NUM_MEDICAMENTOS": por_rut(medicamentos, "conteos", tuvo_medicamento, 0).astype("int64"),
+            "ESPECIALIDADES_PRESCRIPCION": por_rut(medicamentos, "especialidades", tuvo_medicamento, ""),
+            "ATENCION_COMPLETA": marca(tuvo_consulta & tuvo_medicamento),
+            "SOLO_CONSULTA": marca(tuvo_consulta & ~tuvo_medicamento),
+            "SOLO_MEDICAMENTO": marca(~tuvo_consulta & tuvo_medicamento),
+            "SIN_ATENCION": marca(~tuvo_consulta & ~tuvo_medicamento),
+        })
+
+        # Guardar
         df_cruce.to_csv(archivo_cruce, sep="|", index=False, encoding="utf-8")
 
         print(f"OK - Archivo de cruce generado: {archivo_cruce}")
@@ -494,3 +510,38 @@ class TrazadoraProcessor:
         print(f"INFO - Atención completa: {len(df_cruce[df_cruce['ATENCION_COMPLETA'] == 'SÍ'])}")
 
         return archivo_cruce
+
+    def _resumen_atenciones_por_rut(self, df, columna_rut, columna_especialidad, limpiar=None):
+        """
+        Para el archivo de cruce: RUT normalizados presentes, registros por RUT y
+        especialidades distintas por RUT (en orden de aparición, unidas con "; ").
+        """
+        vacio = {"ruts": set(), "conteos": pd.Series(dtype="int64"), "especialidades": pd.Series(dtype=object)}
+        if df is None:
+            return vacio
+
+        claves = df[columna_rut].astype(str).str.upper()
+        resumen = dict(vacio, ruts=set(claves), conteos=claves.value_counts())
+
+        if columna_especialidad in df.columns:
+            especialidades = pd.DataFrame({
+                "rut": claves.to_numpy(),
+                "especialidad": df[columna_especialidad].astype(object).to_numpy(),
+            }).dropna(subset=["especialidad"]).drop_duplicates()
+            if limpiar is not None:
+                limpias = {valor: limpiar(valor) for valor in especialidades["especialidad"].unique()}
+                especialidades["especialidad"] = especialidades["especialidad"].map(limpias)
+                especialidades = especialidades[especialidades["especialidad"] != ""]
+            resumen["especialidades"] = especialidades.groupby("rut", sort=False)["especialidad"].agg("; ".join)
+
+        return resumen
+
+    @staticmethod
+    def _limpiar_local_solicitante(local):
+        """Local solicitante como especialidad: sin prefijo INT- ni sufijo -R/-P"""
+        local = str(local).strip()
+        if local.startswith("INT-"):
+            local = local[4:]  # Eliminar "INT-"
+        if local.endswith("-R") or local.endswith("-P"):
+            local = local[:-2]  # Eliminar "-R" o "-P"
+        return local
@@ -0,0 +1,156 @@
+"""
+Motor de reglas de trazadoras de medicamentos.
+
+Las reglas (palabras clave → código por patología, con prioridad) se leen de
+reglas_trazadoras.csv, de modo que un nuevo arancel es un cambio de datos y no
+de código. Por patología las palabras clave se compilan en una sola expresión
+regular y cada descripción distinta se clasifica una vez; los resultados se
+memorizan por (patología, descripción normalizada) y pueden guardarse en disco
+para la siguiente corrida.
+"""
+
+import hashlib
+import json
+import os
+import re
+
+import pandas as pd
+
+ARCHIVO_REGLAS_TRAZADORAS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reglas_trazadoras.csv")
+
+# Códigos que no son trazadoras sino que se resuelven con datos del paciente
+RESOLVER_SEVERIDAD_FQ = "SEVERIDAD_FQ"
+RESOLVER_CLASIFICACION_PALIATIVOS = "CLASIFICACION_PALIATIVOS"
+
+
+def normalizar_descripcion(descripcion):
+    """Texto con el que se evalúan las reglas (minúsculas, sin espacios en los extremos)"""
+    return str(descripcion).lower().strip()
+
+
+class TrazadoraRuleEngine:
+    """Clasificador de descripciones de medicamentos según reglas por patología"""
+
+    def __init__(self, reglas):
+        """`reglas`: DataFrame con columnas patologia, prioridad, palabras_clave y codigo"""
+        self.reglas = reglas
+        self._compiladas = {}
+
+        # Memo (patología, descripción normalizada) → código, válido mientras no cambien las reglas
+        self._memo = {}
+        self.consultas = 0
+        self.aciertos = 0
+        columnas = ["patologia", "prioridad", "palabras_clave", "codigo"]
+        self.firma = hashlib.sha256(reglas[columnas].to_csv(index=False).encode("utf-8")).hexdigest()
+
+        for patologia, grupo in reglas.groupby("patologia", sort=False):
+            grupo = grupo.sort_values("prioridad", kind="stable")
+            prioridad_palabra = {}
+            default = None
+            for prioridad, palabras, codigo in zip(grupo["prioridad"], grupo["palabras_clave"], grupo["codigo"]):
+                palabras = [p.strip().lower() for p in str(palabras or "").split("|") if p.strip()]
+                if not palabras:
+                    if default is None:
+                        default = codigo
+                    continue
+                for palabra in palabras:
+                    prioridad_palabra.setdefault(palabra, (prioridad, codigo))
+
+            patron = None
+            if prioridad_palabra:
+                # Alternativas en orden de prioridad dentro de un lookahead: en cada posición
+                # gana la regla más prioritaria y se detectan coincidencias superpuestas
+                ordenadas = sorted(prioridad_palabra, key=lambda p: prioridad_palabra[p][0])
+                patron = re.compile("(?=(" + "|".join(re.escape(p) for p in ordenadas) + "))")
+            self._compiladas[patologia] = (patron, prioridad_palabra, default)
+
+    @classmethod
+    def desde_archivo(cls, ruta=ARCHIVO_REGLAS_TRAZADORAS):
+        """Cargar reglas desde un CSV separado por ';'"""
+        reglas = pd.read_csv(ruta, sep=";", dtype=str, keep_default_na=False, encoding="utf-8")
+        reglas["prioridad"] = reglas["prioridad"].astype(int)
+        return cls(reglas)
+
+    def patologias(self):
+        """Patologías con reglas definidas"""
+        return list(self._compiladas)
+
+    def tiene_reglas(self, patologia):
+        return patologia in self._compiladas
+
+    def clasificar_descripcion(self, descripcion, patologia):
+        """Código (o resolver) para una descripción; None si la patología no tiene reglas"""
+        if patologia not in self._compiladas:
+            return None
+        self.consultas += 1
+        codigo, nuevo = self._clasificar_normalizada(normalizar_descripcion(descripcion or ""), patologia)
+        self.aciertos += not nuevo
+        return codigo
+
+    def clasificar(self, descripciones, patologia):
+        """Clasificar una columna completa de descripciones: cada texto distinto se evalúa una vez"""
+        descripciones = pd.Series(descripciones)
+        texto = descripciones.fillna("").astype(str).str.lower().str.strip()
+        if patologia not in self._compiladas:
+            return pd.Series([None] * len(texto), index=descripciones.index, dtype=object)
+
+        codigos = {}
+        evaluadas = 0
+        for valor in pd.unique(texto):
+            codigos[valor], nuevo = self._clasificar_normalizada(valor, patologia)
+            evaluadas += nuevo
+        self.consultas += len(texto)
+        self.aciertos += len(texto) - evaluadas
+        return pd.Series([codigos[valor] for valor in texto], index=descripciones.index, dtype=object)
+
+    def _clasificar_normalizada(self, texto, patologia):
+        """(código, True si hubo que evaluar las reglas) para un texto ya normalizado"""
+        clave = (patologia, texto)
+        if clave in self._memo:
+            return self._memo[clave], False
+
+        patron, prioridad_palabra, default = self._compiladas[patologia]
+        coincidencias = patron.findall(texto) if patron is not None else []
+        if coincidencias:
+            codigo = min((prioridad_palabra[palabra] for palabra in coincidencias), key=lambda regla: regla[0])[1]
+        else:
+            codigo = default
+        self._memo[clave] = codigo
+        return codigo, True
+
+    def resumen_memo(self):
+        """Texto con descripciones memorizadas y tasa de aciertos"""
+        tasa = 100 * self.aciertos / self.consultas if self.consultas else 0
+        return (f"Clasificación de medicamentos: {len(self._memo)} descripciones distintas, "
+                f"{self.aciertos}/{self.consultas} desde memoria ({tasa:.1f}%)")
+
+    def guardar_memo(self, ruta):
+        """Guardar clasificaciones memorizadas (JSON) junto con la firma de las reglas"""
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        contenido = {
+            "firma_reglas": self.firma,
+            "clasificaciones": [[patologia, texto, codigo] for (patologia, texto), codigo in self._memo.items()],
+        }
+        temporal = ruta + ".tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(contenido, f, ensure_ascii=False)
+        os.replace(temporal, ruta)
+
+    def cargar_memo(self, ruta):
+        """Incorporar clasificaciones guardadas si fueron hechas con las mismas reglas; retorna cuántas"""
+        if not os.path.exists(ruta):
+            return 0
+        try:
+            with open(ruta, encoding="utf-8") as f:
+                contenido = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        if contenido.get("firma_reglas") != self.firma:
+            return 0
+
+        cargadas = 0
+        for patologia, texto, codigo in contenido.get("clasificaciones", []):
+            if patologia in self._compiladas and (patologia, texto) not in self._memo:
+                self._memo[(patologia, texto)] = codigo
+                cargadas += 1
+        return cargadas
@@ -0,0 +1,51 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+from ges_data_processor import GESDataProcessor
+
+
+def create_test_processor(tmp_path, medicamentos_ges, farmacos):
+    processor = GESDataProcessor(base_path=str(tmp_path), auto_select_files=False)
+    processor.medicamentos_ges_df = pd.DataFrame({'Farmaco_Desc': medicamentos_ges})
+    processor.ges_df = pd.DataFrame({
+        'RUT': ['11111111-1', '22222222-2'], 'Ges': ['ASMA', 'Paliativos'],
+    })
+    processor.farmacia_df = pd.DataFrame({
+        'RUT_Combined': ['11111111-1'] * len(farmacos) + ['22222222-2'],
+        'Farmaco_Desc': farmacos + ['SALBUTAMOL'],
+    })
+    return processor
+
+
+def buscar_por_fuerza_bruta(processor, med_admin, medicamentos_ges):
+    for med_ges in medicamentos_ges:
+        if med_ges in med_admin or processor.similar_medicine_name(med_admin, med_ges):
+            return med_ges
+    return None
+
+
+def test_coincidencias_iguales_a_comparar_contra_todo_el_listado(tmp_path):
+    medicamentos_ges = ['Salbutamol', 'BUDESONIDA 200 MCG', 'FORMOTEROL-BUDESONIDA', 'TIOTROPIO', 'BUTAMOL', None]
+    farmacos = [
+        'salbutamol 100mcg inh', 'SALBUTAMOL 100MCG INH', 'budesonida 200 mcg inh', 'BUDESONIDA FORMOTEROL',
+        'XBUTAMOLX', 'TIOTROPIO-CAPS', 'PARACETAMOL 500', None,
+    ]
+    processor = create_test_processor(tmp_path, medicamentos_ges, farmacos)
+
+    processor.analizar_medicamentos_ges()
+    resultado = processor.medicamentos_encontrados
+
+    listado = [m.upper() for m in medicamentos_ges if m]
+    coincidencias = {c['medicamento_administrado']: c for c in resultado['coincidencias']}
+    for med_admin in {f.upper() for f in farmacos if f}:
+        assert coincidencias.get(med_admin, {}).get('medicamento_ges') == \
+            buscar_por_fuerza_bruta(processor, med_admin, listado), med_admin
+
+    # Registros por nombre normalizado; el paciente paliativo no se considera
+    assert coincidencias['SALBUTAMOL 100MCG INH']['pacientes'] == 2
+    assert coincidencias['XBUTAMOLX']['medicamento_ges'] == 'BUTAMOL'
+    assert resultado['no_coincidencias'] == [{'medicamento_administrado': 'PARACETAMOL 500', 'pacientes': 1}]
+    assert resultado['total_ges'] == 6
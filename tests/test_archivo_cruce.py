@@ -0,0 +1,46 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+from trazadora_processor import TrazadoraProcessor
+
+
+def create_test_cruce(tmp_path):
+    ges = pd.DataFrame({
+        'RUT': ['11111111-K', '22222222-2', '33333333', '44444444-4'],
+        'DV': ['K', '2', '3', '4'],
+        'Ges': ['ASMA', 'EPOC', 'Fibrosis', 'Paliativos'],
+    })
+    consultas = pd.DataFrame({
+        'RUNPaciente': ['11111111-k', '11111111-K', '11111111-K', '33333333', None],
+        'EspecialidadLocal': pd.Categorical(['07-102-0', '07-116-0', '07-102-0', None, '07-102-0']),
+    })
+    farmacia = pd.DataFrame({
+        'RUT_Combined': ['11111111-K', '22222222-2', '22222222-2', '22222222-2'],
+        'LocalSolicitante': ['INT-07-102-0-R', 'INT-07-116-0-P', '07-116-0', 'INT-'],
+    })
+    processor = TrazadoraProcessor(str(tmp_path))
+    processor.outputs_path = str(tmp_path)
+    archivo = processor.generar_archivo_cruce(ges, consultas, farmacia)
+    return pd.read_csv(archivo, sep='|', dtype=str, keep_default_na=False)
+
+
+def test_cruce_por_paciente(tmp_path):
+    cruce = create_test_cruce(tmp_path).set_index('RUT')
+
+    # Conteo sin distinguir mayúsculas del DV; especialidades distintas en orden de aparición
+    assert cruce.loc['11111111', ['DV', 'TUVO_CONSULTA', 'NUM_CONSULTAS', 'ESPECIALIDADES_CONSULTA']].tolist() == \
+        ['K', 'SÍ', '3', '07-102-0; 07-116-0']
+    assert cruce.loc['11111111', 'ATENCION_COMPLETA'] == 'SÍ'
+
+    # Locales limpios (sin INT- ni -R/-P); los que quedan vacíos se omiten
+    assert cruce.loc['22222222', ['NUM_MEDICAMENTOS', 'ESPECIALIDADES_PRESCRIPCION']].tolist() == \
+        ['3', '07-116-0; 07-116-0']
+    assert cruce.loc['22222222', 'SOLO_MEDICAMENTO'] == 'SÍ'
+
+    # RUT sin guion: DV desde la columna DV; consulta sin especialidad
+    assert cruce.loc['33333333', ['DV', 'NUM_CONSULTAS', 'ESPECIALIDADES_CONSULTA', 'SOLO_CONSULTA']].tolist() == \
+        ['3', '1', '', 'SÍ']
+    assert cruce.loc['44444444', ['NUM_CONSULTAS', 'NUM_MEDICAMENTOS', 'SIN_ATENCION']].tolist() == ['0', '0', 'SÍ']
@@ -0,0 +1,58 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+from ges_data_processor import GESDataProcessor
+
+
+def create_test_processor():
+    processor = GESDataProcessor(auto_select_files=False)
+    processor.ges_df = pd.DataFrame({
+        'RUT': ['11111111-1', '22222222-2', '33333333-3'],
+        'Ges': ['ASMA', 'Fibrosis', 'Paliativos'],
+    })
+    processor.severidad_fq_df = pd.DataFrame({'RUT': [22222222], 'Severidad': ['MODERADA']})
+    processor.clasificacion_paliativos_df = pd.DataFrame({'RUT': [33333333], 'condicion': ['NP']})
+    processor.trazadora_processor.indexar_severidad_fq(processor.severidad_fq_df)
+    processor.trazadora_processor.indexar_clasificacion_paliativos(processor.clasificacion_paliativos_df)
+    return processor
+
+
+def create_test_consultas():
+    return pd.DataFrame({
+        'RUNPaciente': ['11111111-1', '11111111-1', '11111111-1', '22222222-2', '22222222-2', '33333333-3'],
+        'EspecialidadLocal': ['07-102-0', '07-102-2', '07-116-0', '07-109-0', '07-109-0', '07-116-0'],
+        'FechaCita': ['01-03-2025', '2025-03-05', '01-03-2025', '02-03-2025', '02/03/2025', '03-03-2025'],
+    }, index=[5, 3, 9, 1, 1, 7])
+
+
+def test_filtro_especialidades_por_pares():
+    processor = create_test_processor()
+    consultas = create_test_consultas()
+
+    filtradas = processor.filtrar_consultas_especialidades_ges(consultas)
+    # 07-116-0 solo es válida para Paliativos
+    assert filtradas['EspecialidadLocal'].tolist() == ['07-102-0', '07-102-2', '07-109-0', '07-109-0', '07-116-0']
+
+
+def test_clasificar_y_deduplicar_consultas():
+    processor = create_test_processor()
+    consultas = processor.filtrar_consultas_especialidades_ges(create_test_consultas())
+    condiciones = processor.get_ges_conditions(consultas['RUNPaciente'])
+
+    registros = processor.clasificar_consultas_para_carga(consultas, condiciones)
+    assert registros['PRESTACION'].tolist() == ['0101113', '0101113', '3004502', '3004502', '3002123']
+    assert registros['ESPECIALIDAD'].tolist() == ['07-102-0', '07-102-2', '07-109-0', '07-109-0', '07-116-3']
+
+    finales = processor.deduplicar_consultas(registros)
+    assert 'RUNPaciente' not in finales.columns
+    # Misma fecha y prestación en FQ: queda una; ASMA ordenado por fecha descendente
+    assert finales['RUT'].tolist() == [11111111, 11111111, 22222222, 33333333]
+    assert finales['FECHA'].dt.day.tolist() == [5, 1, 2, 3]
+
+    esperado = []
+    for _, grupo in registros.groupby('RUNPaciente', sort=False):
+        esperado.extend(processor.agrupar_consultas_por_rut(grupo.drop(columns=['RUNPaciente']).to_dict('records')))
+    assert finales.to_dict('records') == esperado
@@ -0,0 +1,77 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+from ges_data_processor import GESDataProcessor
+
+
+def create_test_processor():
+    processor = GESDataProcessor(auto_select_files=False)
+    processor.ges_df = pd.DataFrame({'RUT': ['11111111-1', '22222222-K'], 'Ges': ['ASMA', 'EPOC']})
+    return processor
+
+
+def write_csv(path, df):
+    df.to_csv(path, sep=';', index=False, encoding='latin-1')
+    return str(path)
+
+
+def test_consultas_en_bloques_filtra_ges(tmp_path):
+    processor = create_test_processor()
+    consultas = pd.DataFrame({
+        'RUNPaciente': ['11111111-1', '33333333-3', '22222222-k', '44444444-4', '11111111-1'],
+        'EstadoCita_Desc': ['Atendido', 'Atendido', 'Llegó', 'No Atendido', 'Atendido'],
+        'EspecialidadLocal': ['07-102-0'] * 5,
+        'FechaCita': ['01-03-2025'] * 5,
+        'Observacion': ['x'] * 5,
+    })
+    archivo = write_csv(tmp_path / 'reporte_consulta.csv', consultas)
+
+    completo = processor.load_csv_safely(archivo, filtro_filas=processor.filtro_consultas_ges(), esquema='consultas')
+    en_bloques = processor.load_csv_safely(
+        archivo, chunksize=2, filtro_filas=processor.filtro_consultas_ges(), esquema='consultas'
+    )
+
+    assert en_bloques['RUNPaciente'].tolist() == ['11111111-1', '22222222-k', '11111111-1']
+    assert 'Observacion' not in en_bloques.columns
+    assert en_bloques.equals(completo)
+
+
+def test_farmacia_en_bloques_conserva_casos_revision(tmp_path):
+    processor = create_test_processor()
+    farmacia = pd.DataFrame({
+        'RutPaciente': [11111111, 33333333, 44444444, 22222222, 55555555],
+        'DVPaciente': ['1', '3', '4', 'k', '5'],
+        'Farmaco_Desc': ['SALBUTAMOL', 'PARACETAMOL', 'Morfina 10mg', 'TIOTROPIO', 'TOBRAMICINA'],
+        'FechaDespacho': ['01-03-2025'] * 5,
+    })
+    archivo = write_csv(tmp_path / 'reporte_farmacia.csv', farmacia)
+
+    en_bloques = processor.load_csv_safely(archivo, chunksize=2, filtro_filas=processor.filtro_farmacia_ges())
+
+    # Pacientes GES más no-GES con medicamentos especiales (casos de revisión)
+    assert en_bloques['RutPaciente'].tolist() == [11111111, 44444444, 22222222, 55555555]
+
+
+def test_esquema_tipos_y_columnas_faltantes(tmp_path, capsys):
+    processor = create_test_processor()
+    farmacia = pd.DataFrame({
+        'RutPaciente': [11111111, 22222222],
+        'DVPaciente': ['1', 'K'],
+        'Farmaco_Desc': ['SALBUTAMOL', 'TIOTROPIO'],
+        'FechaDespacho': ['01-03-2025', '02-03-2025'],
+        'LocalSolicitante': ['INT-07-102-0', 'INT-07-102-0'],
+        'Observacion': ['x', 'y'],
+    })
+    archivo = write_csv(tmp_path / 'reporte_farmacia.csv', farmacia)
+
+    df = processor.load_csv_safely(archivo, esquema='farmacia')
+    assert list(df.columns) == ['RutPaciente', 'DVPaciente', 'Farmaco_Desc', 'FechaDespacho', 'LocalSolicitante']
+    assert df['RutPaciente'].dtype == 'int64'
+    assert df['LocalSolicitante'].dtype == 'category'
+
+    sin_fecha = write_csv(tmp_path / 'farmacia_incompleta.csv', farmacia.drop(columns=['FechaDespacho']))
+    assert processor.load_csv_safely(sin_fecha, esquema='farmacia') is None
+    assert "['FechaDespacho']" in capsys.readouterr().out
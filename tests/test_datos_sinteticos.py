@@ -0,0 +1,38 @@
+import os
+import sys
+
+import pandas as pd
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(RAIZ, 'scripts'))
+sys.path.insert(0, os.path.join(RAIZ, 'tools'))
+from generar_datos_sinteticos import digitos_verificadores, generar_datos
+from ges_data_processor import GESDataProcessor
+
+
+def test_digito_verificador():
+    assert list(digitos_verificadores([12345678, 11111111, 6000000, 30686957])) == ['5', '1', 'K', '4']
+
+
+def test_datos_sinteticos_reproducibles_y_cargables(tmp_path):
+    generados = generar_datos(str(tmp_path / 'a'), filas=2000, semilla=7)
+    generar_datos(str(tmp_path / 'b'), filas=2000, semilla=7)
+
+    consultas = [pd.read_csv(tmp_path / d / 'inputs' / 'reporte_consulta_ago.csv', sep=';', encoding='latin-1')
+                 for d in ('a', 'b')]
+    assert consultas[0].equals(consultas[1])
+    assert len(consultas[0]) == 2000
+    assert {os.path.basename(archivo) for archivo in generados} >= {
+        'RUT_pob_ges.xlsx', 'reporte_farmacia_ago.csv', 'recetas_asma_ago.xlsx', 'recetas_fq_ago.xls',
+        'severidad_FQ.xlsx', 'clasificacion_paliativos.xlsx',
+    }
+
+    processor = GESDataProcessor(base_path=str(tmp_path / 'a'), auto_select_files=True)
+    processor.cache_entradas.habilitada = False
+    assert processor.load_data()
+    assert len(processor.selected_files['recetas_ges']) == 2
+    assert len(processor.recetas_ges_df) == 100
+    # Fuera de la población solo quedan los medicamentos especiales (casos de revisión)
+    externos = processor.farmacia_df[~processor.farmacia_df['RUT_Combined'].isin(set(processor.ges_df['RUT']))]
+    assert len(externos) < len(processor.farmacia_df)
+    assert externos['Farmaco_Desc'].str.contains('MORFINA|FENTANILO|TRAMADOL|SALBUTAMOL|BUDESONIDA|TOBRAMICINA|COLISTINA').all()
@@ -0,0 +1,120 @@
+import os
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(RAIZ, 'scripts'))
+sys.path.insert(0, os.path.join(RAIZ, 'tools'))
+from generar_datos_sinteticos import generar_datos
+from ges_cache import funciones_alcanzables
+from ges_data_processor import GESDataProcessor
+from trazadora_processor import TrazadoraProcessor
+
+
+def create_test_processor(base, estado=True):
+    processor = GESDataProcessor(base_path=base, auto_select_files=True)
+    processor.estado_registros.habilitado = estado
+    processor.salida_canonica = []
+    assert processor.load_data()
+    return processor
+
+
+def procesar(processor, consultas, farmacia, salida):
+    return (processor.procesar_consultas_para_carga(consultas, os.path.join(salida, 'CONS.xlsx')),
+            processor.procesar_medicamentos_para_carga(farmacia, os.path.join(salida, 'MEDS.xlsx')))
+
+
+def resumen_eventos(salida):
+    """Líneas de los resúmenes de eventos impresos, por título"""
+    resumenes, actual = {}, None
+    for linea in salida.splitlines():
+        if linea.startswith('📊 Resumen de eventos'):
+            actual = resumenes.setdefault(linea, [])
+        elif actual is not None and linea.startswith('   '):
+            actual.append(linea)
+        else:
+            actual = None
+    return resumenes
+
+
+def test_solo_filas_nuevas_con_salida_igual(tmp_path, capsys):
+    base = str(tmp_path / 'base')
+    generar_datos(base, filas=3000, semilla=11)
+    completo = create_test_processor(base, estado=False)
+    esperado = procesar(completo, completo.consulta_df, completo.farmacia_df, str(tmp_path / 'esperado'))
+
+    # Primera corrida con parte del mes: queda en el estado
+    processor = create_test_processor(base)
+    procesar(processor, processor.consulta_df.iloc[:1000].copy(), processor.farmacia_df.iloc[:1500].copy(), str(tmp_path / 'parcial'))
+    assert processor.estado_registros.contar('medicamentos') > 0
+    capsys.readouterr()
+
+    # Corrida con el mes completo: reutiliza lo guardado y clasifica el resto
+    processor = create_test_processor(base)
+    farmacia = processor.farmacia_df.copy()
+    farmacia.loc[farmacia.index[0], 'CantidadDespachada'] = 999  # fila modificada → se reclasifica
+    capsys.readouterr()
+    completo.procesar_consultas_para_carga(completo.consulta_df, str(tmp_path / 'esperado' / 'CONS_MOD.xlsx'))
+    esperado_modificado = completo.procesar_medicamentos_para_carga(farmacia, str(tmp_path / 'esperado' / 'MOD.xlsx'))
+    eventos_esperados = resumen_eventos(capsys.readouterr().out)
+    consultas, medicamentos = procesar(processor, processor.consulta_df, farmacia, str(tmp_path / 'final'))
+
+    assert consultas.equals(esperado[0])
+    assert medicamentos.equals(esperado_modificado)
+    salida = capsys.readouterr().out
+    # Los conteos de eventos (trazadoras, severidad FQ...) incluyen las filas reutilizadas
+    assert any('Trazadora ASMA' in linea for lineas in eventos_esperados.values() for linea in lineas)
+    assert resumen_eventos(salida) == eventos_esperados
+    reutilizadas = [linea for linea in salida.splitlines() if linea.startswith('♻️ Estado de')]
+    assert len(reutilizadas) == 2
+    assert all(' 0 clasificadas' not in linea and ' 0 filas reutilizadas' not in linea for linea in reutilizadas)
+
+
+def test_estado_se_descarta_si_cambia_la_poblacion(tmp_path, capsys):
+    base = str(tmp_path / 'base')
+    generar_datos(base, filas=1000, semilla=3)
+    processor = create_test_processor(base)
+    procesar(processor, processor.consulta_df, processor.farmacia_df, str(tmp_path / 'a'))
+
+    processor = create_test_processor(base)
+    processor.ges_df = processor.ges_df.iloc[1:]
+    processor.build_ges_index()
+    capsys.readouterr()
+    procesar(processor, processor.consulta_df, processor.farmacia_df, str(tmp_path / 'b'))
+    assert 'cambió el contexto de clasificación' in capsys.readouterr().out
+
+
+def test_firma_solo_cambia_con_la_configuracion_de_clasificacion(tmp_path, monkeypatch):
+    import ges_data_processor
+    base = str(tmp_path / 'base')
+    generar_datos(base, filas=300, semilla=4)
+    processor = create_test_processor(base)
+    firma = processor._firma_clasificacion(processor.farmacia_df)
+
+    # Ajustes que no cambian la clasificación conservan el estado
+    monkeypatch.setattr(ges_data_processor, 'SALIDA_CANONICA', ['csv'], raising=False)
+    monkeypatch.setattr(ges_data_processor, 'LOG_NIVEL', 'DEBUG', raising=False)
+    assert processor._firma_clasificacion(processor.farmacia_df) == firma
+
+    monkeypatch.setattr(ges_data_processor, 'TRAZADORAS_FIBROSIS_SEVERIDAD', {'grave': '0000000'})
+    assert processor._firma_clasificacion(processor.farmacia_df) != firma
+
+    # Un cambio en el código de las trazadoras también descarta el estado
+    monkeypatch.undo()
+    monkeypatch.setattr(ges_data_processor, '_FIRMA_CODIGO_CLASIFICACION', None)
+    monkeypatch.setattr(TrazadoraProcessor, '_determinar_trazadora_asma_medicamento', lambda self, *args: None)
+    assert processor._firma_clasificacion(processor.farmacia_df) != firma
+
+
+def test_firma_de_codigo_cubre_todo_lo_que_llama_la_clasificacion():
+    import ges_data_processor
+    import trazadora_processor
+    import trazadora_rules
+    funciones = ges_data_processor.funciones_codigo_clasificacion()
+    nombres = {funcion.__name__ for funcion in funciones}
+
+    assert {'_resolver_trazadoras_paciente', 'determinar_codigos_trazadora_medicamentos',
+            'determinar_trazadora_consulta', '_determinar_trazadora_fibrosis_medicamento'} <= nombres
+    for modulo, clase in ((ges_data_processor, GESDataProcessor), (trazadora_processor, TrazadoraProcessor),
+                          (trazadora_rules, trazadora_rules.TrazadoraRuleEngine)):
+        propias = [funcion for funcion in funciones if funcion.__module__ == modulo.__name__]
+        assert funciones_alcanzables(propias, modulo, clase) <= nombres
@@ -0,0 +1,54 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+from ges_data_processor import GESDataProcessor
+from ges_excel import escribir_xlsx
+
+
+def create_test_df():
+    return pd.DataFrame({
+        'RUT': ['1-9', None, '3-K', '4-4', '5-5'],
+        'CANTIDAD': [1, 2, 3, 4, 5],
+        'DOSIS': [1.5, np.nan, np.inf, -np.inf, 0.0],
+        'ACTIVO': [True, False, True, True, False],
+        'FECHA': pd.to_datetime(['2025-08-01 10:30:00', None, '2025-08-03 00:00:00', '2025-08-04 00:00:00', '2025-08-05 00:00:00']),
+        'DIA': [pd.Timestamp('2025-08-01').date(), None, pd.Timestamp('2025-08-03').date(), None, None],
+        'MIXTO': ['a', 7, 2.5, None, pd.Timestamp('2025-01-01')],
+        'ESPECIALIDAD': pd.Categorical(['07-102-0', None, '07-116-0', '07-102-0', '07-102-0']),
+    })
+
+
+def celdas(ruta):
+    hoja = load_workbook(ruta).active
+    return hoja.title, [[(c.value, c.number_format, c.font.b, c.border.top.style, c.alignment.horizontal)
+                         for c in fila] for fila in hoja.iter_rows()]
+
+
+def test_escritura_igual_a_pandas(tmp_path):
+    df = create_test_df()
+    df.to_excel(tmp_path / 'pandas.xlsx', index=False, engine='openpyxl')
+    escribir_xlsx(df, str(tmp_path / 'rapido.xlsx'))
+    assert celdas(tmp_path / 'rapido.xlsx') == celdas(tmp_path / 'pandas.xlsx')
+
+
+def test_partes_en_paralelo(tmp_path, capsys):
+    processor = GESDataProcessor(base_path=str(tmp_path), auto_select_files=True)
+    processor.salida_trabajadores = 2
+    df = pd.concat([create_test_df()] * 3, ignore_index=True)
+    processor.save_df_in_chunks(df, str(tmp_path / 'CARGA.xlsx'), chunk_size=4)
+
+    partes = ['CARGA.xlsx'] + [f'CARGA_part{i}.xlsx' for i in range(2, 5)]
+    for numero, parte in enumerate(partes):
+        esperado = tmp_path / f'esperado_{numero}.xlsx'
+        df.iloc[numero * 4:(numero + 1) * 4].to_excel(esperado, index=False, engine='openpyxl')
+        assert celdas(tmp_path / parte) == celdas(esperado)
+
+    # Mensajes en el orden de las partes
+    salida = capsys.readouterr().out
+    assert [salida.index(f'Parte {i} guardada') for i in range(1, 5)] == sorted(
+        salida.index(f'Parte {i} guardada') for i in range(1, 5))
@@ -0,0 +1,47 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+from ges_data_processor import GESDataProcessor, parse_dates_series
+
+
+def test_parse_dates_series_formatos_y_conteo():
+    fechas = pd.Series(['01-03-2025', '2025-03-02', '03/03/2025', '2025-03-04 10:30:00', 'nan', 'sin fecha', np.nan],
+                       index=[10, 11, 12, 13, 14, 15, 16])
+
+    resultado, conteo = parse_dates_series(fechas)
+
+    assert list(resultado.index) == [10, 11, 12, 13, 14, 15, 16]
+    assert resultado.iloc[:4].tolist() == [
+        pd.Timestamp('2025-03-01'), pd.Timestamp('2025-03-02'),
+        pd.Timestamp('2025-03-03'), pd.Timestamp('2025-03-04 10:30:00'),
+    ]
+    assert pd.isna(resultado.iloc[4])
+    assert conteo == {'sin_fecha': 1, 'nula': 1, '%d-%m-%Y': 1, '%Y-%m-%d': 1, '%d/%m/%Y': 1,
+                      '%d-%m-%Y %H:%M': 0, '%d/%m/%Y %H:%M': 0, 'inferida': 1, 'no_reconocida': 1}
+
+
+def test_fecha_con_hora_dia_primero():
+    fechas = ['05-03-2025 10:00', '25-03-2025 10:00', '05/03/2025 08:15', '5.3.2025', '2025-03-04T10:30']
+
+    resultado, conteo = parse_dates_series(fechas)
+
+    assert resultado.tolist() == [
+        pd.Timestamp('2025-03-05 10:00'), pd.Timestamp('2025-03-25 10:00'), pd.Timestamp('2025-03-05 08:15'),
+        pd.Timestamp('2025-03-05'), pd.Timestamp('2025-03-04 10:30'),
+    ]
+    assert conteo['%d-%m-%Y %H:%M'] == 2 and conteo['%d/%m/%Y %H:%M'] == 1 and conteo['inferida'] == 2
+
+
+def test_formato_escalar_delega_en_serie():
+    processor = GESDataProcessor(auto_select_files=False)
+
+    assert processor.format_date_for_excel('05/03/2025') == pd.Timestamp('2025-03-05')
+    assert processor.format_date('2025-03-06') == '06-03-2025'
+
+    registros = processor.format_dates_for_excel(['07-03-2025', '2025-03-08'], etiqueta='consultas')
+    assert registros.dt.day.tolist() == [7, 8]
+    assert processor.estadisticas_fechas['consultas']['%Y-%m-%d'] == 1
@@ -0,0 +1,63 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+from ges_data_processor import GESDataProcessor, detectar_formato_planilla, leer_tabla_datos_html
+
+
+def create_test_html(path, tabla_datos):
+    metadata = '<table><tr><td>Reporte</td><td>Recetas GES</td></tr></table>'
+    path.write_text(f'<html><head><meta charset="utf-8"></head><body>{metadata}{tabla_datos}</body></html>',
+                    encoding='utf-8')
+    return str(path)
+
+
+def test_detectar_formato_por_contenido(tmp_path):
+    xlsx = tmp_path / 'recetas.xls'
+    pd.DataFrame({'RUT': [1]}).to_excel(xlsx, index=False, engine='openpyxl')
+    ole2 = tmp_path / 'recetas_ole2.xlsx'
+    ole2.write_bytes(b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1' + b'\x00' * 64)
+    html = create_test_html(tmp_path / 'recetas_html.xls', '<table><tr><th>RUT</th></tr></table>')
+    otro = tmp_path / 'recetas.txt'
+    otro.write_text('RUT;DV\n1;9\n')
+
+    # La extensión no importa: manda el contenido
+    assert detectar_formato_planilla(str(xlsx)) == 'xlsx'
+    assert detectar_formato_planilla(str(ole2)) == 'xls'
+    assert detectar_formato_planilla(html) == 'html'
+    assert detectar_formato_planilla(str(otro)) is None
+
+
+def test_tabla_html_igual_a_read_html(tmp_path):
+    tablas = {
+        'encabezado_th': '<table><thead><tr><th>RUT</th><th>MEDICAMENTO</th><th>CANT.</th></tr></thead>'
+                         '<tbody><tr><td>11111111</td><td>SALBU<br>TAMOL</td><td>1,200</td></tr>'
+                         '<tr><td>22222222</td><td>TIOTROPIO</td><td></td></tr></tbody></table>',
+        'sin_encabezado': '<table><tr><td>RUT</td><td>DÍGITO</td></tr><tr><td>11111111</td><td>k</td></tr></table>',
+        'colspan': '<table><tr><th colspan="2">RUT</th></tr><tr><td>1</td><td>2</td></tr></table>',
+    }
+    for nombre, tabla in tablas.items():
+        archivo = create_test_html(tmp_path / f'{nombre}.xls', tabla)
+        esperado = pd.read_html(archivo)[1]
+        if all(isinstance(col, int) for col in esperado.columns):
+            esperado.columns = esperado.iloc[0].tolist()
+            esperado = esperado[1:].reset_index(drop=True)
+
+        resultado = leer_tabla_datos_html(archivo)
+        assert resultado.equals(esperado), nombre
+        assert list(resultado.columns) == list(esperado.columns), nombre
+
+
+def test_recetas_html_disfrazado_de_xls(tmp_path):
+    archivo = create_test_html(
+        tmp_path / 'recetas_fq.xls',
+        '<table><tr><th>FECHA</th><th>RUT</th><th>DÍGITO</th><th>MEDICAMENTO</th></tr>'
+        '<tr><td>01-03-2025</td><td>22222222</td><td>k</td><td>TOBRAMICINA</td></tr></table>',
+    )
+    processor = GESDataProcessor(base_path=str(tmp_path), auto_select_files=False)
+
+    df = processor.leer_archivo_recetas(archivo)
+    assert df['RUT_Combined'].tolist() == ['22222222-K']
+    assert df['Farmaco_Desc'].tolist() == ['TOBRAMICINA']
@@ -0,0 +1,81 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+from ges_cache import CacheEntradas, firma_codigo, funciones_alcanzables
+
+
+def create_test_input(path, ruts):
+    pd.DataFrame({'RUT': ruts, 'Ges': ['ASMA'] * len(ruts)}).to_csv(path, sep=';', index=False)
+    return str(path)
+
+
+def test_cache_reutiliza_e_invalida_por_contenido(tmp_path):
+    cache = CacheEntradas(str(tmp_path / '.cache'))
+    archivo = create_test_input(tmp_path / 'poblacion.csv', ['11111111-1'])
+    lecturas = []
+
+    def cargar():
+        lecturas.append(archivo)
+        return pd.read_csv(archivo, sep=';')
+
+    primera = cache.obtener('poblacion', [archivo], cargar)
+    segunda = cache.obtener('poblacion', [archivo], cargar)
+    assert len(lecturas) == 1
+    assert segunda.equals(primera)
+
+    # Parámetros de carga distintos → otra entrada
+    cache.obtener('poblacion', [archivo], cargar, {'filtro_ges': True})
+    assert len(lecturas) == 2
+
+    # Contenido modificado → se vuelve a leer y se reemplaza la entrada anterior
+    create_test_input(tmp_path / 'poblacion.csv', ['11111111-1', '22222222-2'])
+    tercera = cache.obtener('poblacion', [archivo], cargar)
+    assert len(lecturas) == 3
+    assert len(tercera) == 2
+    assert len(os.listdir(tmp_path / '.cache')) == 1
+
+
+def test_cache_deshabilitada_no_escribe(tmp_path):
+    cache = CacheEntradas(str(tmp_path / '.cache'), habilitada=False)
+    archivo = create_test_input(tmp_path / 'poblacion.csv', ['11111111-1'])
+
+    df = cache.obtener('poblacion', [archivo], lambda: pd.read_csv(archivo, sep=';'))
+    assert len(df) == 1
+    assert not os.path.exists(tmp_path / '.cache')
+
+
+def test_cache_se_invalida_si_cambia_el_codigo(tmp_path):
+    archivo = create_test_input(tmp_path / 'poblacion.csv', ['11111111-1'])
+    lecturas = []
+
+    def cargar():
+        lecturas.append(archivo)
+        return pd.read_csv(archivo, sep=';')
+
+    def normalizar_v1(df):
+        return df
+
+    def normalizar_v2(df):
+        return df.assign(RUT=df['RUT'].str.upper())
+
+    assert firma_codigo(normalizar_v1) != firma_codigo(normalizar_v2)
+    CacheEntradas(str(tmp_path / '.cache'), codigo=firma_codigo(normalizar_v1)).obtener('poblacion', [archivo], cargar)
+    CacheEntradas(str(tmp_path / '.cache'), codigo=firma_codigo(normalizar_v1)).obtener('poblacion', [archivo], cargar)
+    assert len(lecturas) == 1
+
+    cache = CacheEntradas(str(tmp_path / '.cache'), codigo=firma_codigo(normalizar_v2))
+    cache.obtener('poblacion', [archivo], cargar)
+    assert len(lecturas) == 2
+    assert cache.fallos == 1
+
+
+def test_firma_de_entradas_cubre_todo_lo_que_llaman_los_cargadores():
+    import ges_data_processor
+    funciones = ges_data_processor.funciones_codigo_entradas()
+    alcanzables = funciones_alcanzables(funciones, ges_data_processor, ges_data_processor.GESDataProcessor)
+
+    assert {'build_ges_index', '_get_ges_index', 'format_rut_series'} <= alcanzables
+    assert alcanzables - {funcion.__name__ for funcion in funciones} == set()
@@ -0,0 +1,54 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+from ges_data_processor import GESDataProcessor
+
+
+def create_test_ges_population():
+    """Población GES con RUT completo, RUT numérico y columna DV"""
+    return pd.DataFrame({
+        'RUT': ['12345678-1', 87654321, '11111111-K'],
+        'DV': ['1', 'k', 'K'],
+        'Ges': ['ASMA', 'EPOC', 'Fibrosis']
+    })
+
+
+def test_get_ges_condition_usa_indice():
+    processor = GESDataProcessor(auto_select_files=False)
+    processor.ges_df = create_test_ges_population()
+
+    assert processor.get_ges_condition('12345678-1') == 'ASMA'
+    assert processor.get_ges_condition('12345678') == 'ASMA'
+    assert processor.get_ges_condition('87654321-K') == 'EPOC'
+    assert processor.get_ges_condition('87654321') == 'EPOC'
+    assert processor.get_ges_condition('99999999-9') is None
+
+    # Reemplazar la población reconstruye el índice
+    processor.ges_df = pd.DataFrame({'RUT': ['99999999-9'], 'Ges': ['Paliativos']})
+    assert processor.get_ges_condition('99999999-9') == 'Paliativos'
+    assert processor.get_ges_condition('12345678-1') is None
+
+
+def test_get_ges_conditions_vectorizado():
+    processor = GESDataProcessor(auto_select_files=False)
+    processor.ges_df = create_test_ges_population()
+
+    ruts = pd.Series(['12345678-1', '87654321-K', '11111111-K', '22222222-2', '11111111'], index=[10, 11, 12, 13, 14])
+    condiciones = processor.get_ges_conditions(ruts)
+
+    assert list(condiciones.index) == [10, 11, 12, 13, 14]
+    assert condiciones.tolist() == ['ASMA', 'EPOC', 'Fibrosis', None, 'Fibrosis']
+    assert condiciones.tolist() == [processor.get_ges_condition(rut) for rut in ruts]
+
+
+def test_esta_en_poblacion_ges():
+    processor = GESDataProcessor(auto_select_files=False)
+    processor.ges_df = create_test_ges_population()
+
+    assert processor.esta_en_poblacion_ges('12345678-1')
+    assert processor.esta_en_poblacion_ges(87654321)
+    assert not processor.esta_en_poblacion_ges(12345678)
+    assert not processor.esta_en_poblacion_ges('sin rut')
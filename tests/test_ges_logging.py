@@ -0,0 +1,44 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+from ges_data_processor import GESDataProcessor
+from ges_logging import configurar_logging
+
+
+def create_test_registros():
+    return pd.DataFrame({
+        'RUT': ['11111111', '11111111', '11111111', '22222222'],
+        'PRESTACION': ['3902001', '3902001', '3902001', '3801002'],
+        'FECHA': ['01/03/2025', '05/03/2025', '07/03/2025', '01/03/2025'],
+        'RUT_Combined': ['11111111-1', '11111111-1', '11111111-1', '22222222-2'],
+    })
+
+
+def test_detalle_por_fila_solo_en_debug_y_resumen_agregado(tmp_path, capsys):
+    processor = GESDataProcessor(base_path=str(tmp_path), auto_select_files=False)
+    archivo_log = tmp_path / 'logs' / 'ges_detalle.log'
+    try:
+        # Por defecto: sin mensajes por fila, solo el resumen de conteos
+        configurar_logging()
+        processor.deduplicar_medicamentos(create_test_registros())
+        processor.determinar_severidad_fq('33333333-3')
+        processor.eventos.emitir_resumen()
+        salida = capsys.readouterr().out
+        assert 'RUT 11111111' not in salida and 'FQ SIN BD' not in salida
+        assert '   Medicamentos duplicados eliminados (RUT+PRESTACIÓN): 2' in salida
+        assert '   RUT con medicamentos duplicados: 1' in salida
+        assert '   FQ sin base de severidad (LEVE por defecto): 1' in salida
+
+        # Consola en WARNING con archivo rotativo: el detalle va solo al archivo
+        configurar_logging('WARNING', archivo=str(archivo_log))
+        processor.deduplicar_medicamentos(create_test_registros())
+        processor.eventos.emitir_resumen()
+        assert capsys.readouterr().out == ''
+        detalle = archivo_log.read_text(encoding='utf-8')
+        assert 'RUT 11111111: 3 → 1 medicamentos' in detalle
+        assert 'Medicamentos duplicados eliminados (RUT+PRESTACIÓN): 2' in detalle
+    finally:
+        configurar_logging()
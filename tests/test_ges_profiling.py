@@ -0,0 +1,53 @@
+import json
+import os
+import pstats
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+from ges_profiling import PerfilEjecucion
+
+
+def test_etapas_medidas_y_manifiesto(tmp_path):
+    medicion = PerfilEjecucion(perfilar=['medicamentos'], directorio_perfiles=str(tmp_path))
+
+    with medicion.etapa('consultas', 10) as etapa:
+        etapa['filas_salida'] = 4
+    with medicion.etapa('medicamentos', 7) as etapa:
+        sorted(range(10000), key=lambda i: -i)
+        etapa['filas_salida'] = 3
+    with pytest.raises(ValueError):
+        with medicion.etapa('cruce'):
+            raise ValueError('sin población')
+
+    ruta = medicion.guardar_manifiesto(str(tmp_path), {'archivos_entrada': {'consultas': 'reporte_consulta.csv'}})
+    with open(ruta, encoding='utf-8') as f:
+        manifiesto = json.load(f)
+
+    etapas = {etapa['etapa']: etapa for etapa in manifiesto['etapas']}
+    assert list(etapas) == ['consultas', 'medicamentos', 'cruce']
+    assert (etapas['consultas']['filas_entrada'], etapas['consultas']['filas_salida']) == (10, 4)
+    assert etapas['consultas']['estado'] == 'ok'
+    assert etapas['cruce']['estado'] == 'error: sin población'
+    assert all(etapa['segundos'] >= 0 and etapa['cpu_segundos'] >= 0 for etapa in manifiesto['etapas'])
+    assert manifiesto['archivos_entrada'] == {'consultas': 'reporte_consulta.csv'}
+
+    # Solo la etapa indicada queda perfilada
+    assert 'perfil' not in etapas['consultas']
+    estadisticas = pstats.Stats(etapas['medicamentos']['perfil'])
+    assert any('sorted' in funcion[2] for funcion in estadisticas.stats)
+
+
+def test_memoria_pico_es_de_cada_etapa():
+    medicion = PerfilEjecucion()
+    with medicion.etapa('grande'):
+        bloque = b'x' * (64 * 1024 * 1024)
+        del bloque
+    with medicion.etapa('chica'):
+        sum(range(1000))
+
+    grande, chica = medicion.etapas
+    assert grande['medicion_memoria'] in ('rss', 'tracemalloc')
+    # El pico de la etapa anterior no se arrastra a la siguiente
+    assert grande['memoria_pico_mb'] - chica['memoria_pico_mb'] > 32
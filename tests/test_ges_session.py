@@ -0,0 +1,60 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+from ges_data_processor import GESDataProcessor
+from ges_session import SesionGES
+
+
+def create_test_inputs(base):
+    inputs = base / 'inputs'
+    inputs.mkdir()
+    pd.DataFrame({'RUT': ['11111111-1'], 'Ges': ['ASMA']}).to_excel(inputs / 'RUT_pob_ges.xlsx', index=False)
+    pd.DataFrame({
+        'RUNPaciente': ['11111111-1'], 'EstadoCita_Desc': ['Atendido'],
+        'EspecialidadLocal': ['07-102-0'], 'FechaCita': ['01-03-2025'],
+    }).to_csv(inputs / 'reporte_consulta_mar.csv', sep=';', index=False, encoding='latin-1')
+    write_farmacia(inputs / 'reporte_farmacia_mar.csv', ['SALBUTAMOL'])
+
+
+def write_farmacia(path, farmacos):
+    pd.DataFrame({
+        'RutPaciente': [11111111] * len(farmacos), 'DVPaciente': ['1'] * len(farmacos),
+        'Farmaco_Desc': farmacos, 'FechaDespacho': ['01-03-2025'] * len(farmacos),
+    }).to_csv(path, sep=';', index=False, encoding='latin-1')
+
+
+def create_test_session(base):
+    processor = GESDataProcessor(base_path=str(base), auto_select_files=True)
+    sesion = SesionGES(processor)
+    cargas = []
+    for fuente, cargar in list(sesion.cargadores.items()):
+        sesion.cargadores[fuente] = lambda fuente=fuente, cargar=cargar: cargas.append(fuente) or cargar()
+    return sesion, cargas
+
+
+def test_sesion_recarga_solo_fuentes_modificadas(tmp_path):
+    create_test_inputs(tmp_path)
+    sesion, cargas = create_test_session(tmp_path)
+
+    assert sesion.preparar('consultas')
+    assert cargas == ['poblacion_ges', 'consultas', 'clasificacion_paliativos', 'severidad_fq']
+    assert len(sesion.processor.consulta_df) == 1
+
+    # Otra acción sobre las mismas entradas: solo se carga lo que falta
+    cargas.clear()
+    assert sesion.preparar('completo')
+    assert cargas == ['farmacia', 'medicamentos_ges', 'recetas_ges']
+    cargas.clear()
+    assert sesion.preparar('completo')
+    assert cargas == []
+
+    # Cambia el archivo de farmacia → solo se recarga farmacia
+    archivo = tmp_path / 'inputs' / 'reporte_farmacia_mar.csv'
+    write_farmacia(archivo, ['SALBUTAMOL', 'BUDESONIDA'])
+    os.utime(archivo, ns=(0, os.stat(archivo).st_mtime_ns + 10**9))
+    assert sesion.preparar('completo')
+    assert cargas == ['farmacia']
+    assert len(sesion.processor.farmacia_df) == 2
@@ -0,0 +1,77 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+from ges_data_processor import GESDataProcessor
+
+
+def create_test_processor():
+    processor = GESDataProcessor(auto_select_files=False)
+    processor.ges_df = pd.DataFrame({
+        'RUT': ['11111111-1', 11111111, '22222222-2', 22222222, '33333333-3'],
+        'Ges': ['Paliativos', 'Paliativos', 'Paliativos', 'Paliativos', 'Fibrosis'],
+    })
+    processor.severidad_fq_df = pd.DataFrame({
+        'RUT': ['33333333-3', 44444444, '55555555-5', '33333333-3'],
+        'Severidad': ['SEVERO', 'moderada', None, 'LEVE'],
+    })
+    processor.clasificacion_paliativos_df = pd.DataFrame({
+        'RUT': [11111111, 22222222, 11111111],
+        'condicion': ['CP-NO', 'I', 'I'],
+    })
+    processor.trazadora_processor.indexar_severidad_fq(processor.severidad_fq_df)
+    processor.trazadora_processor.indexar_clasificacion_paliativos(processor.clasificacion_paliativos_df)
+    return processor
+
+
+def test_severidad_fq_desde_indice():
+    processor = create_test_processor()
+
+    assert processor.determinar_severidad_fq('33333333-3') == 'grave'  # primera fila gana
+    assert processor.determinar_severidad_fq(44444444) == 'moderada'
+    assert processor.determinar_severidad_fq('55555555') == 'leve'  # campo vacío
+    assert processor.determinar_severidad_fq('99999999') == 'leve'  # no encontrado
+
+    tproc = processor.trazadora_processor
+    assert tproc._obtener_severidad_fq('33333333-3') == 'grave'
+    assert tproc._determinar_trazadora_fibrosis_consulta('44444444-4') == '3004502'
+    assert tproc._determinar_trazadora_fibrosis_consulta('99999999-9') == '3004501'
+
+
+def test_tipo_paliativo_desde_indice():
+    processor = create_test_processor()
+
+    assert processor.determinar_tipo_paliativo('11111111-1') == 'no_progresivo'
+    assert processor.determinar_tipo_paliativo(22222222) == 'progresivo'
+    assert processor.determinar_tipo_paliativo('99999999-9') == 'no_ges'
+
+    tproc = processor.trazadora_processor
+    assert tproc._determinar_trazadora_paliativos_consulta('11111111-1') == '3002123'
+    assert tproc._determinar_trazadora_paliativos_medicamento('22222222-2') == '3002023'
+
+
+def test_indice_se_reconstruye_al_reemplazar_tabla():
+    processor = create_test_processor()
+    processor.severidad_fq_df = pd.DataFrame({'RUT': [44444444], 'Severidad': ['GRAVE']})
+
+    assert processor.determinar_severidad_fq(44444444) == 'grave'
+    assert processor.determinar_severidad_fq('33333333-3') == 'leve'
+
+
+def test_trazadora_carga_sus_archivos_una_vez(tmp_path):
+    from trazadora_processor import TrazadoraProcessor
+    tproc = TrazadoraProcessor(str(tmp_path))
+
+    assert tproc._get_severidad_fq_map() == {}  # sin archivo: la carga fallida se recuerda
+    (tmp_path / 'inputs').mkdir()
+    pd.DataFrame({'RUT': ['55555555-5'], 'Severidad': ['GRAVE']}).to_excel(tmp_path / 'inputs' / 'severidad_FQ.xlsx', index=False)
+    assert tproc._get_severidad_fq_map() == {}
+
+    tproc.reiniciar_indices_rut()
+    assert tproc._get_severidad_fq_map() == {'55555555': 'GRAVE'}
+
+    # Una tabla asignada directamente se usa en vez del archivo
+    tproc.severidad_fq_df = pd.DataFrame({'RUT': [66666666], 'Severidad': ['LEVE']})
+    assert tproc._get_severidad_fq_map() == {'66666666': 'LEVE'}
@@ -0,0 +1,78 @@
+import os
+import shutil
+import sys
+
+import pandas as pd
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(RAIZ, 'scripts'))
+sys.path.insert(0, os.path.join(RAIZ, 'tools'))
+from generar_datos_sinteticos import generar_datos
+from ges_data_processor import GESDataProcessor
+from ges_lote import descubrir_meses, mes_de_archivo, procesar_meses
+
+
+def create_test_inputs(base):
+    """Datos sintéticos de agosto y los mismos archivos de consultas y farmacia como septiembre"""
+    generar_datos(base, filas=600, semilla=5, mes=8)
+    inputs = os.path.join(base, 'inputs')
+    for nombre in ('reporte_consulta_ago.csv', 'reporte_farmacia_ago.csv'):
+        shutil.copy(os.path.join(inputs, nombre), os.path.join(inputs, nombre.replace('_ago', '_sep')))
+    return inputs
+
+
+def test_mes_de_archivo():
+    assert mes_de_archivo('reporte_consulta_ago.csv') == 'ago'
+    assert mes_de_archivo('consultas_Septiembre2025.csv') == 'sep'
+    assert mes_de_archivo('recetas_asma_DIC.xlsx') == 'dic'
+    assert mes_de_archivo('reporte_consulta_sumario.csv') is None
+
+
+def test_descubrir_meses(tmp_path):
+    inputs = create_test_inputs(str(tmp_path / 'base'))
+    meses = descubrir_meses(inputs)
+
+    assert list(meses) == ['ago', 'sep']
+    assert os.path.basename(meses['sep']['consultas']) == 'reporte_consulta_sep.csv'
+    assert os.path.basename(meses['sep']['farmacia']) == 'reporte_farmacia_sep.csv'
+    assert meses['sep']['recetas_ges'] == []
+    assert [os.path.basename(r) for r in meses['ago']['recetas_ges']] == ['recetas_asma_ago.xlsx', 'recetas_fq_ago.xls']
+
+
+def test_setup_input_files_con_mes_no_usa_archivos_de_otro_mes(tmp_path):
+    create_test_inputs(str(tmp_path / 'base'))
+    processor = GESDataProcessor(base_path=str(tmp_path / 'base'))
+    processor.setup_input_files('sep')
+    assert os.path.basename(processor.selected_files['consultas']) == 'reporte_consulta_sep.csv'
+    assert 'recetas_ges' not in processor.selected_files
+
+    processor = GESDataProcessor(base_path=str(tmp_path / 'base'))
+    processor.setup_input_files('oct')
+    assert processor.selected_files == {}
+
+
+def test_lote_por_meses_igual_a_procesar_cada_mes(tmp_path):
+    base = str(tmp_path / 'base')
+    create_test_inputs(base)
+    resumen, carpeta = procesar_meses(base, procesos=2)
+
+    assert list(resumen['MES']) == ['ago', 'sep', 'TOTAL']
+    assert (resumen['ESTADO'] == 'ok').all()
+    assert os.path.exists(os.path.join(carpeta, 'RESUMEN_ANUAL.xlsx'))
+    ago, sep, total = (resumen.iloc[i] for i in range(3))
+    assert ago['FILAS_RECETAS'] > 0 and sep['FILAS_RECETAS'] == 0
+    assert ago['REGISTROS_CONSULTAS'] == sep['REGISTROS_CONSULTAS'] > 0
+    assert total['REGISTROS_CONSULTAS'] == 2 * ago['REGISTROS_CONSULTAS']
+    # Los mismos pacientes ambos meses: en el total se cuentan una vez
+    assert total['PACIENTES_CONSULTAS'] == ago['PACIENTES_CONSULTAS']
+
+    # Cada mes da lo mismo que cargar y procesar ese mes por separado
+    processor = GESDataProcessor(base_path=base)
+    assert processor.load_data('ago')
+    archivo = str(tmp_path / 'directo' / 'CARGA_CONSULTAS_GES_ago.xlsx')
+    os.makedirs(os.path.dirname(archivo))
+    processor.procesar_consultas_para_carga(processor.consulta_df, archivo)
+    directo = pd.read_csv(archivo.replace('.xlsx', '_COMPLETO.csv'))
+    lote = pd.read_csv(os.path.join(carpeta, 'ago', 'CARGA_CONSULTAS_GES_ago_COMPLETO.csv'))
+    pd.testing.assert_frame_equal(lote, directo)
+    assert os.path.exists(os.path.join(carpeta, 'sep', 'PROCESAMIENTO_sep.log'))
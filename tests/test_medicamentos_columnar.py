@@ -0,0 +1,77 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+from ges_data_processor import GESDataProcessor
+
+
+def create_test_processor():
+    processor = GESDataProcessor(auto_select_files=False)
+    processor.ges_df = pd.DataFrame({
+        'RUT': ['11111111-1', '22222222-2', '33333333-3', '44444444-4'],
+        'Ges': ['ASMA', 'Fibrosis', 'EPOC', 'Paliativos'],
+    })
+    processor.severidad_fq_df = pd.DataFrame({'RUT': [22222222], 'Severidad': ['GRAVE']})
+    processor.clasificacion_paliativos_df = pd.DataFrame({'RUT': [44444444], 'condicion': ['I']})
+    return processor
+
+
+def create_test_medicamentos():
+    return pd.DataFrame({
+        'RUT_Combined': ['11111111-1', '11111111-1', '11111111-1', '22222222-2', '22222222-2',
+                         '33333333-3', '44444444-4', '11111111-1'],
+        'RutPaciente': [11111111, 11111111, 11111111, 22222222, 22222222, 33333333, 44444444, 11111111],
+        'Farmaco_Desc': ['OMALIZUMAB 150MG', 'BUDESONIDA INH', 'PARACETAMOL', 'TOBRAMICINA NEB',
+                         'AZITROMICINA', 'TIOTROPIO', 'MORFINA', 'SALBUTAMOL'],
+        'FechaDespacho': ['01-03-2025', '2025-03-02', '03/03/2025', '04-03-2025',
+                          '', '06-03-2025', '07-03-2025', '08-03-2025'],
+        '_origen': 'farmacia',
+    })
+
+
+def test_trazadoras_columnar_igual_a_escalar():
+    processor = create_test_processor()
+    df = create_test_medicamentos()
+    condiciones = processor.get_ges_conditions(df['RUT_Combined'])
+
+    codigos = processor.determinar_codigos_trazadora_medicamentos(df, condiciones)
+
+    esperado = [
+        processor.determinar_codigo_trazadora_medicamento(medicamento, condition)
+        for medicamento, condition in zip(df.to_dict('records'), condiciones)
+    ]
+    assert codigos.tolist() == esperado
+    assert esperado[:5] == ['2508156', '3902002', '3902001', '3004004', '2505256']
+
+
+def test_clasificar_y_deduplicar_medicamentos():
+    processor = create_test_processor()
+    df = create_test_medicamentos()
+
+    registros, casos_sin_fecha = processor.clasificar_medicamentos_para_carga(df)
+    assert casos_sin_fecha['RUT_Combined'].tolist() == ['22222222-2']
+    # Paliativo sin RUT numérico en la población GES: se salta
+    assert registros['FECHA'].dt.day.tolist() == [1, 2, 3, 4, 6, 8]
+
+    finales = processor.deduplicar_medicamentos(registros)
+    assert 'RUT_Combined' not in finales.columns
+    # ASMA: PARACETAMOL y SALBUTAMOL comparten 3902001, se mantiene el más reciente
+    asma = finales[finales['RUT'] == 11111111]
+    assert asma['PRESTACION'].tolist() == ['3902001', '3902002', '2508156']
+    assert asma['FECHA'].dt.day.tolist() == [8, 2, 1]
+    assert finales['RUT'].tolist() == [11111111] * 3 + [22222222, 33333333]
+
+
+def test_casos_revision_no_ges():
+    processor = create_test_processor()
+    df = pd.DataFrame({
+        'RUT_Combined': ['55555555-5', '66666666-6', '77777777-7'],
+        'Farmaco_Desc': ['fentanilo parche', 'PARACETAMOL', 'Colistina'],
+        'FechaDespacho': ['01-03-2025', '02-03-2025', None],
+    })
+
+    casos = processor.identificar_casos_revision_medicamentos(df)
+    assert casos['RUT'].tolist() == ['55555555-5', '77777777-7']
+    assert casos['TIPO_MEDICAMENTO'].tolist() == ['PALIATIVO', 'FIBROSIS_QUISTICA']
@@ -0,0 +1,47 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+from ges_monthly_analyzer import GESAnalyzer
+
+
+def create_test_analyzer():
+    # Sin ventana Tk: solo los datos que usa la exportación
+    analyzer = GESAnalyzer.__new__(GESAnalyzer)
+    analyzer.ges_df = pd.DataFrame({
+        'RUT': ['1-1', '2-2', '3-3', '1-1'], 'Patologia': ['ASMA', 'EPOC', 'Fibrosis', 'EPOC'],
+    })
+    analyzer.consulta_df = pd.DataFrame({
+        'RUNPaciente': ['1-1', '1-1', '2-2', '9-9'],
+        'EstadoCita_Desc': ['Atendido', 'Llegó', 'Atendido', 'Atendido'],
+    })
+    analyzer.farmacia_df = pd.DataFrame({
+        'RUT_Combined': ['1-1', '3-3', '3-3'],
+        'EstadoActualDeFarmacia_Desc': ['Despachado', 'Despachado', 'Pendiente'],
+    })
+    analyzer.results = {
+        'ges_with_both_list': {'1-1'},
+        'ges_with_appointments_list': {'1-1', '2-2'},
+        'ges_with_medications_list': {'1-1', '3-3'},
+    }
+    return analyzer
+
+
+def test_hojas_de_casos_desde_una_tabla_por_paciente(tmp_path):
+    archivo = str(tmp_path / 'casos.xlsx')
+    create_test_analyzer().generate_patient_cases_excel(archivo)
+    hojas = pd.read_excel(archivo, sheet_name=None)
+
+    assert list(hojas) == ['Complete_Care_Patients', 'Patients_with_Appointments', 'Patients_with_Medications']
+    assert hojas['Complete_Care_Patients'].to_dict('records') == [{
+        'RUT': '1-1', 'GES_Condition': 'ASMA', 'Total_Appointments': 2, 'Attended_Appointments': 1,
+        'Total_Prescriptions': 1, 'Dispensed_Prescriptions': 1,
+    }]
+    citas = hojas['Patients_with_Appointments'].set_index('RUT')
+    assert list(citas.columns) == ['GES_Condition', 'Total_Appointments', 'Attended_Appointments']
+    assert citas.loc['2-2'].tolist() == ['EPOC', 1, 1]
+    medicamentos = hojas['Patients_with_Medications'].set_index('RUT')
+    assert list(medicamentos.columns) == ['GES_Condition', 'Total_Prescriptions', 'Dispensed_Prescriptions']
+    assert medicamentos.loc['3-3'].tolist() == ['Fibrosis', 2, 1]
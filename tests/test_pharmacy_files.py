@@ -1,5 +1,6 @@
 import pandas as pd
 import os
+import tempfile
 from scripts.ges_data_processor import GESDataProcessor
 
 def create_test_pharmacy_data():
@@ -34,28 +35,29 @@ def test_pharmacy_deduplication(show_details=True):
         print("\nDatos originales de farmacia:")
         print(processor.farmacia_df[['RutPaciente', 'DVPaciente', 'Farmaco_Desc', 'FechaDespacho']].to_string())
     
-    # Generar archivo de prueba
-    test_output = os.path.join(processor.outputs_path, 'test_farmacia_output.xlsx')
-    processor.procesar_medicamentos_para_carga(processor.farmacia_df, test_output)
-    
-    # Verificar resultado
-    if os.path.exists(test_output):
-        result_df = pd.read_excel(test_output)
-        print(f"\nRegistros en archivo final: {len(result_df)}")
-        if show_details:
-            print("\nRegistros procesados (después de deduplicación):")
-            print(result_df.to_string())
+    # Generar archivo de prueba en un directorio temporal (no deja archivos en outputs/)
+    with tempfile.TemporaryDirectory() as carpeta:
+        test_output = os.path.join(carpeta, 'test_farmacia_output.xlsx')
+        processor.procesar_medicamentos_para_carga(processor.farmacia_df, test_output)
+
+        # Verificar resultado
+        if os.path.exists(test_output):
+            result_df = pd.read_excel(test_output)
+            print(f"\nRegistros en archivo final: {len(result_df)}")
+            if show_details:
+                print("\nRegistros procesados (después de deduplicación):")
+                print(result_df.to_string())
             
-        # Análisis de duplicados
-        duplicates = result_df.groupby(['RUT', 'DV', 'PRESTACION', 'FECHA']).size().reset_index(name='count')
-        duplicates = duplicates[duplicates['count'] > 1]
-        if not duplicates.empty:
-            print("\n⚠️ DUPLICADOS ENCONTRADOS:")
-            print(duplicates.to_string())
+            # Análisis de duplicados
+            duplicates = result_df.groupby(['RUT', 'DV', 'PRESTACION', 'FECHA']).size().reset_index(name='count')
+            duplicates = duplicates[duplicates['count'] > 1]
+            if not duplicates.empty:
+                print("\n⚠️ DUPLICADOS ENCONTRADOS:")
+                print(duplicates.to_string())
+            else:
+                print("\n✅ No se encontraron duplicados")
         else:
-            print("\n✅ No se encontraron duplicados")
-    else:
-        print(f"\n❌ Error: No se generó el archivo {test_output}")
+            print(f"\n❌ Error: No se generó el archivo {test_output}")
 
 def test_load_real_files():
     """Test loading and processing real pharmacy files"""
@@ -0,0 +1,33 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+from ges_data_processor import GESDataProcessor
+
+
+def create_test_receta(path, rut, medicamento):
+    pd.DataFrame({
+        'FECHA': ['01-03-2025'], 'RUT': [rut], 'DÍGITO': ['k'], 'MEDICAMENTO': [medicamento],
+    }).to_excel(path, index=False)
+    return str(path)
+
+
+def test_recetas_en_paralelo_orden_y_errores_aislados(tmp_path, capsys):
+    archivos = [
+        create_test_receta(tmp_path / 'recetas_fq.xlsx', 22222222, 'TOBRAMICINA'),
+        str(tmp_path / 'recetas_rota.xls'),
+        create_test_receta(tmp_path / 'recetas_asma.xlsx', 11111111, 'SALBUTAMOL'),
+    ]
+    (tmp_path / 'recetas_rota.xls').write_bytes(b'\x00\x01 no es una planilla')
+
+    processor = GESDataProcessor(base_path=str(tmp_path), auto_select_files=False)
+    processor.recetas_procesos = 2
+    processor.selected_files['recetas_ges'] = archivos
+    processor.load_recetas_ges()
+
+    # Se concatena en el orden de los archivos; el archivo dañado no interrumpe la carga
+    assert processor.recetas_ges_df['RUT_Combined'].tolist() == ['22222222-K', '11111111-K']
+    salida = capsys.readouterr().out
+    assert 'Error cargando' in salida and 'recetas_rota.xls' in salida
@@ -0,0 +1,41 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+from ges_data_processor import GESDataProcessor, format_rut_series
+
+
+def assert_igual_a_format_rut(ruts, dvs):
+    processor = GESDataProcessor(auto_select_files=False)
+    esperado = [processor.format_rut(rut, dv) for rut, dv in zip(ruts, dvs)]
+    resultado = format_rut_series(ruts, dvs)
+    assert list(resultado.index) == list(ruts.index)
+    assert resultado.tolist() == esperado
+
+
+def test_format_rut_series_enteros():
+    ruts = pd.Series([12345678, 87654321, 11111111])
+    dvs = pd.Series(['1', ' k ', 'K'])
+    assert_igual_a_format_rut(ruts, dvs)
+    assert format_rut_series(ruts, dvs).tolist() == ['12345678-1', '87654321-K', '11111111-K']
+
+
+def test_format_rut_series_floats_y_nulos():
+    # Una columna con nulos llega como float desde el CSV
+    ruts = pd.Series([12345678.0, np.nan, 87654321.0, 5.0], index=[3, 5, 7, 9])
+    dvs = pd.Series(['1', '2', None, 7], index=[3, 5, 7, 9])
+    assert_igual_a_format_rut(ruts, dvs)
+
+
+def test_format_rut_series_objetos_mixtos():
+    ruts = pd.Series(['12345678', 87654321, 1.0, None, float('inf')], dtype=object)
+    dvs = pd.Series(['k', 'K', '0', '1', '2'])
+    assert_igual_a_format_rut(ruts, dvs)
+
+
+def test_format_rut_series_vacia():
+    resultado = format_rut_series(pd.Series([], dtype=float), pd.Series([], dtype=object))
+    assert resultado.empty
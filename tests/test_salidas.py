@@ -0,0 +1,100 @@
+import json
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+from ges_data_processor import GESDataProcessor
+from ges_salidas import leer_salida, sha256_archivo
+
+
+def create_test_processor(tmp_path, pool):
+    processor = GESDataProcessor(base_path=str(tmp_path), auto_select_files=True)
+    processor.salida_pool = pool
+    processor.salida_trabajadores = 3
+    return processor
+
+
+def test_partes_con_manifiesto(tmp_path):
+    df = pd.DataFrame({'RUT': [f'{i}-K' for i in range(10)], 'CANTIDAD': range(10)})
+    create_test_processor(tmp_path, 'hilos').save_df_in_chunks(df, str(tmp_path / 'CARGA.csv'), chunk_size=4)
+
+    manifiesto = json.loads((tmp_path / 'CARGA_MANIFIESTO.json').read_text(encoding='utf-8'))
+    assert manifiesto['filas'] == 10
+    assert [(p['archivo'], p['fila_inicio'], p['fila_fin']) for p in manifiesto['partes']] == [
+        ('CARGA.csv', 0, 4), ('CARGA_part2.csv', 4, 8), ('CARGA_part3.csv', 8, 10)]
+    for parte in manifiesto['partes']:
+        assert parte['sha256'] == sha256_archivo(tmp_path / parte['archivo'])
+    leido = pd.concat([pd.read_csv(tmp_path / p['archivo']) for p in manifiesto['partes']], ignore_index=True)
+    assert leido.equals(df)
+
+    # Sin temporales a medio escribir
+    assert not [nombre for nombre in os.listdir(tmp_path) if '.tmp' in nombre]
+
+
+def test_parte_fallida_no_deja_archivo(tmp_path, capsys):
+    df = pd.DataFrame({'RUT': ['1-9', '2-7']})
+    create_test_processor(tmp_path, 'procesos').save_df_in_chunks(df, str(tmp_path / 'CARGA.xls'), chunk_size=1)
+
+    assert 'Error guardando archivos en chunks' in capsys.readouterr().out
+    # Solo queda el resultado completo, escrito antes de las partes, y el manifiesto con el error
+    assert sorted(nombre for nombre in os.listdir(tmp_path) if nombre.startswith('CARGA')) == [
+        'CARGA_COMPLETO.csv', 'CARGA_MANIFIESTO.json']
+
+    # Falla una parte de varias: las ya escritas se eliminan, y también las de una corrida
+    # anterior con el mismo nombre (la que falló quedaría con el nombre final)
+    fechas = [pd.Timestamp('2025-08-01'), pd.Timestamp('2025-08-02'), pd.Timestamp('2025-08-03', tz='UTC')]
+    df = pd.DataFrame({'RUT': ['1-9', '2-7', '3-5'], 'FECHA': pd.Series(fechas, dtype=object)})
+    for pool in ('procesos', 'hilos'):
+        processor = create_test_processor(tmp_path, pool)
+        processor.salida_canonica = []
+        processor.save_df_in_chunks(df.assign(FECHA=fechas[0]), str(tmp_path / f'OTRA_{pool}.xlsx'), chunk_size=1)
+        assert (tmp_path / f'OTRA_{pool}_part3.xlsx').exists()
+        processor.save_df_in_chunks(df, str(tmp_path / f'OTRA_{pool}.xlsx'), chunk_size=1)
+
+        assert 'Error guardando archivos en chunks' in capsys.readouterr().out
+        assert sorted(nombre for nombre in os.listdir(tmp_path) if nombre.startswith(f'OTRA_{pool}')) == [
+            f'OTRA_{pool}_MANIFIESTO.json']
+        manifiesto = json.loads((tmp_path / f'OTRA_{pool}_MANIFIESTO.json').read_text(encoding='utf-8'))
+        assert manifiesto['estado'] == 'error' and manifiesto['partes'] == []
+        with pytest.raises(ValueError, match='incompleta'):
+            leer_salida(str(tmp_path / f'OTRA_{pool}.xlsx'))
+
+
+def test_salida_canonica_y_lectura(tmp_path):
+    df = pd.DataFrame({'RUT': range(7), 'FECHA': pd.date_range('2025-08-01', periods=7).strftime('%d/%m/%Y')})
+    processor = create_test_processor(tmp_path, 'hilos')
+    processor.save_df_in_chunks(df, str(tmp_path / 'CARGA.xlsx'), chunk_size=3)
+
+    manifiesto = json.loads((tmp_path / 'CARGA_MANIFIESTO.json').read_text(encoding='utf-8'))
+    assert manifiesto['canonicos']['csv'] == {
+        'archivo': 'CARGA_COMPLETO.csv', 'sha256': sha256_archivo(tmp_path / 'CARGA_COMPLETO.csv')}
+    assert leer_salida(str(tmp_path / 'CARGA.xlsx')).equals(df)
+
+    # Sin salida canónica se leen las partes en orden
+    processor.salida_canonica = []
+    processor.save_df_in_chunks(df, str(tmp_path / 'OTRA.xlsx'), chunk_size=3)
+    assert not (tmp_path / 'OTRA_COMPLETO.csv').exists()
+    assert leer_salida(str(tmp_path / 'OTRA.xlsx')).equals(df)
+
+
+def test_corrida_con_menos_filas_no_mezcla_salida_anterior(tmp_path):
+    processor = create_test_processor(tmp_path, 'hilos')
+    destino = str(tmp_path / 'archivo_farmacia_ges_completo.xlsx')
+    processor.save_df_in_chunks(pd.DataFrame({'RUT': range(10)}), destino, chunk_size=4)
+    assert (tmp_path / 'archivo_farmacia_ges_completo_part3.xlsx').exists()
+
+    # Misma ruta, menos filas y sin salida canónica: no quedan partes ni canónicos de la corrida anterior
+    processor.salida_canonica = []
+    nuevo = pd.DataFrame({'RUT': [100, 101, 102]})
+    processor.save_df_in_chunks(nuevo, destino, chunk_size=4)
+    assert sorted(os.listdir(tmp_path / '.')) == [
+        'archivo_farmacia_ges_completo.xlsx', 'archivo_farmacia_ges_completo_MANIFIESTO.json']
+    assert leer_salida(destino).equals(nuevo)
+
+    # Una parte sobrante que reaparezca no se lee: solo cuenta lo que lista el manifiesto
+    pd.DataFrame({'RUT': [7]}).to_excel(tmp_path / 'archivo_farmacia_ges_completo_part2.xlsx', index=False)
+    pd.DataFrame({'RUT': [7]}).to_csv(tmp_path / 'archivo_farmacia_ges_completo_COMPLETO.csv', index=False)
+    assert leer_salida(destino).equals(nuevo)
@@ -0,0 +1,60 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+from trazadora_rules import RESOLVER_SEVERIDAD_FQ, TrazadoraRuleEngine
+
+
+def test_prioridad_de_regla_y_no_posicion_en_texto():
+    motor = TrazadoraRuleEngine.desde_archivo()
+
+    # Budesonida aparece antes en el texto, pero salbutamol tiene mayor prioridad
+    assert motor.clasificar_descripcion('BUDESONIDA + SALBUTAMOL INH', 'ASMA') == '3902001'
+    assert motor.clasificar_descripcion('FORMOTEROL/BUDESONIDA 160/4.5', 'ASMA') == '3902002'
+    assert motor.clasificar_descripcion('OMALIZUMAB 150 MG', 'ASMA') == '2508156'
+    assert motor.clasificar_descripcion('PARACETAMOL', 'ASMA') == '3902001'
+    assert motor.clasificar_descripcion('TOBRAMICINA 300MG', 'Fibrosis') == '3004004'
+    assert motor.clasificar_descripcion('DORNASA ALFA', 'Fibrosis') == RESOLVER_SEVERIDAD_FQ
+    assert motor.clasificar_descripcion('TIOTROPIO', 'EPOC') == '3801002'
+    assert motor.clasificar_descripcion('TIOTROPIO', 'OTRA') is None
+
+
+def test_reglas_desde_datos_y_columna_completa():
+    reglas = pd.DataFrame({
+        'patologia': ['ASMA', 'ASMA', 'ASMA'],
+        'prioridad': [2, 1, 9],
+        'palabras_clave': ['budes', 'budesonida forte', ''],
+        'codigo': ['3902002', '3999999', '3902001'],
+    })
+    motor = TrazadoraRuleEngine(reglas)
+
+    descripciones = pd.Series(['Budesonida Forte 200', 'BUDESONIDA 200', None, 'Budesonida Forte 200'], index=[4, 2, 7, 1])
+    codigos = motor.clasificar(descripciones, 'ASMA')
+    # Palabras superpuestas: gana la regla de mayor prioridad aunque empiece en la misma posición
+    assert codigos.tolist() == ['3999999', '3902002', '3902001', '3999999']
+    assert list(codigos.index) == [4, 2, 7, 1]
+
+
+def test_memo_de_clasificaciones_y_persistencia(tmp_path):
+    motor = TrazadoraRuleEngine.desde_archivo()
+    descripciones = pd.Series(['SALBUTAMOL 100MCG INH', 'salbutamol 100mcg inh ', 'BUDESONIDA 200'] * 100)
+
+    motor.clasificar(descripciones, 'ASMA')
+    assert len(motor._memo) == 2
+    assert (motor.consultas, motor.aciertos) == (300, 298)
+
+    archivo = str(tmp_path / '.cache' / 'clasificacion_medicamentos.json')
+    motor.guardar_memo(archivo)
+
+    # Nueva corrida con las mismas reglas: todo sale de memoria
+    otra_corrida = TrazadoraRuleEngine.desde_archivo()
+    assert otra_corrida.cargar_memo(archivo) == 2
+    assert otra_corrida.clasificar(descripciones, 'ASMA').tolist()[:3] == ['3902001', '3902001', '3902002']
+    assert otra_corrida.aciertos == otra_corrida.consultas == 300
+
+    # Reglas distintas: lo guardado no se usa
+    reglas = otra_corrida.reglas.copy()
+    reglas.loc[reglas['codigo'] == '3902002', 'codigo'] = '3999999'
+    assert TrazadoraRuleEngine(reglas).cargar_memo(archivo) == 0
@@ -0,0 +1,193 @@
+"""
+Benchmark de GESDataProcessor.procesar_todo sobre datos sintéticos.
+
+Genera (una vez por escala y semilla) las entradas con generar_datos_sinteticos,
+ejecuta cada repetición en un proceso nuevo y agrega los tiempos por etapa
+(mejor de N) a benchmarks/resultados.jsonl junto con el commit, para comparar
+corridas entre versiones.
+
+Uso:
+    python tools/benchmark_ges.py --filas 10000 100000 --repeticiones 3 --comparar
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(RAIZ, "scripts"))
+sys.path.insert(0, os.path.join(RAIZ, "tools"))
+
+from generar_datos_sinteticos import generar_datos  # noqa: E402
+
+DIRECTORIO_DATOS = os.path.join(RAIZ, "benchmarks", "datos")
+ARCHIVO_RESULTADOS = os.path.join(RAIZ, "benchmarks", "resultados.jsonl")
+CAMPOS_ETAPA = ["segundos", "cpu_segundos", "memoria_pico_mb", "filas_entrada", "filas_salida"]
+
+
+def version_codigo():
+    """Commit actual (con -dirty si hay cambios sin commit); None fuera de git"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        cambios = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=RAIZ,
+                                 capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f"{commit}-dirty" if cambios else commit
+
+
+def preparar_datos(filas, semilla, directorio=DIRECTORIO_DATOS):
+    """Carpeta base con las entradas sintéticas de esta escala (generadas solo la primera vez)"""
+    base = os.path.join(directorio, f"filas_{filas}_semilla_{semilla}")
+    marca = os.path.join(base, "generado.json")
+    if not os.path.exists(marca):
+        print(f"🧪 Generando datos sintéticos: {filas:,} filas (semilla {semilla})...")
+        inicio = time.perf_counter()
+        generados = generar_datos(base, filas=filas, semilla=semilla)
+        with open(marca, "w", encoding="utf-8") as f:
+            json.dump({os.path.basename(archivo): n for archivo, n in generados.items()}, f, indent=2)
+        print(f"   listo en {time.perf_counter() - inicio:.1f}s")
+    return base
+
+
+def ejecutar_corrida(base, con_cache=False, perfilar=(), directorio_perfiles=None):
+    """
+    Una corrida de procesar_todo sobre `base` con salidas en un directorio temporal.
+    Retorna las etapas; los .prof de las etapas perfiladas se mueven a `directorio_perfiles`.
+    """
+    from ges_data_processor import GESDataProcessor
+
+    with tempfile.TemporaryDirectory() as salidas, contextlib.redirect_stdout(io.StringIO()):
+        processor = GESDataProcessor(base_path=base, auto_select_files=True)
+        processor.outputs_path = salidas
+        processor.trazadora_processor.outputs_path = salidas
+        if not con_cache:
+            processor.cache_entradas.habilitada = False
+        processor.perfilar_etapas = list(perfilar)
+        processor.procesar_todo()
+        etapas = processor.ultima_medicion.etapas
+
+        for etapa in etapas:
+            if etapa.get("perfil") and directorio_perfiles:
+                os.makedirs(directorio_perfiles, exist_ok=True)
+                destino = os.path.join(directorio_perfiles, os.path.basename(etapa["perfil"]))
+                shutil.move(etapa["perfil"], destino)
+                etapa["perfil"] = destino
+
+    campos = CAMPOS_ETAPA + ["perfil"]
+    return {etapa["etapa"]: {campo: etapa.get(campo) for campo in campos if campo in etapa} for etapa in etapas}
+
+
+def medir(base, repeticiones, con_cache=False):
+    """Mejor tiempo por etapa en `repeticiones` corridas, cada una en un proceso nuevo"""
+    corridas = []
+    for _ in range(repeticiones):
+        comando = [sys.executable, os.path.abspath(__file__), "--una-corrida", base]
+        if con_cache:
+            comando.append("--con-cache")
+        salida = subprocess.run(comando, capture_output=True, text=True, check=True).stdout
+        corridas.append(json.loads(salida.strip().splitlines()[-1]))
+
+    mejores = {}
+    for etapa in corridas[0]:
+        mediciones = [corrida[etapa] for corrida in corridas if etapa in corrida]
+        mejor = min(mediciones, key=lambda m: m["segundos"])
+        mejores[etapa] = dict(mejor, memoria_pico_mb=max(m["memoria_pico_mb"] or 0 for m in mediciones) or None)
+    return mejores
+
+
+def guardar_resultado(resultado, archivo=ARCHIVO_RESULTADOS):
+    os.makedirs(os.path.dirname(archivo), exist_ok=True)
+    with open(archivo, "a", encoding="utf-8") as f:
+        f.write(json.dumps(resultado, ensure_ascii=False) + "\n")
+
+
+def resultado_anterior(resultado, archivo=ARCHIVO_RESULTADOS):
+    """Último resultado guardado de la misma escala y semilla con otro commit"""
+    if not os.path.exists(archivo):
+        return None
+    anterior = None
+    with open(archivo, encoding="utf-8") as f:
+        for linea in f:
+            if not linea.strip():
+                continue
+            previo = json.loads(linea)
+            if (previo["filas"], previo["semilla"]) == (resultado["filas"], resultado["semilla"]) \
+                    and previo.get("commit") != resultado.get("commit"):
+                anterior = previo
+    return anterior
+
+
+def imprimir_resultado(resultado, anterior=None):
+    referencia = f" vs {anterior['commit']}" if anterior else ""
+    print(f"\n📊 {resultado['filas']:,} filas (semilla {resultado['semilla']}) @ {resultado['commit']}{referencia}")
+    for etapa, medicion in resultado["etapas"].items():
+        linea = f"   {etapa:<22} {medicion['segundos']:>8.2f}s  CPU {medicion['cpu_segundos']:>8.2f}s"
+        if medicion.get("memoria_pico_mb"):
+            linea += f"  pico {medicion['memoria_pico_mb']:>7.1f} MB"
+        previo = (anterior or {}).get("etapas", {}).get(etapa)
+        if previo and previo["segundos"]:
+            cambio = (medicion["segundos"] - previo["segundos"]) / previo["segundos"] * 100
+            linea += f"  ({previo['segundos']:.2f}s → {cambio:+.0f}%)"
+        print(linea)
+    print(f"   {'total':<22} {resultado['segundos_totales']:>8.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark por etapa de GESDataProcessor con datos sintéticos")
+    parser.add_argument("--filas", type=int, nargs="+", default=[10_000, 100_000],
+                        help="Escalas a medir (filas de consultas y farmacia)")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--repeticiones", type=int, default=3, help="Se guarda el mejor tiempo por etapa")
+    parser.add_argument("--con-cache", action="store_true", help="Usar la caché de entradas (por defecto, lectura en frío)")
+    parser.add_argument("--datos", default=DIRECTORIO_DATOS, help="Carpeta de datos sintéticos generados")
+    parser.add_argument("--resultados", default=ARCHIVO_RESULTADOS, help="Archivo JSONL de resultados")
+    parser.add_argument("--comparar", action="store_true", help="Comparar con el último resultado de otro commit")
+    parser.add_argument("--perfilar", nargs="*", default=[], help="Etapas a perfilar con cProfile (una corrida extra)")
+    parser.add_argument("--una-corrida", metavar="BASE", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.una_corrida:
+        print(json.dumps(ejecutar_corrida(args.una_corrida, args.con_cache)))
+        return
+
+    commit = version_codigo()
+    for filas in args.filas:
+        base = preparar_datos(filas, args.semilla, args.datos)
+        print(f"⏱️ Midiendo {filas:,} filas ({args.repeticiones} repeticiones)...")
+        etapas = medir(base, args.repeticiones, args.con_cache)
+        resultado = {
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "commit": commit,
+            "filas": filas,
+            "semilla": args.semilla,
+            "repeticiones": args.repeticiones,
+            "con_cache": args.con_cache,
+            "python": sys.version.split()[0],
+            "segundos_totales": round(sum(m["segundos"] for m in etapas.values()), 3),
+            "etapas": etapas,
+        }
+        imprimir_resultado(resultado, resultado_anterior(resultado, args.resultados) if args.comparar else None)
+        guardar_resultado(resultado, args.resultados)
+
+        if args.perfilar:
+            directorio = os.path.join(os.path.dirname(os.path.abspath(args.resultados)), "perfiles")
+            perfiladas = ejecutar_corrida(base, args.con_cache, args.perfilar, directorio)
+            for etapa, medicion in perfiladas.items():
+                if medicion.get("perfil"):
+                    print(f"   🔬 Perfil {etapa}: {medicion['perfil']}")
+
+    print(f"\n🧾 Resultados agregados a {args.resultados}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+Generador de entradas sintéticas para pruebas de rendimiento.
+
+Crea en <destino>/inputs/ los mismos archivos que usa GESDataProcessor
+(población GES, consultas, farmacia, recetas Excel/HTML, severidad FQ,
+clasificación paliativos y listado de medicamentos GES) con RUT y DV
+válidos, fechas en los formatos mixtos de los extractos reales,
+duplicados y pacientes fuera de la población.
+
+Mismos parámetros y semilla → mismos archivos.
+
+Uso:
+    python tools/generar_datos_sinteticos.py --destino bench/100k --filas 100000
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+MESES = ["ene", "feb", "mar", "abr", "may", "jun", "jul", "ago", "sep", "oct", "nov", "dic"]
+
+PATOLOGIAS = ["ASMA", "EPOC", "Fibrosis", "Paliativos"]
+PESOS_PATOLOGIAS = [0.4, 0.3, 0.1, 0.2]
+
+MEDICAMENTOS = [
+    "SALBUTAMOL 100MCG INH", "BUDESONIDA 200 MCG", "TEOFILINA 200MG", "PREDNISONA 5 MG",
+    "IPRATROPIO BROMURO 20 MCG", "DESLORATADINA 5MG", "MEPOLIZUMAB 100 MG", "OMALIZUMAB 150 MG",
+    "FLUTICASONA/SALMETEROL 250/50", "FORMOTEROL/BUDESONIDA 160/4.5", "AMINOFILINA 100MG",
+    "TIOTROPIO 18 MCG", "TRIKAFTA COMP", "TOBRAMICINA 300MG", "DORNASA ALFA 2.5MG",
+    "ENZIMAS PANCREATICAS", "MORFINA 10MG", "FENTANILO PARCHE 25MCG", "TRAMADOL 50MG",
+    "PARACETAMOL 500 MG", "LORATADINA 10MG", "COLISTINA 1MUI", "OMEPRAZOL 20MG",
+]
+MEDICAMENTOS_GES = MEDICAMENTOS[:19]
+
+ESPECIALIDADES = ["07-102-0", "07-102-2", "07-109-0", "07-116-0", "07-117-0", "07-117-3", "07-999-0", None]
+LOCALES = ["INT-07-102-0", "INT-07-102-0-R", "INT-07-116-0-P", "07-102-2A", "INT-07-117-3 B2", None]
+ESTADOS_CITA = ["Atendido", "Llegó", "No Atendido", "Suspendida"]
+SEVERIDADES = ["SEVERO", "Moderado", "leve", "", None]
+CONDICIONES_PALIATIVOS = ["I", "D", "T", "E", "CP-NO", "DC-NO", "DO NO", "NP", None]
+
+# Formatos de fecha de los extractos (proporciones aproximadas de los archivos reales)
+FORMATOS_FECHA = [("%d-%m-%Y", 0.5), ("%Y-%m-%d", 0.25), ("%d/%m/%Y", 0.2), ("%d-%m-%Y %H:%M", 0.05)]
+
+
+def digitos_verificadores(ruts):
+    """Dígito verificador (módulo 11) de un arreglo de RUT numéricos"""
+    ruts = np.asarray(ruts, dtype=np.int64)
+    suma = np.zeros(len(ruts), dtype=np.int64)
+    resto = ruts.copy()
+    for posicion in range(9):
+        suma += (resto % 10) * (2 + posicion % 6)
+        resto //= 10
+    dv = 11 - suma % 11
+    return np.where(dv == 11, "0", np.where(dv == 10, "K", dv.astype(str)))
+
+
+def fechas_del_mes(rng, cantidad, anio, mes, vacias=0.0):
+    """Fechas aleatorias del mes en formatos mixtos (una fracción `vacias` sin fecha)"""
+    inicio = pd.Timestamp(year=anio, month=mes, day=1)
+    dias = rng.integers(0, inicio.days_in_month, cantidad)
+    minutos = rng.integers(8 * 60, 18 * 60, cantidad)
+    fechas = pd.Series(inicio + pd.to_timedelta(dias, unit="D") + pd.to_timedelta(minutos, unit="m"))
+
+    formato = rng.choice(len(FORMATOS_FECHA), cantidad, p=[peso for _, peso in FORMATOS_FECHA])
+    texto = pd.Series(np.empty(cantidad, dtype=object))
+    for indice, (patron, _) in enumerate(FORMATOS_FECHA):
+        mascara = formato == indice
+        texto[mascara] = fechas[mascara].dt.strftime(patron)
+    if vacias:
+        texto[rng.random(cantidad) < vacias] = None
+    return texto.to_numpy()
+
+
+def elegir(rng, opciones, cantidad):
+    return np.asarray(opciones, dtype=object)[rng.integers(0, len(opciones), cantidad)]
+
+
+def generar_pacientes(rng, pacientes, externos):
+    """RUT de la población GES y de pacientes externos (sin repetir)"""
+    total = pacientes + externos
+    ruts = np.unique(rng.integers(1_000_000, 26_000_000, int(total * 1.1) + 10))
+    ruts = rng.permutation(ruts)[:total]
+    poblacion = pd.DataFrame({"RUT_NUM": ruts[:pacientes]})
+    poblacion["DV"] = digitos_verificadores(poblacion["RUT_NUM"])
+    poblacion["Ges"] = rng.choice(PATOLOGIAS, pacientes, p=PESOS_PATOLOGIAS)
+    externos_df = pd.DataFrame({"RUT_NUM": ruts[pacientes:]})
+    externos_df["DV"] = digitos_verificadores(externos_df["RUT_NUM"])
+    return poblacion, externos_df
+
+
+def muestrear_pacientes(rng, poblacion, externos, cantidad, fraccion_ges):
+    """RUT/DV por fila: `fraccion_ges` de la población GES y el resto externos"""
+    es_ges = rng.random(cantidad) < fraccion_ges
+    origen = pd.concat([poblacion[["RUT_NUM", "DV"]], externos[["RUT_NUM", "DV"]]], ignore_index=True)
+    indices = np.where(
+        es_ges,
+        rng.integers(0, len(poblacion), cantidad),
+        len(poblacion) + rng.integers(0, max(len(externos), 1), cantidad),
+    )
+    filas = origen.iloc[indices].reset_index(drop=True)
+    return filas["RUT_NUM"].to_numpy(), filas["DV"].to_numpy()
+
+
+def generar_datos(destino, filas=100_000, pacientes=None, filas_recetas=None, semilla=42, anio=2025, mes=8):
+    """
+    Escribir las entradas sintéticas en <destino>/inputs y retornar {archivo: filas}.
+
+    filas: filas de consultas y de farmacia.
+    pacientes: tamaño de la población GES (por defecto filas/50, entre 200 y 100.000).
+    filas_recetas: filas de recetas GES (por defecto filas/20, máx. 200.000).
+    """
+    rng = np.random.default_rng(semilla)
+    pacientes = pacientes or int(min(max(filas // 50, 200), 100_000))
+    filas_recetas = filas_recetas if filas_recetas is not None else int(min(filas // 20, 200_000))
+    sufijo = MESES[mes - 1]
+    inputs = os.path.join(destino, "inputs")
+    os.makedirs(inputs, exist_ok=True)
+    generados = {}
+
+    poblacion, externos = generar_pacientes(rng, pacientes, max(pacientes // 2, 50))
+
+    # Población GES (RUT con DV en texto, como el archivo real)
+    archivo = os.path.join(inputs, "RUT_pob_ges.xlsx")
+    pob_df = pd.DataFrame({
+        "RUT": poblacion["RUT_NUM"].astype(str) + "-" + poblacion["DV"],
+        "DV": poblacion["DV"],
+        "Ges": poblacion["Ges"],
+    })
+    pob_df.to_excel(archivo, index=False)
+    generados[archivo] = len(pob_df)
+
+    # Consultas
+    ruts, dvs = muestrear_pacientes(rng, poblacion, externos, filas, 0.7)
+    especialidades = elegir(rng, ESPECIALIDADES, filas)
+    consultas = pd.DataFrame({
+        "RUNPaciente": pd.Series(ruts).astype(str).to_numpy() + "-" + dvs,
+        "EstadoCita_Desc": rng.choice(ESTADOS_CITA, filas, p=[0.6, 0.15, 0.15, 0.1]),
+        "EspecialidadLocal": especialidades,
+        "EspecialidadLocal_Desc": np.where(pd.isna(especialidades), None, "Especialidad " + especialidades.astype(str)),
+        "FechaCita": fechas_del_mes(rng, filas, anio, mes),
+    })
+    archivo = os.path.join(inputs, f"reporte_consulta_{sufijo}.csv")
+    consultas.to_csv(archivo, sep=";", index=False, encoding="latin-1")
+    generados[archivo] = len(consultas)
+
+    # Farmacia (DV en minúscula en parte de las filas, algunas sin fecha)
+    ruts, dvs = muestrear_pacientes(rng, poblacion, externos, filas, 0.75)
+    dvs = np.where(rng.random(filas) < 0.2, np.char.lower(dvs.astype(str)), dvs)
+    farmacia = pd.DataFrame({
+        "RutPaciente": ruts,
+        "DVPaciente": dvs,
+        "Farmaco_Desc": elegir(rng, MEDICAMENTOS, filas),
+        "FechaDespacho": fechas_del_mes(rng, filas, anio, mes, vacias=0.02),
+        "CantidadDespachada": rng.integers(1, 90, filas),
+        "LocalSolicitante": elegir(rng, LOCALES, filas),
+        "EstadoActualDeFarmacia_Desc": rng.choice(["Despachado", "Pendiente"], filas, p=[0.9, 0.1]),
+    })
+    archivo = os.path.join(inputs, f"reporte_farmacia_{sufijo}.csv")
+    farmacia.to_csv(archivo, sep=";", index=False, encoding="latin-1")
+    generados[archivo] = len(farmacia)
+
+    # Recetas GES: una planilla Excel y un reporte HTML con extensión .xls (como los exportados)
+    if filas_recetas:
+        ruts, dvs = muestrear_pacientes(rng, poblacion, externos, filas_recetas, 0.9)
+        recetas = pd.DataFrame({
+            "FECHA": fechas_del_mes(rng, filas_recetas, anio, mes),
+            "RUT": ruts,
+            "DÍGITO": dvs,
+            "MEDICAMENTO": elegir(rng, MEDICAMENTOS_GES, filas_recetas),
+            "CANT.": rng.integers(1, 4, filas_recetas),
+            "POLICLÍNICO": elegir(rng, LOCALES[:-1], filas_recetas),
+        })
+        mitad = filas_recetas // 2
+        archivo = os.path.join(inputs, f"recetas_asma_{sufijo}.xlsx")
+        recetas.iloc[:mitad].to_excel(archivo, index=False)
+        generados[archivo] = mitad
+
+        archivo = os.path.join(inputs, f"recetas_fq_{sufijo}.xls")
+        metadatos = pd.DataFrame({"Reporte": ["Recetas GES"], "Periodo": [f"{sufijo}-{anio}"]})
+        with open(archivo, "w", encoding="utf-8") as f:
+            f.write('<html><head><meta charset="utf-8"></head><body>')
+            f.write(metadatos.to_html(index=False))
+            f.write(recetas.iloc[mitad:].to_html(index=False))
+            f.write("</body></html>")
+        generados[archivo] = filas_recetas - mitad
+
+    # Severidad FQ y clasificación paliativos: parte de los pacientes, RUT con y sin DV
+    for nombre, patologia, columna, valores in [
+        ("severidad_FQ.xlsx", "Fibrosis", "Severidad", SEVERIDADES),
+        ("clasificacion_paliativos.xlsx", "Paliativos", "condicion", CONDICIONES_PALIATIVOS),
+    ]:
+        grupo = poblacion[poblacion["Ges"] == patologia].iloc[: int((poblacion["Ges"] == patologia).sum() * 0.9)]
+        con_dv = rng.random(len(grupo)) < 0.5
+        tabla = pd.DataFrame({
+            "RUT": np.where(con_dv, grupo["RUT_NUM"].astype(str) + "-" + grupo["DV"], grupo["RUT_NUM"].astype(str)),
+            columna: elegir(rng, valores, len(grupo)),
+        })
+        archivo = os.path.join(inputs, nombre)
+        tabla.to_excel(archivo, index=False)
+        generados[archivo] = len(tabla)
+
+    # Listado de medicamentos GES
+    archivo = os.path.join(inputs, "Medicamentos GES (1).xlsx")
+    pd.DataFrame({"Farmaco_Desc": MEDICAMENTOS_GES}).to_excel(archivo, index=False)
+    generados[archivo] = len(MEDICAMENTOS_GES)
+
+    return generados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generar entradas sintéticas GES para pruebas de rendimiento")
+    parser.add_argument("--destino", required=True, help="Carpeta base (los archivos quedan en <destino>/inputs)")
+    parser.add_argument("--filas", type=int, default=100_000, help="Filas de consultas y de farmacia (10k a 5M)")
+    parser.add_argument("--pacientes", type=int, default=None, help="Tamaño de la población GES")
+    parser.add_argument("--filas-recetas", type=int, default=None, help="Filas de recetas GES")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--anio", type=int, default=2025)
+    parser.add_argument("--mes", type=int, default=8)
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    generados = generar_datos(args.destino, args.filas, args.pacientes, args.filas_recetas,
+                              args.semilla, args.anio, args.mes)
+    for archivo, filas in generados.items():
+        print(f"✅ {os.path.basename(archivo)}: {filas:,} filas")
+    print(f"⏱️ Generado en {time.perf_counter() - inicio:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
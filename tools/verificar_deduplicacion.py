@@ -1,7 +1,11 @@
-import pandas as pd
+import os
+import sys
 
-# Leer archivo
-df = pd.read_excel('archivo_farmacia_ges_completo.xlsx')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+from ges_salidas import leer_salida
+
+# Leer archivo (salida canónica completa si existe, si no todas las partes)
+df = leer_salida('archivo_farmacia_ges_completo.xlsx')
 print(f'Total filas en archivo: {len(df)}')
 
 # Buscar RUT 12725553